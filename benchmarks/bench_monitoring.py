@@ -0,0 +1,184 @@
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from ib_insync import Option
+
+from benchmarks.harness import benchmark
+from src.alerting.alerts import AlertOptionEngine
+from src.alerting.rules import RuleEngine
+from src.config.config import AlertConfig, AlertRule
+from src.loader.inventory_loader import InventoryLoader
+from src.model.models import Portfolio
+from src.monitoring.monitor import OptionMonitor
+from src.monitoring.pipeline import ChainPipeline, build_alert_engine, build_greeks_engine
+from src.monitoring.snapshot_store import SnapshotStore
+from src.monitoring.tick_processor import TickProcessor
+from src.persistence.snapshot_writer import ParquetSnapshotWriter
+from src.service.symbol_tracker import SymbolTracker
+from src.simulation.fake_ib import FakeIB
+
+CHAIN_SIZES = (1_000, 10_000, 50_000)
+
+
+def chain_keys(n, symbol='SPX', spot=5000.0):
+    """`n` synthetic (symbol, expiry, strike, right) keys: calls and puts over 8 daily expirations."""
+    expiries = [(date.today() + timedelta(days=d)).strftime('%Y%m%d') for d in range(8)]
+    per_expiry = -(-n // (2 * len(expiries)))
+    # Strikes stay positive however large the chain, contract keys (and so indices) must be unique
+    step = min(5.0, spot / per_expiry)
+    strikes = spot + step * (np.arange(per_expiry) - per_expiry // 2)
+    keys = [(symbol, expiry, float(strike), right) for expiry in expiries for strike in strikes for right in 'CP']
+    return keys[:n]
+
+
+def chain_columns(rng, n):
+    return {
+        'bid': rng.uniform(1, 50, n), 'ask': rng.uniform(50, 100, n), 'last': rng.uniform(1, 100, n),
+        'delta': rng.uniform(-1, 1, n), 'gamma': rng.uniform(0, 0.01, n), 'theta': rng.uniform(-5, 0, n),
+        'vega': rng.uniform(0, 5, n), 'iv': rng.uniform(0.1, 0.4, n), 'und_price': np.full(n, 5000.0),
+    }
+
+
+@benchmark('monitor_update_iv', sizes=CHAIN_SIZES)
+def monitor_update_iv(n):
+    rng = np.random.default_rng(0)
+    monitor = OptionMonitor(contract_capacity=n, iv_window=50)
+    indices = np.array([monitor.snapshots.contracts.add_key(key) for key in chain_keys(n)], dtype=np.intp)
+    # Fill the windows first so every call measures the steady state (eviction + percentile)
+    for _ in range(monitor.iv_stats.window):
+        monitor.update_iv(indices, rng.uniform(0.1, 0.4, n))
+    samples = rng.uniform(0.1, 0.4, (16, n))
+    cycle = iter(range(1 << 62))
+    return lambda: monitor.update_iv(indices, samples[next(cycle) % 16]), n
+
+
+@benchmark('alert_check_batch', sizes=CHAIN_SIZES)
+def alert_check_batch(n):
+    rng = np.random.default_rng(1)
+    store = SnapshotStore(contract_capacity=n, max_cycles=2)
+    keys = chain_keys(n)
+    indices = np.array([store.contracts.add_key(key) for key in keys], dtype=np.intp)
+    engine = AlertOptionEngine(delta_threshold=0.5, gamma_threshold=0.008, theta_threshold=-4.5,
+                               watched_strikes={int(key[2]) for key in keys})
+    columns = chain_columns(rng, n)
+    return lambda: engine.check_batch(store.contracts, indices, columns), n
+
+
+@benchmark('alert_rules', sizes=CHAIN_SIZES)
+def alert_rules(n):
+    """Twelve rules over greeks, IV and spreads with hysteresis; cost should grow with rules far less than n."""
+    rng = np.random.default_rng(1)
+    store = SnapshotStore(contract_capacity=n, max_cycles=2)
+    indices = np.array([store.contracts.add_key(key) for key in chain_keys(n)], dtype=np.intp)
+    fields = ('delta', 'gamma', 'theta', 'vega', 'iv', 'spread_pct')
+    rules = [AlertRule(name=f"{field}_{op}", field=field, op=op, threshold=threshold, hysteresis=0.01)
+             for field, threshold in zip(fields, (0.5, 0.008, -4.5, 4.0, 0.35, 0.8)) for op in ('>', '<')]
+    engine = RuleEngine(rules, 'SPX')
+    # Small moves around one chain state: the steady state where few rules cross their bands each cycle
+    base = chain_columns(rng, n)
+    samples = [{name: values * rng.uniform(0.995, 1.005, n) for name, values in base.items()} for _ in range(4)]
+    engine.check_batch(store.contracts, indices, base)
+    cycle = iter(range(1 << 62))
+    return lambda: engine.check_batch(store.contracts, indices, samples[next(cycle) % 4]), n
+
+
+@benchmark('alert_check_legacy', sizes=(1_000, 10_000))
+def alert_check_legacy(n):
+    rng = np.random.default_rng(2)
+
+    class Greeks:
+        def __init__(self, delta, gamma, theta):
+            self.delta, self.gamma, self.theta = delta, gamma, theta
+
+    keys = chain_keys(n)
+    contracts = [Option(symbol, expiry, strike, right, 'CBOE') for symbol, expiry, strike, right in keys]
+    greeks = [Greeks(*values) for values in zip(rng.uniform(-1, 1, n), rng.uniform(0, 0.01, n), rng.uniform(-5, 0, n))]
+    engine = AlertOptionEngine(delta_threshold=0.5, gamma_threshold=0.008, theta_threshold=-4.5,
+                               watched_strikes={int(key[2]) for key in keys})
+
+    def run():
+        for contract, values in zip(contracts, greeks):
+            engine.check(contract, values)
+    return run, n
+
+
+@benchmark('contract_lookup', sizes=CHAIN_SIZES)
+def contract_lookup(n):
+    """Contract -> id resolution of a polled chain (qualified contracts, every one already registered)."""
+    store = SnapshotStore(contract_capacity=n, max_cycles=2)
+    contracts = [Option(symbol, expiry, strike, right, 'SMART', conId=1000 + i)
+                 for i, (symbol, expiry, strike, right) in enumerate(chain_keys(n))]
+    store.contracts.indices(contracts)
+    return lambda: store.contracts.indices(contracts), n
+
+
+@benchmark('inventory_load', sizes=(1_000, 10_000, 50_000))
+def inventory_load(n):
+    legs = [{'symbol': symbol, 'expiry': expiry, 'strike': strike, 'right': right, 'quantity': 1 - 2 * (i % 2),
+             'strategy': 'Spread'} for i, (symbol, expiry, strike, right) in enumerate(chain_keys(n))]
+    raw = {'SPX': {'strategies': [{'name': f"spread-{i}", 'options': legs[i:i + 2]} for i in range(0, n, 2)]}}
+
+    def run():
+        portfolio = Portfolio(**raw)
+        InventoryLoader.load(portfolio)
+        InventoryLoader.index(portfolio)
+    return run, n
+
+
+@benchmark('snapshot_record_drain', sizes=CHAIN_SIZES)
+def snapshot_record_drain(n, cycles=20):
+    rng = np.random.default_rng(3)
+    store = SnapshotStore(contract_capacity=n, max_cycles=cycles)
+    indices = np.array([store.contracts.add_key(key) for key in chain_keys(n)], dtype=np.intp)
+    columns = chain_columns(rng, n)
+    start = datetime.now()
+
+    def run():
+        for i in range(cycles):
+            store.record(start + timedelta(seconds=i), indices, columns, 5000.0)
+        store.drain()
+    return run, n * cycles
+
+
+@benchmark('snapshot_parquet_write', sizes=(1_000, 10_000))
+def snapshot_parquet_write(n, cycles=20):
+    rng = np.random.default_rng(4)
+    store = SnapshotStore(contract_capacity=n, max_cycles=cycles)
+    indices = np.array([store.contracts.add_key(key) for key in chain_keys(n)], dtype=np.intp)
+    start = datetime.now()
+    for i in range(cycles):
+        store.record(start + timedelta(seconds=i), indices, chain_columns(rng, n), 5000.0)
+    frame = store.drain()
+    root = tempfile.mkdtemp(prefix='bench-snapshots-')
+
+    def run():
+        writer = ParquetSnapshotWriter(root, partition='symbol=SPX', max_queue=1)
+        writer(frame)
+        writer.close()
+        shutil.rmtree(root, ignore_errors=True)
+    return run, len(frame)
+
+
+@benchmark('end_to_end_ticks', sizes=(1_000, 10_000))
+def end_to_end_ticks(n, ticks_per_batch=500):
+    """Synthetic feed -> TickProcessor -> greeks fill, IV stats, alerts and snapshot recording."""
+    ib = FakeIB({'SPX': 5000.0}, expirations=8, strikes=-(-n // 16), seed=5)
+    tracker = SymbolTracker(ib, 'SPX', exchange='CBOE')
+    [chain] = ib.reqSecDefOptParams('SPX', '', 'IND', tracker.contract.conId)
+    contracts = ib.qualifyContracts(*[tracker.build_option(expiry, strike, right) for expiry in chain.expirations
+                                      for strike in chain.strikes for right in 'CP'])[:n]
+    tickers = [ib.reqMktData(contract) for contract in contracts]
+
+    config = AlertConfig()
+    settings = config.underlyings['SPX']
+    pipeline = ChainPipeline(OptionMonitor(contract_capacity=n, iv_window=config.iv_window),
+                             build_alert_engine(config, 'SPX', settings),
+                             greeks_engine=build_greeks_engine(config, settings))
+    processor = TickProcessor(ib, pipeline, tracker, coalesce_interval=0)
+    processor.watch(tickers)
+    processor.start()
+    ib.step(0)
+
+    return lambda: ib.step(ticks_per_batch), ticks_per_batch
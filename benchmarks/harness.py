@@ -0,0 +1,98 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+BENCHMARKS = {}
+
+
+def benchmark(name, sizes=(None,)):
+    """
+    Register a benchmark. The decorated function is called once per size with the size and returns
+    `(run, items)`: a zero-argument callable to time and the number of items (ticks, contracts,
+    positions...) one call processes. Setup cost stays outside the timed region.
+    """
+    def register(setup):
+        BENCHMARKS[name] = (setup, sizes)
+        return setup
+    return register
+
+
+def measure(run, min_time=1.0, max_rounds=200, min_rounds=3):
+    """Time `run` after one warm-up call until `min_time` has elapsed; returns the per-call durations."""
+    run()
+    durations = []
+    deadline = time.perf_counter() + min_time
+    while len(durations) < min_rounds or (len(durations) < max_rounds and time.perf_counter() < deadline):
+        started = time.perf_counter()
+        run()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(names=None, quick=False, min_time=1.0):
+    """Run the selected benchmarks (all by default); `quick` runs only the smallest size of each."""
+    results = []
+    machine = platform.node()
+    commit = git_commit()
+    stamp = datetime.now().isoformat(timespec='seconds')
+    for name, (setup, sizes) in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        for size in sizes[:1] if quick else sizes:
+            run, items = setup(size)
+            durations = measure(run, min_time=min_time)
+            median = statistics.median(durations)
+            results.append({
+                'timestamp': stamp,
+                'commit': commit,
+                'machine': machine,
+                'python': platform.python_version(),
+                'name': name,
+                'size': size,
+                'rounds': len(durations),
+                'median_s': median,
+                'min_s': min(durations),
+                'items_per_s': items / median if median else None,
+            })
+    return results
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(path, results):
+    with open(path, 'a') as f:
+        for result in results:
+            f.write(json.dumps(result) + '\n')
+
+
+def regressions(results, history, tolerance=0.2):
+    """
+    Results whose median is more than `tolerance` slower than the last recorded run of the same
+    benchmark and size on the same machine, as (result, baseline) pairs.
+    """
+    baseline = {}
+    for entry in history:
+        baseline[(entry['machine'], entry['name'], entry['size'])] = entry
+    slower = []
+    for result in results:
+        previous = baseline.get((result['machine'], result['name'], result['size']))
+        if previous and result['median_s'] > previous['median_s'] * (1 + tolerance):
+            slower.append((result, previous))
+    return slower
@@ -0,0 +1,44 @@
+import argparse
+import logging
+import os
+import sys
+
+import benchmarks.bench_monitoring  # noqa: F401 (registers the benchmarks)
+from benchmarks.harness import BENCHMARKS, append_history, load_history, regressions, run_benchmarks
+
+HISTORY_FILE = os.path.join(os.path.dirname(__file__), 'history.jsonl')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the monitoring hot path")
+    parser.add_argument('names', nargs='*', help=f"benchmarks to run (default all): {', '.join(BENCHMARKS)}")
+    parser.add_argument('--quick', action='store_true', help="only the smallest size of every benchmark")
+    parser.add_argument('--min-time', type=float, default=1.0, help="seconds to spend timing each case")
+    parser.add_argument('--history', default=HISTORY_FILE, help="JSON-lines file the results are appended to")
+    parser.add_argument('--no-save', action='store_true', help="compare against the history without appending")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="slowdown of the median against the previous run reported as a regression")
+    parser.add_argument('--fail-on-regression', action='store_true', help="exit with status 1 on regressions")
+    args = parser.parse_args()
+
+    # Synthetic chains trigger alerts on nearly every update, keep the output to the results
+    logging.disable(logging.WARNING)
+    results = run_benchmarks(args.names, quick=args.quick, min_time=args.min_time)
+    slower = regressions(results, load_history(args.history), args.tolerance)
+
+    print(f"{'benchmark':<24} {'size':>8} {'median':>12} {'min':>12} {'items/s':>14}")
+    for result in results:
+        print(f"{result['name']:<24} {result['size'] or '':>8} {result['median_s'] * 1e3:>10.3f}ms "
+              f"{result['min_s'] * 1e3:>10.3f}ms {result['items_per_s'] or 0:>14,.0f}")
+    for result, previous in slower:
+        print(f"REGRESSION {result['name']} [{result['size']}]: {result['median_s'] * 1e3:.3f}ms vs "
+              f"{previous['median_s'] * 1e3:.3f}ms at {previous['commit']}")
+
+    if not args.no_save:
+        append_history(args.history, results)
+    if slower and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,23 @@
 from ib_insync import *
 from datetime import datetime, timedelta
 import pandas as pd
-import time
-from collections import defaultdict
-import statistics
+
+from src.alerting.alerts import AlertAssetEngine, AlertOptionEngine
+from src.alerting.bus import build_alert_bus
+from src.config.config import AlertConfig
+from src.monitoring.monitor import OptionMonitor
+from src.monitoring.snapshot_store import ticker_columns
+from src.persistence.snapshot_writer import ParquetSnapshotWriter
+from src.service.qualifier import ContractQualifier
+from src.service.subscription_manager import SubscriptionManager
 
 # === ALERT CONFIGURATION ===
 LOW_THRESHOLD = 4500      # Alert if SPX < 4500
 HIGH_THRESHOLD = 5500     # Alert if SPX > 5500
 DELTA_ALERT_THRESHOLD = 0.5  # Alert if delta exceeds this value
 WATCHED_STRIKES = {5100, 5200, 5300}  # example: strike prices to monitor for delta alerts
+LOG_INTERVAL = 15         # seconds between snapshots
+MARKET_DATA_LINES = 200   # streaming subscriptions kept around the SPX price
 
 # Connect
 ib = IB()
@@ -48,95 +56,54 @@ for exp in valid_expirations:
     for strike in otm_puts:
         contracts.append(Option('SPX', exp, strike, 'P', 'SMART'))
 
-ib.qualifyContracts(*contracts)
-tickers = ib.reqMktData(contracts, '', True, False)
+contracts = ContractQualifier(ib).qualify(contracts)
+
+# Stream the contracts nearest to the SPX price, one subscription per contract
+subscriptions = SubscriptionManager(ib, max_lines=MARKET_DATA_LINES)
+subscriptions.set_candidates(contracts)
+subscriptions.rebalance(underlying_price, force=True)
+
+# Alerts are delivered from the bus threads, so a slow sink never delays the loop
+alert_bus = build_alert_bus(AlertConfig(alert_sinks=['stdout']))
 
 # Store logs
-snapshot_log = []
-iv_history = defaultdict(list)
-alerts_triggered = set()
-
-def get_iv_zscore(history, current_iv):
-    if len(history) < 5 or current_iv is None:
-        return None
-    mean = statistics.mean(history)
-    stdev = statistics.stdev(history)
-    if stdev == 0:
-        return 0
-    return round((current_iv - mean) / stdev, 2)
-
-# === ALERT CHECK ===
-def check_alerts(underlying_price, contract, greeks):
-    alerts = []
-
-    # Underlying alerts
-    if underlying_price < LOW_THRESHOLD and "under_below" not in alerts_triggered:
-        alerts_triggered.add("under_below")
-        alerts.append(f"⚠️ SPX dropped below {LOW_THRESHOLD}: {underlying_price}")
-
-    if underlying_price > HIGH_THRESHOLD and "under_above" not in alerts_triggered:
-        alerts_triggered.add("under_above")
-        alerts.append(f"⚠️ SPX spiked above {HIGH_THRESHOLD}: {underlying_price}")
-
-    # Delta alerts for selected strikes
-    if contract.strike in WATCHED_STRIKES and greeks and greeks.delta is not None:
-        if greeks.delta > DELTA_ALERT_THRESHOLD:
-            key = (contract.lastTradeDateOrContractMonth, contract.right, contract.strike, 'delta')
-            if key not in alerts_triggered:
-                alerts_triggered.add(key)
-                alerts.append(f"⚠️ {contract.right} {contract.strike} delta crossed {DELTA_ALERT_THRESHOLD}: {greeks.delta:.2f}")
-
-    return alerts
+SNAPSHOT_DIR = "snapshots"
+monitor = OptionMonitor(contract_capacity=len(contracts), max_cycles=240)
+store = monitor.snapshots
+asset_alert_engine = AlertAssetEngine(low_threshold=LOW_THRESHOLD, high_threshold=HIGH_THRESHOLD)
+option_alert_engine = AlertOptionEngine(delta_threshold=DELTA_ALERT_THRESHOLD, watched_strikes=WATCHED_STRIKES)
+
+writer = ParquetSnapshotWriter(SNAPSHOT_DIR, partition="symbol=SPX")
 
 # === Logging Loop ===
 try:
-    print("Logging every 15s with alert triggers (CTRL+C to exit)...")
+    print(f"Logging every {LOG_INTERVAL}s with alert triggers (CTRL+C to exit)...")
     while True:
-        ib.sleep(1.5)  # allow SPX to update
+        ib.sleep(LOG_INTERVAL)  # keeps the event loop running while the tickers stream in
         underlying_price = spx_ticker.last or spx_ticker.close
-        timestamp = datetime.now().isoformat()
-        snapshot = []
-
-        for ticker in tickers:
-            contract = ticker.contract
-            greeks = ticker.modelGreeks
-
-            iv = greeks.impliedVol if greeks else None
-            key = (contract.lastTradeDateOrContractMonth, contract.right, contract.strike)
-
-            if iv:
-                iv_history[key].append(iv)
-                iv_history[key] = iv_history[key][-50:]
-
-            iv_z = get_iv_zscore(iv_history[key], iv)
-
-            snapshot.append({
-                'timestamp': timestamp,
-                'expiration': contract.lastTradeDateOrContractMonth,
-                'right': contract.right,
-                'strike': contract.strike,
-                'bid': ticker.bid,
-                'ask': ticker.ask,
-                'last': ticker.last,
-                'delta': greeks.delta if greeks else None,
-                'theta': greeks.theta if greeks else None,
-                'iv': iv,
-                'iv_zscore': iv_z
-            })
-
-            # 🔔 Check and print alerts
-            for alert in check_alerts(underlying_price, contract, greeks):
-                print(alert)
-
-        snapshot_log.extend(snapshot)
-        print(f"[{timestamp}] Logged {len(snapshot)} entries")
-        time.sleep(15)
+        subscriptions.rebalance(underlying_price)
+        tickers = subscriptions.tickers
+        indices = store.contracts.indices([ticker.contract for ticker in tickers])
+        timestamp = datetime.now()
+        columns = ticker_columns(tickers)
+        columns['iv_zscore'] = monitor.update_iv(indices, columns['iv'])['iv_zscore']
+
+        # 🔔 Check alerts and hand them to the bus
+        alerts = asset_alert_engine.check(underlying_price)
+        alerts += option_alert_engine.check_batch(store.contracts, indices, columns)
+        alert_bus.publish('SPX', alerts, timestamp)
+
+        store.record(timestamp, indices, columns, underlying_price)
+        writer(store.drain())
+        print(f"[{timestamp.isoformat()}] Logged {len(indices)} entries")
 
 except KeyboardInterrupt:
     print("Stopped by user.")
 
 finally:
+    subscriptions.cancel_all()
     ib.disconnect()
-    df = pd.DataFrame(snapshot_log)
-    df.to_csv("spx_monitoring_with_alerts.csv", index=False)
-    print("Saved logs to spx_monitoring_with_alerts.csv")
+    writer(store.drain())
+    writer.close()
+    alert_bus.close()
+    print(f"Saved logs to {SNAPSHOT_DIR}")
@@ -1,4 +1,9 @@
 from abc import ABC, abstractmethod
+import operator
+
+import numpy as np
+
+from src.monitoring.snapshot_store import encode_strike
 
 class AlertEngine(ABC):
     def __init__(self):
@@ -16,7 +21,8 @@ class AlertEngine(ABC):
 
 
 class AlertAssetEngine(AlertEngine):
-    def __init__(self, low_threshold=4500, high_threshold=5500):
+    def __init__(self, low_threshold=4500, high_threshold=5500, symbol='SPX'):
+        self.symbol = symbol
         self.low_threshold = low_threshold
         self.high_threshold = high_threshold
         self.alerts_triggered = set()
@@ -25,21 +31,72 @@ class AlertAssetEngine(AlertEngine):
         alerts = []
         if underlying_price < self.low_threshold and "under_below" not in self.alerts_triggered:
             self.alerts_triggered.add("under_below")
-            alerts.append(f"⚠️ SPX dropped below {self.low_threshold}: {underlying_price}")
+            alerts.append(f"⚠️ {self.symbol} dropped below {self.low_threshold}: {underlying_price}")
 
         if underlying_price > self.high_threshold and "under_above" not in self.alerts_triggered:
             self.alerts_triggered.add("under_above")
-            alerts.append(f"⚠️ SPX spiked above {self.high_threshold}: {underlying_price}")
+            alerts.append(f"⚠️ {self.symbol} spiked above {self.high_threshold}: {underlying_price}")
         return alerts
 
 
 class AlertOptionEngine(AlertEngine):
+    # Bits of the per-contract dedup flags used by check_batch
+    DELTA, GAMMA, THETA = 1, 2, 4
+
     def __init__(self, delta_threshold=0.5, gamma_threshold=None, theta_threshold=None, watched_strikes=None):
         self.delta_threshold = delta_threshold
         self.gamma_threshold = gamma_threshold
         self.theta_threshold = theta_threshold
         self.watched_strikes = watched_strikes or set()
         self.alerts_triggered = set()
+        self.triggered_flags = np.zeros(0, dtype=np.uint8)
+        self._watched_mask = np.zeros(0, dtype=bool)
+
+    def watched_mask(self, contracts):
+        """Boolean mask over the contract index marking watched strikes; rebuilt only when contracts are added."""
+        n = len(contracts)
+        if len(self._watched_mask) != n:
+            watched = [encode_strike(strike) for strike in self.watched_strikes]
+            self._watched_mask = np.isin(contracts.strike_fp[:n], watched)
+        return self._watched_mask
+
+    def check_batch(self, contracts, indices, columns):
+        """
+        Evaluate the whole chain in one pass.
+
+        `contracts` is the `ContractIndex` of the snapshot store, `indices` the (unique) contract indices
+        of this update and `columns` the greeks arrays aligned with `indices` (see `ticker_columns`).
+        Each contract keeps a bitset of the greeks that already fired instead of tuple keys.
+        """
+        alerts = []
+        indices = np.asarray(indices, dtype=np.intp)
+        if len(self.triggered_flags) < len(contracts):
+            flags = np.zeros(contracts.capacity, dtype=np.uint8)
+            flags[:len(self.triggered_flags)] = self.triggered_flags
+            self.triggered_flags = flags
+        watched = self.watched_mask(contracts)[indices]
+        if not watched.any():
+            return alerts
+
+        rules = (
+            (self.DELTA, 'delta', self.delta_threshold, operator.gt, 'crossed'),
+            (self.GAMMA, 'gamma', self.gamma_threshold, operator.gt, 'crossed'),
+            (self.THETA, 'theta', self.theta_threshold, operator.lt, 'dropped below'),
+        )
+        for bit, field, threshold, compare, verb in rules:
+            values = columns.get(field)
+            if threshold is None or values is None:
+                continue
+            with np.errstate(invalid='ignore'):
+                hit = watched & compare(values, threshold) & ((self.triggered_flags[indices] & bit) == 0)
+            if not hit.any():
+                continue
+            fired = indices[hit]
+            self.triggered_flags[fired] |= bit
+            for idx, value in zip(fired, values[hit]):
+                _, _, strike, right = contracts.key(idx)
+                alerts.append(f"⚠️ {right} {strike} {field} {verb} {threshold}: {value:.2f}")
+        return alerts
 
     def check(self, contract, greeks):
         alerts = []
@@ -64,3 +121,24 @@ class AlertOptionEngine(AlertEngine):
                 self.mark_triggered(key)
                 alerts.append(f"⚠️ {contract.right} {contract.strike} theta dropped below {self.theta_threshold}: {greeks.theta:.2f}")
         return alerts
+
+
+class AlertAggregateEngine(AlertEngine):
+    """Alerts when a net greek of a strategy, an underlying or the portfolio exceeds an absolute limit."""
+    def __init__(self, thresholds=None):
+        self.thresholds = thresholds or {}
+        self.alerts_triggered = set()
+
+    def check(self, totals):
+        alerts = []
+        for level, groups in totals.items():
+            for name, greeks in groups.items():
+                for greek, limit in self.thresholds.items():
+                    value = greeks.get(greek)
+                    if value is None or abs(value) <= limit:
+                        continue
+                    key = (level, name, greek)
+                    if not self.has_been_triggered(key):
+                        self.mark_triggered(key)
+                        alerts.append(f"⚠️ {level} {name} net {greek} beyond ±{limit}: {value:.2f}")
+        return alerts
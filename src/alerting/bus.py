@@ -0,0 +1,236 @@
+import json
+import logging
+import sys
+import threading
+import time
+import urllib.request
+from collections import deque
+from datetime import datetime
+from typing import NamedTuple
+
+
+class Alert(NamedTuple):
+    timestamp: datetime
+    symbol: str
+    message: str
+
+
+class LogSink:
+    """Alerts as log records (the `monitor.log` file and console handlers of `main.py`)."""
+    def __init__(self, level=logging.WARNING):
+        self.level = level
+
+    def __call__(self, alerts):
+        for alert in alerts:
+            logging.log(self.level, alert.message)
+
+
+class StdoutSink:
+    def __call__(self, alerts):
+        sys.stdout.write(''.join(f"{alert.timestamp.isoformat()} {alert.symbol} {alert.message}\n"
+                                 for alert in alerts))
+        sys.stdout.flush()
+
+
+class FileSink:
+    """Appends one line per alert; the file is flushed once per batch."""
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def __call__(self, alerts):
+        self._file.write(''.join(f"{alert.timestamp.isoformat()}\t{alert.symbol}\t{alert.message}\n"
+                                 for alert in alerts))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class WebhookSink:
+    """POSTs every batch as a JSON list to `url` (a local notifier, chat webhook relay...)."""
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, alerts):
+        body = json.dumps([{'timestamp': alert.timestamp.isoformat(), 'symbol': alert.symbol,
+                            'message': alert.message} for alert in alerts]).encode()
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def coalesce(alerts, above, examples=3):
+    """
+    Replace the alerts of every symbol that has more than `above` of them in the batch (a storm, e.g. a
+    gap moving 200 strikes through a threshold at once) with one summary alert.
+    """
+    if not above:
+        return list(alerts)
+    counts = {}
+    for alert in alerts:
+        counts[alert.symbol] = counts.get(alert.symbol, 0) + 1
+    storms = {}
+    for alert in alerts:
+        if counts[alert.symbol] > above:
+            storms.setdefault(alert.symbol, []).append(alert)
+    if not storms:
+        return list(alerts)
+    result, summarized = [], set()
+    for alert in alerts:
+        if alert.symbol not in storms:
+            result.append(alert)
+        elif alert.symbol not in summarized:
+            summarized.add(alert.symbol)
+            storm = storms[alert.symbol]
+            span = (storm[-1].timestamp - storm[0].timestamp).total_seconds()
+            shown = '; '.join(item.message for item in storm[:examples])
+            result.append(Alert(storm[0].timestamp, alert.symbol,
+                                f"⚠️ {alert.symbol}: {len(storm)} alerts within {span:.1f}s, e.g. {shown}"))
+    return result
+
+
+class SinkWorker:
+    """
+    One sink behind its own bounded queue and delivery thread, so a slow sink only delays itself.
+
+    The thread waits `flush_interval` after the first alert to collect the rest of a burst, coalesces
+    storms (see `coalesce`) and hands the sink batches of at most `batch_size` alerts. When the queue is
+    full, `overflow='drop_oldest'` discards the oldest queued alerts, `'drop_newest'` the incoming ones;
+    both are counted in `dropped`. `delivered` counts the alerts handed to the sink after coalescing.
+    """
+    def __init__(self, sink, name, max_queue=10000, overflow='drop_oldest', batch_size=100, flush_interval=0.25,
+                 coalesce_above=20):
+        if overflow not in ('drop_oldest', 'drop_newest'):
+            raise ValueError(f"Unsupported overflow policy: {overflow}")
+        self.sink = sink
+        self.name = name
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.coalesce_above = coalesce_above
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue = deque()
+        self._ready = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name=f"alert-sink-{name}", daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def offer(self, alerts):
+        with self._ready:
+            room = self.max_queue - len(self._queue)
+            if len(alerts) > room:
+                if self.overflow == 'drop_newest':
+                    self.dropped += len(alerts) - max(room, 0)
+                    alerts = alerts[:max(room, 0)]
+                else:
+                    excess = min(len(alerts) - room, len(self._queue))
+                    for _ in range(excess):
+                        self._queue.popleft()
+                    self.dropped += excess + max(len(alerts) - self.max_queue, 0)
+                    alerts = alerts[-self.max_queue:]
+            self._queue.extend(alerts)
+            self._ready.notify()
+
+    def close(self, timeout=10):
+        """Deliver what is queued and stop the thread."""
+        with self._ready:
+            self._stopping = True
+            self._ready.notify()
+        self._thread.join(timeout)
+        close = getattr(self.sink, 'close', None)
+        if close is not None:
+            close()
+
+    def _take(self):
+        with self._ready:
+            while not self._queue and not self._stopping:
+                self._ready.wait()
+            if not self._queue:
+                return None
+        if not self._stopping and self.flush_interval:
+            # Let the rest of a burst arrive so it is delivered (and coalesced) as one batch
+            time.sleep(self.flush_interval)
+        with self._ready:
+            taken, self._queue = list(self._queue), deque()
+            return taken
+
+    def _run(self):
+        while True:
+            taken = self._take()
+            if taken is None:
+                return
+            alerts = coalesce(taken, self.coalesce_above)
+            self.coalesced += len(taken) - len(alerts)
+            for start in range(0, len(alerts), self.batch_size):
+                batch = alerts[start:start + self.batch_size]
+                try:
+                    self.sink(batch)
+                    self.delivered += len(batch)
+                except Exception as e:
+                    self.failed += len(batch)
+                    logging.error(f"Alert sink {self.name} failed to deliver {len(batch)} alerts: {e}")
+
+
+class AlertBus:
+    """
+    Fans alerts out to the sinks without ever blocking the caller: `publish` only appends to each sink's
+    bounded queue (see `SinkWorker`), delivery, batching and coalescing happen on the sinks' threads.
+    """
+    def __init__(self, sinks, **options):
+        self.workers = [SinkWorker(sink, name, **options) for name, sink in sinks.items()]
+        self.published = 0
+
+    @property
+    def dropped(self):
+        return sum(worker.dropped for worker in self.workers)
+
+    @property
+    def delivered(self):
+        return sum(worker.delivered for worker in self.workers)
+
+    def publish(self, symbol, messages, timestamp=None):
+        if not messages:
+            return
+        timestamp = timestamp or datetime.now()
+        alerts = [Alert(timestamp, symbol, message) for message in messages]
+        self.published += len(alerts)
+        for worker in self.workers:
+            worker.offer(alerts)
+
+    def publisher(self, symbol):
+        """`ChainPipeline` alert sink for one underlying."""
+        return lambda timestamp, messages: self.publish(symbol, messages, timestamp)
+
+    def close(self, timeout=10):
+        for worker in self.workers:
+            worker.close(timeout)
+
+
+def build_alert_bus(config):
+    """Alert bus with the sinks listed in `alert_sinks` ('log', 'stdout', 'file', 'webhook')."""
+    sinks = {}
+    for name in config.alert_sinks:
+        if name == 'log':
+            sinks[name] = LogSink()
+        elif name == 'stdout':
+            sinks[name] = StdoutSink()
+        elif name == 'file':
+            sinks[name] = FileSink(config.alert_file)
+        elif name == 'webhook':
+            if not config.alert_webhook_url:
+                raise ValueError("alert_sinks lists 'webhook' but alert_webhook_url is not set")
+            sinks[name] = WebhookSink(config.alert_webhook_url)
+        else:
+            raise ValueError(f"Unsupported alert sink: {name}")
+    return AlertBus(sinks, max_queue=config.alert_queue_size, overflow=config.alert_overflow,
+                    batch_size=config.alert_batch_size, flush_interval=config.alert_flush_interval,
+                    coalesce_above=config.alert_coalesce_above)
@@ -0,0 +1,234 @@
+import time
+from datetime import datetime
+
+import numpy as np
+import yaml
+
+from src.config.config import AlertRule
+from src.monitoring.snapshot_store import encode_strike
+
+
+VERBS = {'>': 'crossed', '>=': 'crossed', '<': 'dropped below', '<=': 'dropped below'}
+DEFAULT_MESSAGES = {
+    'option': "⚠️ {right} {strike} {field} {verb} {threshold:g}: {value:.2f}",
+    'underlying': "⚠️ {symbol} {field} {verb} {threshold:g}: {value:.2f}",
+    'aggregate': "⚠️ {level} {group} net {field} {verb} {threshold:g}: {value:.2f}",
+}
+
+# Option fields computed from the quote columns when a rule asks for them
+DERIVED_FIELDS = {
+    'mid': lambda columns: 0.5 * (columns['bid'] + columns['ask']),
+    'spread': lambda columns: columns['ask'] - columns['bid'],
+    'spread_pct': lambda columns: (columns['ask'] - columns['bid']) / (0.5 * (columns['bid'] + columns['ask'])),
+}
+
+
+def legacy_rules(config, settings=None):
+    """The fixed thresholds of `AlertConfig` (and the underlying's `UnderlyingConfig`) as rules."""
+    low = settings.low_threshold if settings is not None and settings.low_threshold is not None else config.low_threshold
+    high = settings.high_threshold if settings is not None and settings.high_threshold is not None \
+        else config.high_threshold
+    rules = [
+        AlertRule(name='under_below', scope='underlying', field='price', op='<', threshold=low,
+                  hysteresis=config.price_rule_hysteresis, cooldown=config.price_rule_cooldown,
+                  message="⚠️ {symbol} dropped below {threshold:g}: {value:g}"),
+        AlertRule(name='under_above', scope='underlying', field='price', op='>', threshold=high,
+                  hysteresis=config.price_rule_hysteresis, cooldown=config.price_rule_cooldown,
+                  message="⚠️ {symbol} spiked above {threshold:g}: {value:g}"),
+    ]
+    for field, threshold, op in (('delta', config.delta_threshold, '>'), ('gamma', config.gamma_threshold, '>'),
+                                 ('theta', config.theta_threshold, '<')):
+        if threshold is not None:
+            rules.append(AlertRule(name=field, field=field, op=op, threshold=threshold,
+                                   hysteresis=config.greek_rule_hysteresis, cooldown=config.greek_rule_cooldown,
+                                   strikes=set(config.watched_strikes)))
+    for greek, limit in config.aggregate_thresholds.items():
+        rules.append(AlertRule(name=f"net_{greek}", scope='aggregate', field=greek, threshold=limit, absolute=True,
+                               message="⚠️ {level} {group} net {field} beyond ±{threshold:g}: {value:.2f}"))
+    return rules
+
+
+def load_rules(path):
+    """Rules from a YAML file holding a list of rules, or a mapping with a `rules` list."""
+    with open(path) as f:
+        data = yaml.safe_load(f) or []
+    if isinstance(data, dict):
+        data = data.get('rules', [])
+    return [AlertRule.model_validate(rule) for rule in data]
+
+
+def alert_rules(config, settings=None):
+    """
+    Legacy thresholds, then `alert_rules`, then the rules of `alert_rules_file`; a rule replaces an earlier
+    one of the same name (e.g. `delta` with a hysteresis band).
+    """
+    rules = legacy_rules(config, settings) + list(config.alert_rules)
+    if config.alert_rules_file:
+        rules += load_rules(config.alert_rules_file)
+    return list({rule.name: rule for rule in rules}.values())
+
+
+class RuleSet:
+    """
+    Rules of one scope compiled into arrays, so a cycle evaluates all of them over all updated slots
+    (contracts, or aggregate groups) with a handful of array operations, whatever the number of rules.
+
+    Values are laid out (slot, rule) and comparisons normalized to `sign * value > sign * threshold`.
+    Each (slot, rule) pair keeps an armed flag and, for rules with a cooldown, the time it last fired.
+    """
+    def __init__(self, rules, symbol=None):
+        self.rules = list(rules)
+        self.fields = sorted({rule.field for rule in self.rules})
+        self.field_cols = np.array([self.fields.index(rule.field) for rule in self.rules], dtype=np.intp)
+        self.thresholds = np.array([rule.thresholds.get(symbol, rule.threshold) for rule in self.rules])
+        self.sign = np.array([1.0 if rule.op.startswith('>') else -1.0 for rule in self.rules])
+        self.limit = self.sign * self.thresholds
+        self.rearm = self.limit - np.array([abs(rule.hysteresis) for rule in self.rules])
+        self.inclusive = np.array([rule.op.endswith('=') for rule in self.rules], dtype=bool)
+        self.absolute = np.array([rule.absolute for rule in self.rules], dtype=bool)
+        self.cooldown = np.array([rule.cooldown for rule in self.rules], dtype=np.float64)
+        self.armed = np.ones((0, len(self.rules)), dtype=bool)
+        self.fired_at = np.full((0, len(self.rules)), -np.inf)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _grow(self, capacity):
+        if len(self.armed) >= capacity:
+            return
+        armed = np.ones((capacity, len(self.rules)), dtype=bool)
+        fired_at = np.full((capacity, len(self.rules)), -np.inf)
+        armed[:len(self.armed)] = self.armed
+        fired_at[:len(self.fired_at)] = self.fired_at
+        self.armed, self.fired_at = armed, fired_at
+
+    def evaluate(self, slots, values, timestamp, eligible=None, capacity=None):
+        """
+        `values` is a (len(slots), len(fields)) array. Returns the batch positions, the rule rows and the
+        values of the (slot, rule) pairs that fired.
+        """
+        self._grow(capacity or (int(slots.max()) + 1 if len(slots) else 0))
+        s = values[:, self.field_cols]
+        with np.errstate(invalid='ignore'):
+            if self.absolute.any():
+                np.abs(s, out=s, where=self.absolute)
+            s *= self.sign
+            breach = s > self.limit
+            recovered = s <= self.rearm
+            if self.inclusive.any():
+                breach |= self.inclusive & (s == self.limit)
+                recovered &= ~breach
+        was_armed = self.armed[slots]
+        armed = was_armed | recovered
+        fire = breach & armed
+        if eligible is not None:
+            fire &= eligible
+        if self.cooldown.any():
+            fire &= timestamp - self.fired_at[slots] >= self.cooldown
+        armed &= ~fire
+        # Write back only the pairs whose state changed, most of the chain stays as it was
+        changed = np.flatnonzero(armed != was_armed)
+        if len(changed):
+            at, rule = np.divmod(changed, len(self.rules))
+            self.armed[slots[at], rule] = armed[at, rule]
+        cols, rows = np.divmod(np.flatnonzero(fire), len(self.rules))
+        self.fired_at[slots[cols], rows] = timestamp
+        return cols, rows, values[cols, self.field_cols[rows]]
+
+    def format(self, row, value, **subject):
+        rule = self.rules[row]
+        template = rule.message or DEFAULT_MESSAGES[rule.scope]
+        return template.format(rule=rule.name, field=rule.field, op=rule.op, verb=VERBS[rule.op],
+                               threshold=self.thresholds[row], value=value, **subject)
+
+
+class RuleEngine:
+    """
+    Alert rules of one underlying (see `AlertRule`), evaluated by scope: `check` for the underlying price and IV,
+    `check_batch` over the columnar chain update, `check_totals` over the net greeks of `GreeksAggregator`.
+    Unlike the fixed-threshold engines, every rule re-arms, so a second breach later in the day is reported.
+    """
+    def __init__(self, rules, symbol=None):
+        self.symbol = symbol
+        rules = [rule for rule in rules if rule.symbols is None or symbol is None or symbol in rule.symbols]
+        self.option_rules = RuleSet([rule for rule in rules if rule.scope == 'option'], symbol)
+        self.underlying_rules = RuleSet([rule for rule in rules if rule.scope == 'underlying'], symbol)
+        self.aggregate_rules = RuleSet([rule for rule in rules if rule.scope == 'aggregate'], symbol)
+        self._filters = [(rule.strikes, rule.rights) for rule in self.option_rules.rules]
+        self._eligible = np.ones((0, len(self.option_rules)), dtype=bool)
+        self._groups = {}
+
+    @staticmethod
+    def _seconds(timestamp):
+        if timestamp is None:
+            return time.time()
+        return timestamp.timestamp() if isinstance(timestamp, datetime) else float(timestamp)
+
+    def eligible(self, contracts):
+        """
+        (contract, rule) mask of the strike and right filters, or None when no rule filters; rebuilt only
+        when contracts are added.
+        """
+        if all(strikes is None and rights is None for strikes, rights in self._filters):
+            return None
+        n = len(contracts)
+        if len(self._eligible) != n:
+            eligible = np.ones((n, len(self._filters)), dtype=bool)
+            for row, (strikes, rights) in enumerate(self._filters):
+                if strikes is not None:
+                    eligible[:, row] &= np.isin(contracts.strike_fp[:n], [encode_strike(strike) for strike in strikes])
+                if rights is not None:
+                    eligible[:, row] &= np.isin(contracts.right[:n], [right.encode() for right in rights])
+            self._eligible = eligible
+        return self._eligible
+
+    def check(self, underlying_price, timestamp=None, fields=None):
+        """Evaluate the underlying rules on `price` and the other underlying `fields` (e.g. `iv_rank`)."""
+        rules = self.underlying_rules
+        if not len(rules):
+            return []
+        fields = {'price': underlying_price, **(fields or {})}
+        row = [fields.get(field) for field in rules.fields]
+        if all(value is None for value in row):
+            return []
+        values = np.array([[np.nan if value is None else float(value) for value in row]])
+        _, rows, fired = rules.evaluate(np.zeros(1, dtype=np.intp), values, self._seconds(timestamp), capacity=1)
+        return [rules.format(row, value, symbol=self.symbol) for row, value in zip(rows, fired)]
+
+    def check_batch(self, contracts, indices, columns, timestamp=None):
+        """Evaluate every option rule over the contracts of this update (unique indices into `contracts`)."""
+        rules = self.option_rules
+        if not len(rules):
+            return []
+        indices = np.asarray(indices, dtype=np.intp)
+        eligible = self.eligible(contracts)
+        if eligible is not None:
+            eligible = eligible[indices]
+            if not eligible.any():
+                return []
+        values = np.full((len(indices), len(rules.fields)), np.nan)
+        for col, field in enumerate(rules.fields):
+            if field in columns:
+                values[:, col] = columns[field]
+            elif field in DERIVED_FIELDS and 'bid' in columns and 'ask' in columns:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    values[:, col] = DERIVED_FIELDS[field](columns)
+        cols, rows, fired = rules.evaluate(indices, values, self._seconds(timestamp), eligible, contracts.capacity)
+        alerts = []
+        for row, idx, value in zip(rows, indices[cols], fired):
+            symbol, expiry, strike, right = contracts.key(idx)
+            alerts.append(rules.format(row, value, symbol=symbol, expiry=expiry, strike=strike, right=right))
+        return alerts
+
+    def check_totals(self, totals, timestamp=None):
+        """Evaluate the aggregate rules over `GreeksAggregator.totals()` (level -> group -> greek -> value)."""
+        rules = self.aggregate_rules
+        if not len(rules):
+            return []
+        keys = [(level, group) for level, groups in totals.items() for group in groups]
+        slots = np.array([self._groups.setdefault(key, len(self._groups)) for key in keys], dtype=np.intp)
+        values = np.array([[totals[level][group].get(field, np.nan) for field in rules.fields]
+                           for level, group in keys], dtype=np.float64).reshape(len(keys), len(rules.fields))
+        cols, rows, fired = rules.evaluate(slots, values, self._seconds(timestamp), capacity=len(self._groups))
+        return [rules.format(row, value, level=keys[col][0], group=keys[col][1])
+                for row, col, value in zip(rows, cols, fired)]
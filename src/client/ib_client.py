@@ -1,49 +1,57 @@
+import asyncio
 import os
 import logging
 from ib_insync import IB
-import time
 
 
 class IBClient:
-    """Client wrapper for IB connection with retry, logging, and health check."""
-    def __init__(self):
+    """Client wrapper for IB connection with retry (exponential backoff), logging, and health check."""
+    def __init__(self, ib=None):
         self.host = os.getenv("IB_HOST", "127.0.0.1")
-        self.port = int(os.getenv("IB_PORT", 4001)) # 7497 for TWS, 4002 for IB Gateway 
+        self.port = int(os.getenv("IB_PORT", 4001)) # 7497 for TWS, 4002 for IB Gateway
         self.client_id = int(os.getenv("IB_CLIENT_ID", 12345678))
         self.timeout = int(os.getenv("IB_TIMEOUT", 30))  # seconds
-        self.max_retries = int(os.getenv("IB_RETRIES", 1))
-        self.retry_delay = int(os.getenv("IB_RETRY_DELAY", 3))  # seconds
-        self.ib = IB()
+        self.max_retries = int(os.getenv("IB_RETRIES", 5))
+        self.retry_delay = float(os.getenv("IB_RETRY_DELAY", 1))  # seconds, doubled after every failed attempt
+        self.max_retry_delay = float(os.getenv("IB_RETRY_MAX_DELAY", 60))  # seconds
+        self.ib = ib if ib is not None else IB()
+
+    def backoff(self, attempt):
+        """Delay before retrying after the `attempt`-th consecutive failure (1-based)."""
+        return min(self.retry_delay * 2 ** (attempt - 1), self.max_retry_delay)
 
     def connect(self):
+        """Blocking connect for startup, before the event loop runs."""
+        return self.ib.run(self.connect_async())
+
+    async def connect_async(self, max_retries=None):
+        """Connect, retrying with exponential backoff; `max_retries=0` retries until connected."""
+        max_retries = self.max_retries if max_retries is None else max_retries
         attempt = 0
-        while attempt < self.max_retries:
+        while True:
             try:
                 logging.info(f"Connecting to IB at {self.host}:{self.port} with client ID {self.client_id}...")
-                _connection = self.ib.connect(self.host, self.port, clientId=self.client_id, timeout=self.timeout)
-                print(f'IB connection: {_connection}')
-                time.sleep(2)
+                await self.ib.connectAsync(self.host, self.port, clientId=self.client_id, timeout=self.timeout)
                 if self.ib.isConnected():
                     logging.info("Successfully connected to Interactive Brokers API.")
                     return self.ib
-                else:
-                    raise ConnectionError("Connection established but isConnected() returned False")
+                raise ConnectionError("Connection established but isConnected() returned False")
 
             except Exception as e:
-                logging.warning(f"Connection attempt {attempt + 1} failed: {e}")
                 attempt += 1
-                time.sleep(self.retry_delay)
-        
-        raise ConnectionError("Unable to connect to IB after multiple attempts.")
+                if max_retries and attempt >= max_retries:
+                    raise ConnectionError(f"Unable to connect to IB after {attempt} attempts.") from e
+                delay = self.backoff(attempt)
+                logging.warning(f"Connection attempt {attempt} failed: {e}; retrying in {delay:g}s")
+                await asyncio.sleep(delay)
 
     def is_connected(self):
         """Returns True if the IB client is currently connected."""
         return self.ib.isConnected()
 
     def ensure_connected(self):
-        """Reconnect if the connection is lost."""
+        """Reconnect if the connection is lost; a healthy connection is left alone."""
         if not self.is_connected():
             logging.info("IB connection lost. Reconnecting...")
             self.connect()
-        self.ib.connect(self.host, self.port, clientId=self.client_id)
         return self.ib
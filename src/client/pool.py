@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import zlib
+from collections import Counter
+
+from eventkit import Event
+
+from src.client.ib_client import IBClient
+
+
+class IBConnectionPool:
+    """
+    Several IB API connections (one client ID each) behind the `IB` calls the monitor uses.
+
+    Requests are sharded across the connections, so socket decoding and per-client pacing limits are
+    spread out and one busy chain cannot stall the others:
+    - `shard_by='underlying'`: every underlying is pinned to one connection (the least loaded one when
+      first seen), so its chain discovery, qualification and market data share a socket;
+    - `shard_by='hash'`: contracts are spread by a stable hash of their identity, splitting even one chain.
+
+    `pendingTickersEvent` merges the ticker streams of all connections and `disconnectedEvent` fires when
+    any of them drops. The pool also offers `connect_async`, so a `ConnectionSupervisor` can supervise it
+    like a single `IBClient` (only the dropped connections are reopened).
+    """
+    def __init__(self, clients, shard_by='underlying'):
+        if shard_by not in ('underlying', 'hash'):
+            raise ValueError(f"Unsupported shard_by: {shard_by}")
+        self.clients = list(clients)
+        self.shard_by = shard_by
+        self.ib = self
+        self.pendingTickersEvent = Event('pendingTickersEvent')
+        self.disconnectedEvent = Event('disconnectedEvent')
+        self._symbols = {}
+        self._subscriptions = {}
+        for shard, client in enumerate(self.clients):
+            client.ib.pendingTickersEvent += self.pendingTickersEvent.emit
+            client.ib.disconnectedEvent += lambda shard=shard: self._on_disconnected(shard)
+
+    @classmethod
+    def create(cls, size, shard_by='underlying'):
+        """`size` IBClients configured from the environment, with consecutive client IDs."""
+        clients = []
+        for i in range(size):
+            client = IBClient()
+            client.client_id += i
+            clients.append(client)
+        return cls(clients, shard_by)
+
+    # Connection
+
+    def connect(self):
+        return self.clients[0].ib.run(self.connect_async())
+
+    async def connect_async(self, max_retries=None):
+        pending = [client for client in self.clients if not client.is_connected()]
+        await asyncio.gather(*(client.connect_async(max_retries) for client in pending))
+        return self
+
+    def disconnect(self):
+        for client in self.clients:
+            client.ib.disconnect()
+
+    def isConnected(self):
+        return all(client.is_connected() for client in self.clients)
+
+    def is_connected(self):
+        return self.isConnected()
+
+    def run(self, *awaitables, timeout=None):
+        return self.clients[0].ib.run(*awaitables, timeout=timeout)
+
+    def sleep(self, *args):
+        return self.clients[0].ib.sleep(*args)
+
+    def _on_disconnected(self, shard):
+        # IB dropped the session of that connection, its tickers are dead
+        self._subscriptions = {key: entry for key, entry in self._subscriptions.items() if entry[0] != shard}
+        logging.warning(f"IB connection {self.clients[shard].client_id} (shard {shard}) disconnected")
+        self.disconnectedEvent.emit()
+
+    # Sharding
+
+    @staticmethod
+    def _key(contract):
+        return (contract.secType, contract.symbol, contract.lastTradeDateOrContractMonth,
+                float(contract.strike), contract.right)
+
+    def shard_of_symbol(self, symbol):
+        shard = self._symbols.get(symbol)
+        if shard is None:
+            load = Counter(self._symbols.values())
+            shard = self._symbols[symbol] = min(range(len(self.clients)), key=lambda i: load[i])
+        return shard
+
+    def shard(self, contract):
+        if self.shard_by == 'hash':
+            return zlib.crc32(repr(self._key(contract)).encode()) % len(self.clients)
+        return self.shard_of_symbol(contract.symbol)
+
+    def _ib(self, shard):
+        return self.clients[shard].ib
+
+    def _group(self, contracts):
+        groups = {}
+        for contract in contracts:
+            groups.setdefault(self.shard(contract), []).append(contract)
+        return groups
+
+    # Requests
+
+    def qualifyContracts(self, *contracts):
+        return self.run(self.qualifyContractsAsync(*contracts))
+
+    async def qualifyContractsAsync(self, *contracts):
+        groups = self._group(contracts)
+        await asyncio.gather(*(self._ib(shard).qualifyContractsAsync(*group) for shard, group in groups.items()))
+        return [contract for contract in contracts if contract.conId]
+
+    def reqSecDefOptParams(self, underlyingSymbol, futFopExchange, underlyingSecType, underlyingConId):
+        return self._ib(self.shard_of_symbol(underlyingSymbol)).reqSecDefOptParams(
+            underlyingSymbol, futFopExchange, underlyingSecType, underlyingConId)
+
+    async def reqSecDefOptParamsAsync(self, underlyingSymbol, futFopExchange, underlyingSecType, underlyingConId):
+        return await self._ib(self.shard_of_symbol(underlyingSymbol)).reqSecDefOptParamsAsync(
+            underlyingSymbol, futFopExchange, underlyingSecType, underlyingConId)
+
+    def reqHistoricalData(self, contract, endDateTime, durationStr, barSizeSetting, whatToShow, useRTH,
+                          formatDate=1, keepUpToDate=False, chartOptions=None, timeout=60):
+        return self.run(self.reqHistoricalDataAsync(contract, endDateTime, durationStr, barSizeSetting, whatToShow,
+                                                    useRTH, formatDate, keepUpToDate, chartOptions, timeout))
+
+    async def reqHistoricalDataAsync(self, contract, endDateTime, durationStr, barSizeSetting, whatToShow, useRTH,
+                                     formatDate=1, keepUpToDate=False, chartOptions=None, timeout=60):
+        # Historical requests are paced per client, spreading underlyings spreads the budget
+        return await self._ib(self.shard_of_symbol(contract.symbol)).reqHistoricalDataAsync(
+            contract, endDateTime, durationStr, barSizeSetting, whatToShow, useRTH, formatDate, keepUpToDate,
+            chartOptions or [], timeout)
+
+    def reqMktData(self, contract, genericTickList='', snapshot=False, regulatorySnapshot=False,
+                   mktDataOptions=None):
+        """Subscribe on the contract's shard; a contract already streaming on a live connection keeps its ticker."""
+        key = self._key(contract)
+        entry = self._subscriptions.get(key)
+        if entry is not None:
+            return entry[1]
+        shard = self.shard(contract)
+        ticker = self._ib(shard).reqMktData(contract, genericTickList, snapshot, regulatorySnapshot,
+                                            mktDataOptions or [])
+        self._subscriptions[key] = (shard, ticker)
+        return ticker
+
+    def cancelMktData(self, contract):
+        entry = self._subscriptions.pop(self._key(contract), None)
+        shard = entry[0] if entry is not None else self.shard(contract)
+        self._ib(shard).cancelMktData(contract)
+
+    def load(self):
+        """Number of market data subscriptions per connection."""
+        counts = Counter(shard for shard, _ in self._subscriptions.values())
+        return [counts[shard] for shard in range(len(self.clients))]
@@ -0,0 +1,58 @@
+import asyncio
+import logging
+import time
+
+
+class ConnectionSupervisor:
+    """
+    Keeps an `IBClient` connected and its market data flowing across Gateway restarts.
+
+    On `disconnectedEvent` it reconnects in the background with the client's exponential backoff, retrying
+    until the Gateway is back, then calls every registered restore callback. IB drops all session state on
+    disconnect, so callbacks re-request market data for contracts that are already qualified (conIds are
+    kept on the contract objects) and swap in the new tickers; nothing is rediscovered or re-qualified.
+    """
+    def __init__(self, client):
+        self.client = client
+        self.ib = client.ib
+        self.restorers = []
+        self.reconnects = 0
+        self._task = None
+        self._running = False
+
+    def register(self, restore):
+        """Add a callback run after every reconnect; it returns the number of subscriptions restored."""
+        self.restorers.append(restore)
+
+    def start(self):
+        self._running = True
+        self.ib.disconnectedEvent += self.on_disconnected
+
+    def stop(self):
+        """Stop supervising, e.g. before an intentional disconnect."""
+        self._running = False
+        self.ib.disconnectedEvent -= self.on_disconnected
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def on_disconnected(self):
+        if self._running and self._task is None:
+            logging.warning("IB connection lost, reconnecting")
+            self._task = asyncio.ensure_future(self.reconnect())
+
+    async def reconnect(self):
+        started = time.monotonic()
+        try:
+            await self.client.connect_async(max_retries=0)
+            restored = 0
+            for restore in self.restorers:
+                try:
+                    restored += restore() or 0
+                except Exception as e:
+                    logging.error(f"Failed to restore subscriptions with {restore}: {e}")
+            self.reconnects += 1
+            logging.info(f"Reconnected in {time.monotonic() - started:.1f}s, "
+                         f"restored {restored} market data subscriptions")
+        finally:
+            self._task = None
@@ -1,20 +1,117 @@
 from pathlib import Path
-from typing import Optional, Set
+from typing import Dict, List, Literal, Optional, Set
 import yaml
 from pydantic_settings import BaseSettings
 from pydantic import field_validator, BaseModel
 
 
+class UnderlyingConfig(BaseModel):
+    exchange: str = 'SMART'
+    sec_type: str = 'IND'
+    continuous: bool = False
+    low_threshold: Optional[float] = None
+    high_threshold: Optional[float] = None
+    market_data_lines: Optional[int] = None
+    trading_classes: List[str] = []
+
+
+class AlertRule(BaseModel):
+    """
+    One alert condition, e.g. `{name: wide_spread, field: spread_pct, op: '>', threshold: 0.2, hysteresis: 0.05}`.
+
+    `scope` selects what `field` is read from: 'option' (a snapshot column, or the derived `mid`, `spread` and
+    `spread_pct`), 'underlying' (`price`, or its `iv` with the yearly `iv_rank`/`iv_percentile`) or 'aggregate'
+    (a net greek of a strategy/underlying/portfolio total).
+    A rule fires once, then re-arms when the value is back `hysteresis` inside the threshold and `cooldown`
+    seconds have passed since it fired.
+    """
+    name: str
+    field: str
+    op: Literal['>', '>=', '<', '<='] = '>'
+    threshold: float
+    scope: Literal['option', 'underlying', 'aggregate'] = 'option'
+    absolute: bool = False
+    hysteresis: float = 0.0
+    cooldown: float = 0.0
+    symbols: Optional[Set[str]] = None
+    thresholds: Dict[str, float] = {}
+    strikes: Optional[Set[float]] = None
+    rights: Optional[Set[str]] = None
+    message: Optional[str] = None
+
+
 class AlertConfig(BaseModel):
     logging_level: str = 'INFO'
+    ib_connections: int = 1
+    ib_shard_by: str = 'underlying'
     polling_interval: int = 15
+    event_driven: bool = True
+    coalesce_interval: float = 0.25
+    max_dte: int = 60
+    chain_cache_ttl: int = 3600
+    market_data_lines: int = 200
+    rebalance_threshold: float = 0.0025
+    rebalance_interval: float = 5.0
+    strike_window_width: int = 0
+    strike_window_delta: Optional[float] = None
+    strike_window_volatility: float = 0.2
+    snapshot_format: str = 'parquet'
+    snapshot_file: str = '{symbol}_monitoring_with_alerts.csv'
+    snapshot_dir: str = 'snapshots'
+    snapshot_flush_cycles: int = 20
+    snapshot_rotate_seconds: int = 300
+    snapshot_queue_size: int = 64
+    snapshot_compact: bool = True
     inventory_file: str = 'inventory.yaml'
+    inventory_reload_interval: float = 5.0
+    contract_cache_file: str = 'contracts_cache.json'
+    qualify_chunk_size: int = 50
+    qualify_concurrency: int = 4
+    qualify_chunk_delay: float = 1.0
     low_threshold: float = 4500
     high_threshold: float = 5500
+    price_rule_hysteresis: float = 5.0
+    price_rule_cooldown: float = 60.0
     delta_threshold: float = 0.5
     gamma_threshold: Optional[float] = None
     theta_threshold: Optional[float] = None
+    greek_rule_hysteresis: float = 0.01
+    greek_rule_cooldown: float = 60.0
     watched_strikes: Set[int] = {5100, 5200, 5300}
+    aggregate_thresholds: Dict[str, float] = {}
+    alert_rules: List[AlertRule] = []
+    alert_rules_file: Optional[str] = None
+    alert_sinks: List[str] = ['log']
+    alert_file: str = 'alerts.log'
+    alert_webhook_url: Optional[str] = None
+    alert_queue_size: int = 10000
+    alert_overflow: str = 'drop_oldest'
+    alert_batch_size: int = 100
+    alert_flush_interval: float = 0.25
+    alert_coalesce_above: int = 20
+    iv_window: int = 50
+    history_file: Optional[str] = 'iv_history.bin'
+    history_slots: int = 8192
+    history_depth: int = 1000
+    iv_history_dir: Optional[str] = 'iv_cache'
+    iv_history_days: int = 365
+    historical_concurrency: int = 2
+    historical_requests_per_window: int = 50
+    historical_pacing_window: float = 600.0
+    local_greeks: bool = True
+    risk_free_rate: float = 0.045
+    dividend_yield: float = 0.0
+    greeks_stale_tolerance: float = 0.005
+    metrics_host: str = '127.0.0.1'
+    metrics_port: Optional[int] = 9108
+    metrics_log_interval: float = 60.0
+    worker_processes: int = 0
+    worker_partition: str = 'underlying'
+    worker_ring_capacity: int = 65536
+    underlyings: Dict[str, UnderlyingConfig] = {
+        'SPX': UnderlyingConfig(exchange='CBOE'),
+        'RUT': UnderlyingConfig(exchange='RUSSELL'),
+    }
 
     class Config:
         env_file = ".env"
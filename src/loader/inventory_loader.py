@@ -1,11 +1,100 @@
 import json
-from pathlib import Path
-from typing import Optional, Set
+import logging
+import os
+from collections import defaultdict
+from typing import NamedTuple, Optional
 import yaml
+from pydantic import TypeAdapter
 
 from src.model.models import OptionPosition, Portfolio
 
+POSITION_LIST = TypeAdapter(list[OptionPosition])
+
+
+class InventoryDiff(NamedTuple):
+    """Contract keys whose positions were added, removed or changed (strategy or quantity)."""
+    added: set
+    removed: set
+    changed: set
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    @property
+    def keys(self):
+        return self.added | self.removed | self.changed
+
+
+class PositionIndex:
+    """Inventory positions keyed by contract identity (symbol, expiry, strike, right), with their strategy name."""
+    def __init__(self):
+        self._positions = defaultdict(list)
+
+    @staticmethod
+    def key(position: OptionPosition):
+        return (position.symbol, position.expiry, float(position.strike), position.right)
+
+    def add(self, strategy: str, position: OptionPosition):
+        self._positions[self.key(position)].append((strategy, position))
+
+    def get(self, key) -> list[tuple[str, OptionPosition]]:
+        return self._positions.get(key, [])
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def positions(self, symbol=None) -> list[OptionPosition]:
+        return [position for entries in self._positions.values() for _, position in entries
+                if symbol is None or position.symbol == symbol]
+
+    def keys(self, symbol=None):
+        return {key for key in self._positions if symbol is None or key[0] == symbol}
+
+    def _signature(self, key):
+        return sorted((strategy, position.quantity) for strategy, position in self.get(key))
+
+    def diff(self, other: 'PositionIndex') -> InventoryDiff:
+        mine, theirs = set(self._positions), set(other._positions)
+        changed = {key for key in mine & theirs if self._signature(key) != other._signature(key)}
+        return InventoryDiff(theirs - mine, mine - theirs, changed)
+
+    def apply(self, other: 'PositionIndex', diff: InventoryDiff = None) -> InventoryDiff:
+        """Make this index equal to `other` by touching only the keys in the diff."""
+        diff = diff if diff is not None else self.diff(other)
+        for key in diff.removed:
+            del self._positions[key]
+        for key in diff.added | diff.changed:
+            self._positions[key] = list(other.get(key))
+        return diff
+
+
 class InventoryLoader:
+    @staticmethod
+    def read(path) -> Portfolio:
+        """
+        Parse and validate an inventory file: YAML or JSON in the `Portfolio` layout, or a JSON list of
+        positions that is grouped by symbol and strategy.
+        """
+        with open(path) as f:
+            if str(path).endswith('.json'):
+                data = json.load(f)
+            else:
+                data = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+        if isinstance(data, list):
+            # Validated first, so a malformed entry is a ValidationError (a ValueError) like any other bad file
+            grouped = defaultdict(lambda: defaultdict(list))
+            for option in POSITION_LIST.validate_python(data):
+                grouped[option.symbol][option.strategy].append(option)
+            data = {symbol: {'strategies': [{'name': name, 'options': options} for name, options in strategies.items()]}
+                    for symbol, strategies in grouped.items()}
+        return Portfolio.model_validate(data or {})
+
     @staticmethod
     def load(portfolio: Portfolio) -> list[OptionPosition]:
         inventory = []
@@ -15,15 +104,47 @@ class InventoryLoader:
                     inventory.append(option)
         return inventory
 
-    logging_level: str = 'INFO'
-    polling_interval: int = 15
-    inventory_file: str = 'inventory.json'
-    low_threshold: float = 4500
-    high_threshold: float = 5500
-    delta_threshold: float = 0.5
-    gamma_threshold: Optional[float] = None
-    theta_threshold: Optional[float] = None
-    watched_strikes: Set[int] = {5100, 5200, 5300}
-
-    class Config:
-        env_file = ".env"
\ No newline at end of file
+    @staticmethod
+    def index(portfolio: Portfolio) -> PositionIndex:
+        index = PositionIndex()
+        for strategies in portfolio.root.values():
+            for strategy in strategies.strategies:
+                for option in strategy.options:
+                    index.add(strategy.name, option)
+        return index
+
+
+class InventoryWatcher:
+    """
+    Reloads the inventory file when its modification time changes and applies only the difference to the
+    live `PositionIndex`, so everything holding the index sees the edit without a restart. A file that fails
+    to parse or validate is logged and ignored; the current positions stay in place.
+    """
+    def __init__(self, path, positions=None):
+        self.path = path
+        self.positions = positions if positions is not None else InventoryLoader.index(InventoryLoader.read(path))
+        self.mtime = self._mtime()
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def poll(self) -> Optional[InventoryDiff]:
+        """Reload when the file changed; returns the applied diff, or None when nothing changed."""
+        mtime = self._mtime()
+        if mtime is None or mtime == self.mtime:
+            return None
+        self.mtime = mtime
+        try:
+            latest = InventoryLoader.index(InventoryLoader.read(self.path))
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            logging.warning(f"Ignoring invalid inventory {self.path}, keeping the current positions: {e}")
+            return None
+        diff = self.positions.diff(latest)
+        if diff:
+            self.positions.apply(latest, diff)
+            logging.info(f"Inventory {self.path} reloaded: +{len(diff.added)} -{len(diff.removed)} "
+                         f"~{len(diff.changed)} positions")
+        return diff
@@ -0,0 +1,162 @@
+import logging
+import os
+from datetime import date
+
+import numpy as np
+
+MAGIC = b'IVHS'
+VERSION = 1
+HEADER_SIZE = 64
+KEY_SIZE = 48
+
+HEADER_DTYPE = np.dtype([('magic', 'S4'), ('version', '<u4'), ('slots', '<u4'), ('depth', '<u4'), ('used', '<u4')])
+RECORD_DTYPE = np.dtype([('ts', '<f8'), ('iv', '<f4'), ('delta', '<f4'), ('gamma', '<f4'), ('theta', '<f4'), ('vega', '<f4')])
+RECORD_FIELDS = RECORD_DTYPE.names[1:]
+
+
+def history_key(symbol, expiry, strike, right):
+    return f"{symbol}|{expiry}|{float(strike)}|{right}".encode()
+
+
+class TickHistoryStore:
+    """
+    Memory-mapped tick history with one fixed-size slot per contract.
+
+    The file holds a small header, a key table and, per slot, a ring of `depth` records
+    (timestamp, IV and greeks). Attaching maps the file and reads only the key table, so history is
+    available right after a restart without parsing, and only the pages actually touched are resident.
+    One process writes; any number of processes can attach with `readonly=True`. Writers update a
+    record before advancing the slot's head/count, so readers never see a half-appended record counted.
+    Once every slot has been assigned, the slots of expired contracts are cleared and reused; `generation`
+    counts the reclaims, so holders of cached slots know when to look them up again.
+    """
+    def __init__(self, path, slots=8192, depth=1000, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        if not os.path.exists(path):
+            if readonly:
+                raise FileNotFoundError(path)
+            self._create(path, slots, depth)
+
+        mode = 'r' if readonly else 'r+'
+        self._header = np.memmap(path, dtype=HEADER_DTYPE, mode=mode, offset=0, shape=(1,))
+        header = self._header[0]
+        if header['magic'] != MAGIC or header['version'] != VERSION:
+            raise ValueError(f"{path} is not a tick history file")
+        self.slots, self.depth = int(header['slots']), int(header['depth'])
+
+        offset = HEADER_SIZE
+        self._keys = np.memmap(path, dtype=f'S{KEY_SIZE}', mode=mode, offset=offset, shape=(self.slots,))
+        offset += KEY_SIZE * self.slots
+        self._head = np.memmap(path, dtype='<u4', mode=mode, offset=offset, shape=(self.slots,))
+        offset += 4 * self.slots
+        self._count = np.memmap(path, dtype='<u4', mode=mode, offset=offset, shape=(self.slots,))
+        offset += 4 * self.slots
+        self._records = np.memmap(path, dtype=RECORD_DTYPE, mode=mode, offset=offset, shape=(self.slots, self.depth))
+        self._index = {}
+        self._free = []
+        self._full_logged = False
+        self.generation = 0
+        self.refresh()
+        if not readonly:
+            self._free = [slot for slot in range(self.used) if not self._keys[slot]]
+
+    @staticmethod
+    def _create(path, slots, depth):
+        size = HEADER_SIZE + (KEY_SIZE + 8) * slots + RECORD_DTYPE.itemsize * slots * depth
+        with open(path, 'wb') as f:
+            header = np.zeros(1, dtype=HEADER_DTYPE)
+            header[0] = (MAGIC, VERSION, slots, depth, 0)
+            f.write(header.tobytes())
+            # Sparse file: pages are only allocated once written
+            f.truncate(size)
+
+    @property
+    def used(self):
+        return int(self._header[0]['used'])
+
+    def refresh(self):
+        """Pick up slots assigned (or reused) by the writer since the last refresh (for readers)."""
+        keys = self._keys[:self.used]
+        self._index = {key: slot for slot, key in enumerate(keys.tolist()) if key}
+
+    def reclaim(self, today=None):
+        """Clear the slots of contracts whose expiry has passed so they can be reused; returns how many."""
+        today = (today or date.today()).strftime('%Y%m%d').encode()
+        expired = []
+        for key, slot in self._index.items():
+            expiry = key.split(b'|')[1]
+            # Futures options may carry a YYYYMM contract month, compare on the same precision
+            if expiry and expiry < today[:len(expiry)]:
+                expired.append((key, slot))
+        if expired:
+            self.generation += 1
+        for key, slot in expired:
+            del self._index[key]
+            self._keys[slot] = b''
+            self._count[slot] = 0
+            self._head[slot] = 0
+            self._free.append(slot)
+        return len(expired)
+
+    def slot(self, key, create=True):
+        """Slot of a contract key (see `history_key`); -1 when unknown or the file has no free slot left."""
+        slot = self._index.get(key)
+        if slot is not None or not create or self.readonly:
+            return -1 if slot is None else slot
+        used = self.used
+        if used >= self.slots and not self._free:
+            reclaimed = self.reclaim()
+            if not reclaimed:
+                if not self._full_logged:
+                    self._full_logged = True
+                    logging.warning(f"Tick history {self.path} is full ({self.slots} slots, none expired), "
+                                    f"new contracts are not recorded; raise history_slots")
+                return -1
+            logging.info(f"Tick history {self.path}: reclaimed {reclaimed} slots of expired contracts")
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = used
+            self._header[0]['used'] = used + 1
+        # Key last: a reader picking the slot up sees it empty rather than with the previous contract's records
+        self._count[slot] = 0
+        self._head[slot] = 0
+        self._keys[slot] = key
+        self._index[key] = slot
+        self._full_logged = False
+        return slot
+
+    def append_many(self, slots, timestamp, columns):
+        """Append one record per slot (slots must be unique, negative slots are skipped)."""
+        slots = np.asarray(slots, dtype=np.intp)
+        valid = slots >= 0
+        slots = slots[valid]
+        if not len(slots):
+            return
+        head = self._head[slots].astype(np.intp)
+        records = np.zeros(len(slots), dtype=RECORD_DTYPE)
+        records['ts'] = timestamp
+        for name in RECORD_FIELDS:
+            values = columns.get(name)
+            records[name] = np.nan if values is None else np.asarray(values)[valid]
+        self._records[slots, head] = records
+        self._head[slots] = (head + 1) % self.depth
+        self._count[slots] = np.minimum(self._count[slots] + 1, self.depth)
+
+    def count(self, slot):
+        return int(self._count[slot])
+
+    def history(self, slot, field='iv', last=None):
+        """Values of one field for one slot in chronological order (a copy), optionally only the last `last`."""
+        n = int(self._count[slot])
+        head = int(self._head[slot])
+        order = (np.arange(head - n, head) % self.depth) if n else np.zeros(0, dtype=np.intp)
+        if last is not None:
+            order = order[-last:] if last else order[:0]
+        return np.asarray(self._records[slot][field][order])
+
+    def flush(self):
+        if not self.readonly:
+            for region in (self._header, self._keys, self._head, self._count, self._records):
+                region.flush()
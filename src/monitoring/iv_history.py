@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from datetime import date
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+class IVRange:
+    """
+    Daily implied volatility closes of one underlying over the lookback, for the IV rank (position of the
+    current IV between the low and the high) and percentile (share of days below it). Both are NaN while
+    there is no history, e.g. until the first warm-up of a new underlying completes.
+    """
+    def __init__(self, values=()):
+        self.update(values)
+
+    def __len__(self):
+        return len(self.sorted)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.sorted = np.sort(values[np.isfinite(values) & (values > 0)])
+        self.low = self.sorted[0] if len(self.sorted) else np.nan
+        self.high = self.sorted[-1] if len(self.sorted) else np.nan
+
+    def rank(self, iv):
+        iv = np.asarray(iv, dtype=np.float64)
+        if not len(self.sorted) or self.high == self.low:
+            return np.full(iv.shape, np.nan)
+        return np.round(np.clip((iv - self.low) / (self.high - self.low), 0.0, 1.0), 2)
+
+    def percentile(self, iv):
+        iv = np.asarray(iv, dtype=np.float64)
+        if not len(self.sorted):
+            return np.full(iv.shape, np.nan)
+        below = np.searchsorted(self.sorted, iv) / len(self.sorted)
+        return np.where(np.isfinite(iv), np.round(below, 2), np.nan)
+
+
+def underlying_iv_fields(iv, iv_range=None):
+    """
+    The underlying's current IV with its rank and percentile over `iv_range`, as fields of the underlying
+    alert rules; rank and percentile are NaN until the range has history.
+    """
+    iv = np.nan if iv is None else float(iv)
+    rank = percentile = np.nan
+    if iv_range is not None and len(iv_range) and np.isfinite(iv):
+        rank, percentile = float(iv_range.rank(iv)), float(iv_range.percentile(iv))
+    return {'iv': iv, 'iv_rank': rank, 'iv_percentile': percentile}
+
+
+class IVHistoryCache:
+    """
+    Local columnar cache of daily IV bars: one Parquet file (`date`, `iv`) per underlying in `directory`.
+    Files are replaced atomically, so an interrupted fetch leaves the previous history in place.
+    """
+    SCHEMA = pa.schema([('date', pa.date32()), ('iv', pa.float64())])
+
+    def __init__(self, directory='iv_cache'):
+        self.directory = directory
+        self._data = {}
+
+    def path(self, symbol):
+        return os.path.join(self.directory, f"{symbol}.parquet")
+
+    def load(self, symbol):
+        """(dates as datetime64[D], iv) of the cached bars, sorted by date."""
+        data = self._data.get(symbol)
+        if data is not None:
+            return data
+        path = self.path(symbol)
+        data = np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float64)
+        if os.path.exists(path):
+            try:
+                table = pq.read_table(path)
+                data = (table.column('date').to_numpy().astype('datetime64[D]'),
+                        table.column('iv').to_numpy().astype(np.float64))
+            except (OSError, pa.ArrowException, KeyError) as e:
+                logging.warning(f"Ignoring unreadable IV history {path}: {e}")
+        self._data[symbol] = data
+        return data
+
+    def last_date(self, symbol):
+        dates, _ = self.load(symbol)
+        return dates[-1].astype(object) if len(dates) else None
+
+    def merge(self, symbol, dates, values):
+        """Add bars to the cached ones (a fetched bar replaces a cached bar of the same day) and save."""
+        cached_dates, cached_values = self.load(symbol)
+        dates = np.concatenate([np.asarray(dates, dtype='datetime64[D]'), cached_dates])
+        values = np.concatenate([np.asarray(values, dtype=np.float64), cached_values])
+        dates, first = np.unique(dates, return_index=True)
+        values = values[first]
+        self._data[symbol] = dates, values
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(symbol)
+        tmp = f"{path}.tmp"
+        pq.write_table(pa.Table.from_arrays([pa.array(dates), pa.array(values)], schema=self.SCHEMA), tmp)
+        os.replace(tmp, path)
+        return dates, values
+
+
+class PacingLimiter:
+    """At most `max_requests` historical data requests per `window` seconds (IB allows 60 per 10 minutes)."""
+    def __init__(self, max_requests=50, window=600.0):
+        self.max_requests = max_requests
+        self.window = window
+        self._sent = deque()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            while self._sent and now - self._sent[0] >= self.window:
+                self._sent.popleft()
+            if len(self._sent) < self.max_requests:
+                self._sent.append(now)
+                return
+            await asyncio.sleep(self.window - (now - self._sent[0]))
+
+
+class IVHistoryService:
+    """
+    Background warm-up of the 52-week IV ranges used for IV rank and percentile.
+
+    Daily `OPTION_IMPLIED_VOLATILITY` bars of the underlyings are requested through `reqHistoricalDataAsync`,
+    at most `max_concurrent` at a time and within the `PacingLimiter` budget, and merged into the
+    `IVHistoryCache`; only the days since the last cached bar are requested, so a daily restart costs one small
+    request per underlying. Ranges are served from the cache immediately and updated in place once the gap
+    has been fetched, so nothing waits for the warm-up.
+    """
+    def __init__(self, ib, cache, days=365, max_concurrent=2, max_requests=50, window=600.0,
+                 what_to_show='OPTION_IMPLIED_VOLATILITY'):
+        self.ib = ib
+        self.cache = cache
+        self.days = days
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.limiter = PacingLimiter(max_requests, window)
+        self.what_to_show = what_to_show
+        self.ranges = {}
+        self.requests = 0
+
+    def range(self, symbol, today=None):
+        """The IV range of `symbol`, from the cache until `warm` refreshes it."""
+        iv_range = self.ranges.get(symbol)
+        if iv_range is None:
+            iv_range = self.ranges[symbol] = IVRange(self._lookback(symbol, today))
+        return iv_range
+
+    def _lookback(self, symbol, today=None):
+        dates, values = self.cache.load(symbol)
+        start = np.datetime64(today or date.today(), 'D') - self.days
+        return values[dates > start]
+
+    def missing_days(self, symbol, today=None):
+        """
+        Calendar days to request: the whole lookback for a new underlying, otherwise the gap since the last
+        cached bar, which is requested again as it may have been taken intraday.
+        """
+        today = today or date.today()
+        last = self.cache.last_date(symbol)
+        if last is None:
+            return self.days
+        return min(max((today - last).days + 1, 1), self.days)
+
+    def duration(self, days):
+        # IB rejects day durations above 365, longer lookbacks are requested in years
+        return f"{days} D" if days <= 365 else f"{-(-days // 365)} Y"
+
+    async def fetch(self, contract, today=None):
+        """Fetch and cache the missing bars of one underlying; returns the number of bars received."""
+        symbol = contract.symbol
+        days = self.missing_days(symbol, today)
+        if not days:
+            return 0
+        async with self.semaphore:
+            await self.limiter.acquire()
+            self.requests += 1
+            bars = await self.ib.reqHistoricalDataAsync(contract, endDateTime='', durationStr=self.duration(days),
+                                                        barSizeSetting='1 day', whatToShow=self.what_to_show,
+                                                        useRTH=True, formatDate=1)
+        if bars:
+            self.cache.merge(symbol, [bar.date for bar in bars], [bar.close for bar in bars])
+            self.range(symbol).update(self._lookback(symbol, today))
+        return len(bars or ())
+
+    async def warm(self, contracts, today=None):
+        """Bring the cached history of every underlying up to date; failures only leave that range stale."""
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self.fetch(contract, today) for contract in contracts),
+                                       return_exceptions=True)
+        fetched = 0
+        for contract, result in zip(contracts, results):
+            if isinstance(result, Exception):
+                logging.warning(f"{contract.symbol}: IV history warm-up failed: {result}")
+            else:
+                fetched += result
+        symbols = ', '.join(contract.symbol for contract in contracts)
+        logging.info(f"IV history of {symbols}: {fetched} bars fetched in {time.perf_counter() - started:.1f}s")
+        return fetched
+
+
+def build_iv_history(ib, config):
+    if not config.iv_history_dir:
+        return None
+    return IVHistoryService(ib, IVHistoryCache(config.iv_history_dir), days=config.iv_history_days,
+                            max_concurrent=config.historical_concurrency,
+                            max_requests=config.historical_requests_per_window,
+                            window=config.historical_pacing_window)
@@ -1,28 +1,95 @@
-from collections import defaultdict
-import statistics
+from datetime import datetime
+
+import numpy as np
+
+from src.monitoring.history_store import RECORD_FIELDS, history_key
+from src.monitoring.iv_history import underlying_iv_fields
+from src.monitoring.rolling_stats import RollingIVStats
+from src.monitoring.snapshot_store import SnapshotStore
 
 class OptionMonitor:
-    def __init__(self):
-        self.snapshot_log = []
-        self.iv_history = defaultdict(list)
-
-    def get_iv_zscore(self, history, current_iv):
-        if len(history) < 5 or current_iv is None:
-            return None
-        mean = statistics.mean(history)
-        stdev = statistics.stdev(history)
-        if stdev == 0:
-            return 0
-        return round((current_iv - mean) / stdev, 2)
-    
-    def get_iv_percentile(self, history, current_iv):
-        if len(history) < 5 or current_iv is None:
-            return None
-        return round(sum(iv < current_iv for iv in history) / len(history), 2)
-    
-    def get_iv_rank(self, history, current_iv):
-        if len(history) < 5 or current_iv is None:
-            return None
-        return round(sum(iv < current_iv for iv in history) / len(history), 2)
-    
-    
\ No newline at end of file
+    """
+    Per-chain IV monitor. History is kept per contract index (see `SnapshotStore.contracts`)
+    in fixed-size ring buffers, so every metric is updated incrementally per tick.
+
+    Contract z-score, percentile and rank are taken over the contract's own last `iv_window` samples (seeded
+    from the history store after a restart). The underlying's 30-day IV is ranked against its 52-week daily
+    range when an `iv_range` is given (see `IVHistoryService.range` and `underlying_iv`); the yearly series is
+    an ATM measure, so it is not applied to individual strikes, whose skew would pin their rank.
+    """
+    def __init__(self, contract_capacity=1024, max_cycles=512, iv_window=50, history_store=None, iv_range=None):
+        self.snapshots = SnapshotStore(contract_capacity=contract_capacity, max_cycles=max_cycles)
+        self.iv_stats = RollingIVStats(window=iv_window, capacity=contract_capacity)
+        self.history_store = history_store
+        self.iv_range = iv_range
+        self.underlying = {'iv': np.nan, 'iv_rank': np.nan, 'iv_percentile': np.nan}
+        self._history_slots = np.zeros(0, dtype=np.intp)
+        self._history_generation = history_store.generation if history_store is not None else 0
+
+    def _attach_history(self):
+        """
+        Assign history slots to contracts added since the last call and seed their IV windows from the
+        memory-mapped history, so statistics are available right after a restart. After the store reclaimed
+        expired slots (for any monitor sharing it) the cached slots are looked up again: a reclaimed one may
+        belong to another contract by now, so its expired contract is no longer recorded.
+        """
+        store = self.history_store
+        contracts = self.snapshots.contracts
+        resolved, n = len(self._history_slots), len(contracts)
+        if resolved >= n and self._history_generation == store.generation:
+            return self._history_slots
+        slots = np.empty(n, dtype=np.intp)
+        slots[:resolved] = self._history_slots
+        for idx in range(resolved, n):
+            slots[idx] = store.slot(history_key(*contracts.key(idx)))
+            if slots[idx] >= 0:
+                for iv in store.history(slots[idx], 'iv', last=self.iv_stats.window):
+                    if np.isfinite(iv) and iv:
+                        self.iv_stats.push(idx, float(iv))
+        if self._history_generation != store.generation:
+            for idx in np.flatnonzero(slots >= 0):
+                slots[idx] = store.slot(history_key(*contracts.key(idx)), create=False)
+            self._history_generation = store.generation
+        self._history_slots = slots
+        return slots
+
+    def record_iv(self, idx, iv):
+        if iv:
+            self.iv_stats.push(idx, iv)
+
+    def get_iv_zscore(self, idx, current_iv):
+        return self.iv_stats.zscore(idx, current_iv)
+
+    def get_iv_percentile(self, idx, current_iv):
+        return self.iv_stats.percentile(idx, current_iv)
+
+    def get_iv_rank(self, idx, current_iv):
+        return self.iv_stats.rank(idx, current_iv)
+
+    def underlying_iv(self, iv):
+        """Record the underlying's current IV and return it with its yearly rank (see `underlying_iv_fields`)."""
+        self.underlying = underlying_iv_fields(iv, self.iv_range)
+        return self.underlying
+
+    def update_iv(self, indices, iv, timestamp=None, columns=None):
+        """
+        Push one IV sample per contract for the whole chain and return the z-score, percentile
+        and rank columns aligned with `indices` (see the class docstring for their windows).
+        Zero or NaN IVs are not recorded.
+        With a history store attached the samples (and greeks from `columns`) are also persisted.
+        """
+        iv = np.asarray(iv, dtype=np.float64)
+        recorded = np.where(iv == 0, np.nan, iv)
+        if self.history_store is not None:
+            slots = self._attach_history()[indices]
+            valid = np.isfinite(recorded)
+            row = {name: columns[name][valid] for name in RECORD_FIELDS if columns and name in columns}
+            row['iv'] = recorded[valid]
+            ts = (timestamp or datetime.now()).timestamp()
+            self.history_store.append_many(slots[valid], ts, row)
+        self.iv_stats.push_many(indices, recorded)
+        return {
+            'iv_zscore': self.iv_stats.zscores(indices, iv),
+            'iv_percentile': self.iv_stats.percentiles(indices, iv),
+            'iv_rank': self.iv_stats.ranks(indices, iv),
+        }
@@ -0,0 +1,159 @@
+import logging
+import time
+from datetime import datetime
+
+from src.alerting.rules import RuleEngine, alert_rules
+from src.monitoring.metrics import Metrics, Stopwatch
+from src.monitoring.snapshot_store import ticker_columns
+from src.persistence.snapshot_writer import ParquetSnapshotWriter
+from src.pricing.greeks import GreeksEngine
+
+
+def build_alert_engine(config, symbol, settings, scopes=None):
+    """
+    Alert rules of one underlying from `AlertConfig` (thresholds, `alert_rules`) and its `UnderlyingConfig`,
+    optionally only those of some `scopes` (e.g. the option rules of a worker owning part of a chain).
+    """
+    rules = alert_rules(config, settings)
+    if scopes is not None:
+        rules = [rule for rule in rules if rule.scope in scopes]
+    return RuleEngine(rules, symbol)
+
+
+def build_greeks_engine(config, settings):
+    """Local greeks fallback (Black-76 for futures options), or None when `local_greeks` is off."""
+    if not config.local_greeks:
+        return None
+    return GreeksEngine(
+        model='black76' if settings.sec_type.upper() == 'FUT' else 'black_scholes',
+        rate=config.risk_free_rate,
+        dividend_yield=config.dividend_yield,
+        stale_tolerance=config.greeks_stale_tolerance
+    )
+
+
+def build_snapshot_sink(config, symbol, shard=None):
+    """Snapshot sink of one underlying per `snapshot_format`; `shard` separates writers of the same underlying."""
+    if config.snapshot_format == 'csv':
+        name = symbol.lower() if shard is None else f"{symbol.lower()}_{shard}"
+        return CsvSnapshotSink(config.snapshot_file.format(symbol=name))
+    partition = f"symbol={symbol}" if shard is None else f"symbol={symbol}/shard={shard}"
+    return ParquetSnapshotWriter(config.snapshot_dir, partition=partition,
+                                 rotate_seconds=config.snapshot_rotate_seconds,
+                                 max_queue=config.snapshot_queue_size,
+                                 compact_hours=config.snapshot_compact)
+
+
+class CsvSnapshotSink:
+    """Appends drained snapshot frames to one CSV file, writing the header once."""
+    def __init__(self, path):
+        self.path = path
+        self._header = True
+
+    def __call__(self, frame):
+        frame.to_csv(self.path, mode='w' if self._header else 'a', header=self._header, index=False)
+        self._header = False
+
+
+class ChainPipeline:
+    """
+    Processing pipeline for one underlying's chain: IV statistics, alert checks and snapshot recording.
+    Works on contract indices and columns, so polling loops, tick events and replays share it.
+    Every stage is timed into `metrics` (`stage_seconds{stage=...}`) along with tick, alert and greeks counters.
+    """
+    STAGES = ('snapshot_build', 'greeks', 'iv_stats', 'alerts', 'snapshot', 'persistence')
+
+    def __init__(self, monitor, alert_engine, snapshot_sink=None, greeks_engine=None, exposure=None,
+                 aggregate_alert_engine=None, flush_every=None, metrics=None, alert_sink=None):
+        self.monitor = monitor
+        self.flush_every = flush_every
+        self.alert_engine = alert_engine
+        self.snapshot_sink = snapshot_sink
+        self.greeks_engine = greeks_engine
+        self.exposure = exposure
+        self.aggregate_alert_engine = aggregate_alert_engine
+        # Called with (timestamp, alerts), e.g. `AlertBus.publisher`; without one alerts are logged inline
+        self.alert_sink = alert_sink
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.stage_seconds = {stage: self.metrics.histogram('stage_seconds', stage=stage) for stage in self.STAGES}
+        self.cycle_seconds = self.metrics.histogram('cycle_seconds')
+        self.ticks = self.metrics.counter('ticks')
+        self.cycles = self.metrics.counter('cycles')
+        self.alerts = self.metrics.counter('alerts')
+        self.greeks_filled = self.metrics.counter('greeks_filled')
+        self.metrics.gauge('underlying_iv_rank', lambda: monitor.underlying['iv_rank'])
+        if greeks_engine is not None:
+            self.metrics.collect('greeks_missing', lambda: greeks_engine.missing)
+            self.metrics.collect('greeks_stale', lambda: greeks_engine.stale)
+        if snapshot_sink is not None and hasattr(snapshot_sink, 'dropped'):
+            self.metrics.collect('snapshot_batches_dropped', lambda: snapshot_sink.dropped)
+
+    @property
+    def contracts(self):
+        return self.monitor.snapshots.contracts
+
+    def add_contracts(self, contracts):
+        """Register contracts with the snapshot store and return their stable indices."""
+        return self.contracts.indices(contracts)
+
+    def process_tickers(self, tickers, underlying_price, timestamp=None, underlying_iv=None):
+        started = time.perf_counter()
+        indices = self.add_contracts([ticker.contract for ticker in tickers])
+        columns = ticker_columns(tickers)
+        self.stage_seconds['snapshot_build'].record(time.perf_counter() - started)
+        return self.process(indices, columns, underlying_price, timestamp, underlying_iv)
+
+    def process(self, indices, columns, underlying_price, timestamp=None, underlying_iv=None):
+        """
+        Run one update for the contracts in `indices` and return the alerts it fired. `underlying_iv` is the
+        underlying's own implied volatility (see `SymbolTracker.current_iv`), for rules on its yearly rank.
+        """
+        timestamp = timestamp or datetime.now()
+        store = self.monitor.snapshots
+        stages = self.stage_seconds
+        watch = Stopwatch()
+        started = watch.last
+        if self.greeks_engine is not None and 'delta' in columns:
+            self.greeks_filled.inc(self.greeks_engine.fill(store.contracts, indices, columns, underlying_price, timestamp))
+            watch.lap(stages['greeks'])
+        if 'iv' in columns:
+            columns.update(self.monitor.update_iv(indices, columns['iv'], timestamp, columns))
+            watch.lap(stages['iv_stats'])
+
+        alerts = self.alert_engine.check(underlying_price, timestamp, self.monitor.underlying_iv(underlying_iv))
+        alerts += self.alert_engine.check_batch(store.contracts, indices, columns, timestamp)
+        if self.exposure is not None and self.exposure.update(store.contracts, indices, columns) \
+                and self.aggregate_alert_engine is not None:
+            alerts += self.aggregate_alert_engine.check_totals(self.exposure.aggregator.totals(), timestamp)
+        if self.alert_sink is not None:
+            if alerts:
+                self.alert_sink(timestamp, alerts)
+        else:
+            for alert in alerts:
+                logging.warning(alert)
+        watch.lap(stages['alerts'])
+
+        store.record(timestamp, indices, columns, underlying_price)
+        watch.lap(stages['snapshot'])
+        if store.is_full or (self.flush_every and store.pending >= self.flush_every):
+            self.flush()
+            watch.lap(stages['persistence'])
+
+        self.cycle_seconds.record(time.perf_counter() - started)
+        self.cycles.inc()
+        self.ticks.inc(len(indices))
+        self.alerts.inc(len(alerts))
+        return alerts
+
+    def flush(self):
+        """Hand the snapshots recorded since the last flush to the sink."""
+        frame = self.monitor.snapshots.drain()
+        if self.snapshot_sink is not None and len(frame):
+            self.snapshot_sink(frame)
+
+    def close(self):
+        """Flush the remaining snapshots and release the sink."""
+        self.flush()
+        close = getattr(self.snapshot_sink, 'close', None)
+        if close is not None:
+            close()
@@ -0,0 +1,203 @@
+import numpy as np
+
+
+class RollingIVStats:
+    """
+    Rolling window statistics over per-contract ring buffers.
+
+    All contracts share one (capacity, window) array of samples, indexed by the contract index of the
+    snapshot store. Mean and variance are maintained incrementally (sliding Welford update) and each
+    row keeps a sorted copy of its window, updated by one delete/insert per sample, so z-score and rank are
+    O(1) and percentile is a binary search.
+    """
+
+    def __init__(self, window=50, capacity=1024, min_samples=5):
+        self.window = window
+        self.min_samples = min_samples
+        self._values = np.full((capacity, window), np.nan)
+        self._sorted = np.full((capacity, window), np.inf)
+        self._head = np.zeros(capacity, dtype=np.intp)
+        self._count = np.zeros(capacity, dtype=np.intp)
+        self._mean = np.zeros(capacity)
+        self._m2 = np.zeros(capacity)
+
+    @property
+    def capacity(self):
+        return len(self._count)
+
+    def count(self, idx):
+        return int(self._count[idx])
+
+    def history(self, idx):
+        """Samples of one contract in insertion order (oldest first)."""
+        n = self._count[idx]
+        if n < self.window:
+            return self._values[idx, :n].copy()
+        return np.roll(self._values[idx], -self._head[idx])
+
+    def push(self, idx, value):
+        """Add one sample for contract `idx`, evicting the oldest one once the window is full."""
+        self.ensure_capacity(idx + 1)
+        n = self._count[idx]
+        pos = self._head[idx]
+        mean = self._mean[idx]
+        row = self._sorted[idx]
+
+        if n < self.window:
+            n += 1
+            delta = value - mean
+            new_mean = mean + delta / n
+            self._m2[idx] += delta * (value - new_mean)
+        else:
+            old = self._values[idx, pos]
+            new_mean = mean + (value - old) / n
+            self._m2[idx] = max(self._m2[idx] + (value - old) * (value - new_mean + old - mean), 0.0)
+            k = np.searchsorted(row[:n], old)
+            row[k:n - 1] = row[k + 1:n]
+            row[n - 1] = np.inf
+
+        j = np.searchsorted(row[:n - 1], value, side='right')
+        row[j + 1:n] = row[j:n - 1]
+        row[j] = value
+
+        self._mean[idx] = new_mean
+        self._values[idx, pos] = value
+        self._head[idx] = (pos + 1) % self.window
+        self._count[idx] = n
+
+    def push_many(self, indices, values):
+        """
+        Vectorized push of one sample per contract. `indices` must be unique; NaN values are skipped.
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        values = np.asarray(values, dtype=np.float64)
+        valid = np.isfinite(values)
+        indices, values = indices[valid], values[valid]
+        if not len(indices):
+            return
+        self.ensure_capacity(indices.max() + 1)
+
+        n = self._count[indices]
+        pos = self._head[indices]
+        mean = self._mean[indices]
+        full = n >= self.window
+        old = np.where(full, self._values[indices, pos], 0.0)
+
+        new_n = np.where(full, n, n + 1)
+        new_mean = np.where(full, mean + (values - old) / new_n, mean + (values - mean) / new_n)
+        m2 = self._m2[indices]
+        m2 = np.where(
+            full,
+            m2 + (values - old) * (values - new_mean + old - mean),
+            m2 + (values - mean) * (values - new_mean),
+        )
+
+        self._values[indices, pos] = values
+        self._mean[indices] = new_mean
+        self._m2[indices] = np.maximum(m2, 0.0)
+        self._count[indices] = new_n
+        self._head[indices] = (pos + 1) % self.window
+        self._shift_sorted(indices, n, full, old, values)
+
+    def _search(self, indices, n, values, side='left'):
+        """Row-wise `searchsorted` of `values` in the first `n` sorted samples of each row: a vectorized bisection."""
+        lo = np.zeros(len(indices), dtype=np.intp)
+        hi = np.asarray(n, dtype=np.intp).copy()
+        while True:
+            active = lo < hi
+            if not active.any():
+                return lo
+            mid = (lo + hi) // 2
+            sample = self._sorted[indices, np.minimum(mid, self.window - 1)]
+            right = sample <= values if side == 'right' else sample < values
+            lo = np.where(active & right, mid + 1, lo)
+            hi = np.where(active & ~right, mid, hi)
+
+    def _shift_sorted(self, indices, n, full, old, values):
+        """
+        The delete/insert of `push` for one sample per row: the evicted sample and the insert position are
+        found by bisection and only the samples between them move by one. Rows that are not full delete the
+        inf pad at `n` instead.
+        """
+        gone = np.where(full, self._search(indices, n, old), n)
+        after = self._search(indices, n, values, side='right')
+        left = after > gone
+        at = np.where(left, after - 1, after)
+        # Samples in (gone, at] move one to the left, samples in [at, gone) one to the right
+        length = np.abs(at - gone)
+        total = int(length.sum())
+        if total:
+            start = np.where(left, gone, at + 1)
+            offset = np.arange(total) - np.repeat(np.cumsum(length) - length, length)
+            rows = np.repeat(indices, length)
+            dest = np.repeat(start, length) + offset
+            self._sorted[rows, dest] = self._sorted[rows, dest + np.repeat(np.where(left, 1, -1), length)]
+        self._sorted[indices, at] = values
+
+    def zscore(self, idx, current):
+        n = self._count[idx]
+        if n < self.min_samples or current is None:
+            return None
+        stdev = np.sqrt(self._m2[idx] / (n - 1))
+        if stdev == 0:
+            return 0
+        return round(float((current - self._mean[idx]) / stdev), 2)
+
+    def percentile(self, idx, current):
+        n = self._count[idx]
+        if n < self.min_samples or current is None:
+            return None
+        below = np.searchsorted(self._sorted[idx, :n], current)
+        return round(float(below / n), 2)
+
+    def rank(self, idx, current):
+        """Position of `current` between the low and the high of the window (0 to 1)."""
+        n = self._count[idx]
+        if n < self.min_samples or current is None:
+            return None
+        low, high = self._sorted[idx, 0], self._sorted[idx, n - 1]
+        if high == low:
+            return None
+        return round(float(min(max((current - low) / (high - low), 0.0), 1.0)), 2)
+
+    def zscores(self, indices, current):
+        """Vectorized z-scores for a batch of contracts; NaN where there is not enough history."""
+        indices = np.asarray(indices, dtype=np.intp)
+        n = self._count[indices]
+        enough = (n >= self.min_samples) & np.isfinite(current)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stdev = np.sqrt(self._m2[indices] / (n - 1))
+            z = np.where(stdev == 0, 0.0, (current - self._mean[indices]) / stdev)
+        return np.where(enough, np.round(z, 2), np.nan)
+
+    def percentiles(self, indices, current):
+        """Vectorized share of window samples strictly below `current`; NaN where there is not enough history."""
+        indices = np.asarray(indices, dtype=np.intp)
+        n = self._count[indices]
+        enough = (n >= self.min_samples) & np.isfinite(current)
+        below = self._search(indices, n, np.asarray(current, dtype=np.float64))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(enough, np.round(below / n, 2), np.nan)
+
+    def ranks(self, indices, current):
+        """Vectorized `rank`; NaN where there is not enough history or the window is flat."""
+        indices = np.asarray(indices, dtype=np.intp)
+        n = self._count[indices]
+        enough = (n >= self.min_samples) & np.isfinite(current)
+        low = self._sorted[indices, 0]
+        high = self._sorted[indices, np.maximum(n - 1, 0)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rank = np.clip((current - low) / (high - low), 0.0, 1.0)
+        return np.where(enough & (high > low), np.round(rank, 2), np.nan)
+
+    def ensure_capacity(self, size):
+        if size <= self.capacity:
+            return
+        capacity = max(size, self.capacity * 2)
+        grow = capacity - self.capacity
+        self._values = np.vstack([self._values, np.full((grow, self.window), np.nan)])
+        self._sorted = np.vstack([self._sorted, np.full((grow, self.window), np.inf)])
+        self._head = np.concatenate([self._head, np.zeros(grow, dtype=np.intp)])
+        self._count = np.concatenate([self._count, np.zeros(grow, dtype=np.intp)])
+        self._mean = np.concatenate([self._mean, np.zeros(grow)])
+        self._m2 = np.concatenate([self._m2, np.zeros(grow)])
@@ -0,0 +1,294 @@
+import math
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+SNAPSHOT_FIELDS = ('bid', 'ask', 'last', 'delta', 'gamma', 'theta', 'vega', 'iv', 'und_price', 'iv_zscore')
+
+
+STRIKE_SCALE = 1000
+
+
+def contract_key(contract):
+    """Identity of an option contract as used across the monitor: (symbol, expiry, strike, right)."""
+    return (contract.symbol, contract.lastTradeDateOrContractMonth, contract.strike, contract.right)
+
+
+def encode_expiry(expiry):
+    """'YYYYMMDD' as the int YYYYMMDD; a futures contract month 'YYYYMM' becomes YYYYMM00."""
+    return int(expiry[:8].ljust(8, '0')) if expiry else 0
+
+
+def decode_expiry(value):
+    value = int(value)
+    if not value:
+        return ''
+    return str(value // 100) if value % 100 == 0 else str(value)
+
+
+def encode_strike(strike):
+    """Strike in fixed point (1/STRIKE_SCALE of a point), so equal strikes compare exactly."""
+    return int(round(float(strike) * STRIKE_SCALE))
+
+
+def _num(value):
+    return math.nan if value is None else value
+
+
+def ticker_columns(tickers):
+    """
+    Extract quotes and model greeks from a list of ib_insync tickers into float64 columns.
+    Missing values (no greeks yet, None fields) become NaN.
+    """
+    n = len(tickers)
+    greeks = [t.modelGreeks for t in tickers]
+
+    def quote(attr):
+        return np.fromiter((_num(getattr(t, attr)) for t in tickers), dtype=np.float64, count=n)
+
+    def greek(attr):
+        return np.fromiter((_num(getattr(g, attr)) if g else math.nan for g in greeks), dtype=np.float64, count=n)
+
+    return {
+        'bid': quote('bid'),
+        'ask': quote('ask'),
+        'last': quote('last'),
+        'delta': greek('delta'),
+        'gamma': greek('gamma'),
+        'theta': greek('theta'),
+        'vega': greek('vega'),
+        'iv': greek('impliedVol'),
+        'und_price': greek('undPrice'),
+    }
+
+
+class ContractIndex:
+    """
+    Contract registry: every contract is interned once into an integer id (its row), and the monitor's IV
+    history, alert state and inventory links are all kept per id.
+
+    Static attributes are columns: expiry as an int YYYYMMDD, right as one byte, strike in fixed point
+    (`strike_fp`, plus a float64 copy for pricing) and the 16:00 expiry time. The registry is keyed by one int
+    packing (symbol code, expiry, strike, right), and qualified contracts are looked up by conId, so the tick
+    path hashes one int per contract instead of a tuple of strings.
+    """
+
+    def __init__(self, capacity=1024):
+        self._index = {}
+        self._by_con_id = {}
+        self._symbol_codes = {}
+        self.size = 0
+        self.symbol = np.empty(capacity, dtype=object)
+        self.expiry = np.zeros(capacity, dtype=np.int32)
+        self.strike_fp = np.zeros(capacity, dtype=np.int64)
+        self.strike = np.full(capacity, np.nan)
+        self.right = np.zeros(capacity, dtype='S1')
+        self.expires_at = np.full(capacity, np.datetime64('NaT'), dtype='datetime64[s]')
+        self.con_id = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    @property
+    def capacity(self):
+        return len(self.strike)
+
+    def _pack(self, symbol, expiry, strike_fp, right):
+        code = self._symbol_codes.get(symbol)
+        if code is None:
+            return None
+        return ((code << 25 | expiry) << 36 | strike_fp) << 1 | (right == b'P')
+
+    def get(self, key):
+        symbol, expiry, strike, right = key
+        packed = self._pack(symbol, encode_expiry(expiry), encode_strike(strike), right[:1].encode())
+        return None if packed is None else self._index.get(packed)
+
+    def add(self, contract):
+        """Return the id of the contract, assigning the next free one on first sight."""
+        con_id = getattr(contract, 'conId', 0)
+        if con_id:
+            idx = self._by_con_id.get(con_id)
+            if idx is not None:
+                return idx
+        return self.add_key(contract_key(contract), con_id)
+
+    def add_key(self, key, con_id=0):
+        symbol, expiry, strike, right = key
+        expiry, strike_fp, right = encode_expiry(expiry), encode_strike(strike), right[:1].encode()
+        self._symbol_codes.setdefault(symbol, len(self._symbol_codes))
+        packed = self._pack(symbol, expiry, strike_fp, right)
+        idx = self._index.get(packed)
+        if idx is None:
+            if self.size == self.capacity:
+                self._grow(self.capacity * 2)
+            idx = self.size
+            self._index[packed] = idx
+            self.symbol[idx] = symbol
+            self.expiry[idx], self.strike_fp[idx], self.right[idx] = expiry, strike_fp, right
+            self.strike[idx] = strike_fp / STRIKE_SCALE
+            if expiry % 100:
+                # Options expire at the 16:00 close of the expiration date
+                self.expires_at[idx] = np.datetime64(
+                    f"{expiry // 10000:04d}-{expiry // 100 % 100:02d}-{expiry % 100:02d}T16:00", 's')
+            self.size += 1
+        if con_id:
+            self._by_con_id[con_id] = idx
+            self.con_id[idx] = con_id
+        return idx
+
+    def indices(self, contracts):
+        return np.fromiter((self.add(c) for c in contracts), dtype=np.intp, count=len(contracts))
+
+    def key(self, idx):
+        """The (symbol, expiry, strike, right) key of a contract id, with the expiry and right as strings."""
+        return (self.symbol[idx], decode_expiry(self.expiry[idx]), float(self.strike[idx]),
+                self.right[idx].decode())
+
+    def keys(self):
+        return [self.key(idx) for idx in range(self.size)]
+
+    def expiry_labels(self, n=None):
+        """Expiries of the first `n` contracts as strings, decoded once per distinct expiry."""
+        n = self.size if n is None else n
+        values, inverse = np.unique(self.expiry[:n], return_inverse=True)
+        return np.array([decode_expiry(value) for value in values], dtype=object)[inverse]
+
+    def right_labels(self, n=None):
+        n = self.size if n is None else n
+        return self.right[:n].astype(str).astype(object)
+
+    def _grow(self, capacity):
+        for name in ('symbol', 'expiry', 'strike_fp', 'strike', 'right', 'expires_at', 'con_id'):
+            old = getattr(self, name)
+            fill = {'strike': np.nan, 'expires_at': np.datetime64('NaT')}.get(name, 0)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+
+class SnapshotStore:
+    """
+    Columnar store of chain snapshots.
+
+    Each cycle is one row block: a preallocated float64 row per field, indexed by the stable
+    contract index. The store keeps the last `max_cycles` cycles in a ring, so memory is fixed
+    for the whole session; callers drain older cycles to disk before they are overwritten.
+    A new row starts as a copy of the previous one, so every row is the full chain state at that time; an
+    `updated` mask per cycle records which contracts actually changed in it (what a replay feeds back).
+    """
+
+    def __init__(self, contract_capacity=1024, max_cycles=512, fields=SNAPSHOT_FIELDS):
+        self.contracts = ContractIndex(contract_capacity)
+        self.fields = tuple(fields)
+        self.max_cycles = max_cycles
+        self.cycles = 0
+        self.pending = 0
+        self._timestamps = np.zeros(max_cycles, dtype='datetime64[ns]')
+        self._underlying = np.full(max_cycles, np.nan)
+        self._updated = np.zeros((max_cycles, contract_capacity), dtype=bool)
+        self._columns = {f: np.full((max_cycles, contract_capacity), np.nan) for f in self.fields}
+
+    @property
+    def is_full(self):
+        """True when the next record() would overwrite a cycle that has not been drained."""
+        return self.pending >= self.max_cycles
+
+    def record(self, timestamp, indices, columns, underlying_price=None):
+        """
+        Write one cycle. `indices` are contract indices from `self.contracts`, `columns` maps field
+        name to an array aligned with `indices`. Fields not supplied keep their previous value.
+        Returns the ring row that was written.
+        """
+        self._ensure_capacity()
+        row = self.cycles % self.max_cycles
+        prev = (self.cycles - 1) % self.max_cycles
+
+        for name, data in self._columns.items():
+            if self.cycles:
+                data[row] = data[prev]
+            else:
+                data[row] = np.nan
+            values = columns.get(name)
+            if values is not None:
+                data[row, indices] = values
+
+        self._updated[row] = False
+        self._updated[row, indices] = True
+        self._timestamps[row] = np.datetime64(timestamp, 'ns')
+        self._underlying[row] = np.nan if underlying_price is None else underlying_price
+        self.cycles += 1
+        self.pending = min(self.pending + 1, self.max_cycles)
+        return row
+
+    def latest(self, field):
+        """Zero-copy view of the most recent value of `field` for every known contract."""
+        if not self.cycles:
+            return self._columns[field][0, :0]
+        return self._columns[field][(self.cycles - 1) % self.max_cycles, :len(self.contracts)]
+
+    def _retained_rows(self, last=None):
+        retained = min(self.cycles, self.max_cycles)
+        count = retained if last is None else min(last, retained)
+        start = self.cycles - count
+        return np.arange(start, self.cycles) % self.max_cycles
+
+    def wide_frame(self, field):
+        """
+        DataFrame of one field with one row per retained cycle and one column per contract.
+        Zero-copy while the ring has not wrapped yet.
+        """
+        n = len(self.contracts)
+        retained = min(self.cycles, self.max_cycles)
+        data = self._columns[field]
+        if self.cycles <= self.max_cycles:
+            values, stamps = data[:retained, :n], self._timestamps[:retained]
+        else:
+            rows = self._retained_rows()
+            values, stamps = data[rows, :n], self._timestamps[rows]
+        columns = pd.MultiIndex.from_tuples(self.contracts.keys(), names=['symbol', 'expiration', 'strike', 'right'])
+        return pd.DataFrame(values, index=pd.DatetimeIndex(stamps, name='timestamp'), columns=columns, copy=False)
+
+    def to_frame(self, last=None):
+        """Long-format DataFrame (one row per cycle and contract) of the last `last` retained cycles."""
+        n = len(self.contracts)
+        rows = self._retained_rows(last)
+        k = len(rows)
+        frame = {
+            'timestamp': np.repeat(self._timestamps[rows], n),
+            'underlying': np.repeat(self._underlying[rows], n),
+            'symbol': np.tile(self.contracts.symbol[:n], k),
+            'expiration': np.tile(self.contracts.expiry_labels(n), k),
+            'right': np.tile(self.contracts.right_labels(n), k),
+            'strike': np.tile(self.contracts.strike[:n], k),
+            'updated': self._updated[rows, :n].reshape(-1),
+        }
+        for name, data in self._columns.items():
+            frame[name] = data[rows, :n].reshape(-1)
+        return pd.DataFrame(frame, copy=False)
+
+    def drain(self):
+        """Return the cycles recorded since the last drain as a long DataFrame and mark them drained."""
+        frame = self.to_frame(last=self.pending)
+        self.pending = 0
+        return frame
+
+    def to_arrow(self, last=None):
+        return pa.Table.from_pandas(self.to_frame(last), preserve_index=False)
+
+    def _ensure_capacity(self):
+        capacity = self.contracts.capacity
+        current = next(iter(self._columns.values())).shape[1]
+        if capacity == current:
+            return
+        updated = np.zeros((self.max_cycles, capacity), dtype=bool)
+        updated[:, :current] = self._updated
+        self._updated = updated
+        for name, data in self._columns.items():
+            grown = np.full((self.max_cycles, capacity), np.nan)
+            grown[:, :current] = data
+            self._columns[name] = grown
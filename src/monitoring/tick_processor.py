@@ -0,0 +1,99 @@
+import logging
+import time
+
+import numpy as np
+from ib_insync import util
+
+from src.monitoring.metrics import Metrics
+from src.monitoring.snapshot_store import ticker_columns
+
+
+class TickProcessor:
+    """
+    Event-driven processing of ticker updates.
+
+    Subscribes to `ib.pendingTickersEvent` and feeds only the tickers that actually changed into the
+    pipeline. Updates arriving within `coalesce_interval` seconds are merged into one batch
+    (latest ticker state per contract); an interval of 0 processes every event immediately.
+    Latencies are measured from the first update of a batch: `wait_for_data_seconds` until processing
+    starts, `tick_to_processed_seconds` until it ends and `tick_to_alert_seconds` for batches that alerted.
+    """
+    def __init__(self, ib, pipeline, tracker, coalesce_interval=0.25, metrics=None):
+        self.ib = ib
+        self.pipeline = pipeline
+        self.tracker = tracker
+        self.coalesce_interval = coalesce_interval
+        self._index = {}
+        self._pending = {}
+        self._underlying_changed = False
+        self._flush_handle = None
+        self._first_update = None
+        metrics = metrics if metrics is not None else Metrics()
+        self.wait_for_data = metrics.histogram('wait_for_data_seconds')
+        self.snapshot_build = metrics.histogram('stage_seconds', stage='snapshot_build')
+        self.tick_to_processed = metrics.histogram('tick_to_processed_seconds')
+        self.tick_to_alert = metrics.histogram('tick_to_alert_seconds')
+        self.events = metrics.counter('ticker_events')
+
+    def watch(self, tickers):
+        """Map tickers to their contract indices so events can be routed without key building."""
+        indices = self.pipeline.add_contracts([ticker.contract for ticker in tickers])
+        for ticker, idx in zip(tickers, indices):
+            self._index[id(ticker)] = idx
+
+    def unwatch(self, tickers):
+        for ticker in tickers:
+            idx = self._index.pop(id(ticker), None)
+            self._pending.pop(idx, None)
+
+    def start(self):
+        self.ib.pendingTickersEvent += self.on_pending_tickers
+        logging.info(f"Event-driven processing of {len(self._index)} tickers "
+                     f"(coalescing window {self.coalesce_interval}s)")
+
+    def stop(self):
+        self.ib.pendingTickersEvent -= self.on_pending_tickers
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self.flush()
+
+    def on_pending_tickers(self, tickers):
+        self.events.inc()
+        if self._first_update is None:
+            self._first_update = time.perf_counter()
+        for ticker in tickers:
+            idx = self._index.get(id(ticker))
+            if idx is not None:
+                self._pending[idx] = ticker
+            elif ticker is self.tracker.ticker:
+                self._underlying_changed = True
+
+        if not self._pending and not self._underlying_changed:
+            self._first_update = None
+            return
+        if self.coalesce_interval <= 0:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = util.getLoop().call_later(self.coalesce_interval, self.flush)
+
+    def flush(self):
+        self._flush_handle = None
+        first_update, self._first_update = self._first_update, None
+        if not self._pending and not self._underlying_changed:
+            return
+        pending, self._pending = self._pending, {}
+        self._underlying_changed = False
+        started = time.perf_counter()
+        if first_update is not None:
+            self.wait_for_data.record(started - first_update)
+
+        indices = np.fromiter(pending.keys(), dtype=np.intp, count=len(pending))
+        columns = ticker_columns(list(pending.values()))
+        self.snapshot_build.record(time.perf_counter() - started)
+        alerts = self.pipeline.process(indices, columns, self.tracker.current_price(),
+                                       underlying_iv=self.tracker.current_iv())
+        if first_update is not None:
+            latency = time.perf_counter() - first_update
+            self.tick_to_processed.record(latency)
+            if alerts:
+                self.tick_to_alert.record(latency)
@@ -0,0 +1,137 @@
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+class ParquetSnapshotWriter:
+    """
+    Streams snapshot frames into time-partitioned Parquet files from a background thread.
+
+    Used as a `ChainPipeline` snapshot sink: calling it only enqueues the frame. When the bounded queue is
+    full the frame is dropped and counted, so disk I/O never blocks the tick path. Files are laid out as
+    `{root}/{partition}/date=YYYY-MM-DD/hour=HH/part-HHMMSS-N.parquet`; a new part is started every
+    `rotate_seconds` and at every hour boundary, so a crash loses at most the part being written.
+    With `compact_hours` the writer thread merges the parts of an hour partition once it has moved on to the next
+    one, so compaction never races the part being written.
+    """
+    def __init__(self, root='snapshots', partition='', rotate_seconds=300, max_queue=64, compact_hours=True):
+        self.root = os.path.join(root, partition) if partition else root
+        self.rotate_seconds = rotate_seconds
+        self.compact_hours = compact_hours
+        self.dropped = 0
+        self.written_rows = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._writer = None
+        self._writer_dir = None
+        self._hour_dir = None
+        self._opened_at = 0.0
+        self._schema = None
+        self._seq = 0
+        self._thread = threading.Thread(target=self._run, name=f"snapshot-writer-{partition or 'default'}", daemon=True)
+        self._thread.start()
+
+    def __call__(self, frame):
+        try:
+            self._queue.put_nowait(frame)
+        except queue.Full:
+            self.dropped += 1
+            logging.warning(f"Snapshot queue full, dropped {len(frame)} rows ({self.dropped} batches dropped so far)")
+
+    def close(self, timeout=30):
+        """Write everything still queued, close the current part and stop the thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            try:
+                self._write(frame)
+            except Exception as e:
+                logging.error(f"Failed to write {len(frame)} snapshot rows: {e}")
+        self._close_part()
+
+    def _write(self, frame):
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self._schema is None:
+            self._schema = table.schema
+        else:
+            table = table.cast(self._schema)
+
+        stamp = frame['timestamp'].iloc[0] if len(frame) else datetime.now()
+        directory = os.path.join(self.root, f"date={stamp:%Y-%m-%d}", f"hour={stamp:%H}")
+        if directory != self._writer_dir or time.monotonic() - self._opened_at >= self.rotate_seconds:
+            self._close_part()
+            if self.compact_hours and self._hour_dir not in (None, directory):
+                self._compact(self._hour_dir)
+            self._hour_dir = directory
+            os.makedirs(directory, exist_ok=True)
+            self._seq += 1
+            path = os.path.join(directory, f"part-{stamp:%H%M%S}-{self._seq}.parquet")
+            self._writer = pq.ParquetWriter(path, self._schema)
+            self._writer_dir = directory
+            self._opened_at = time.monotonic()
+
+        self._writer.write_table(table)
+        self.written_rows += len(frame)
+
+    @staticmethod
+    def _compact(directory):
+        try:
+            rows = compact_partition(directory)
+            logging.info(f"Compacted {directory} ({rows} rows)")
+        except Exception as e:
+            logging.error(f"Failed to compact {directory}: {e}")
+
+    def _close_part(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._writer_dir = None
+
+
+def compact_partition(directory, output_name='compacted.parquet'):
+    """
+    Merge the part files of one closed partition directory into a single Parquet file and remove the parts.
+    Returns the number of rows in the compacted file.
+    """
+    parts = sorted(name for name in os.listdir(directory) if name.startswith('part-') and name.endswith('.parquet'))
+    existing = os.path.join(directory, output_name)
+    sources = ([existing] if os.path.exists(existing) else []) + [os.path.join(directory, name) for name in parts]
+    if not parts:
+        return pq.read_metadata(existing).num_rows if os.path.exists(existing) else 0
+
+    table = pa.concat_tables([pq.read_table(path) for path in sources])
+    tmp = os.path.join(directory, f".{output_name}.tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, existing)
+    for name in parts:
+        os.remove(os.path.join(directory, name))
+    return table.num_rows
+
+
+def compact(root, before=None, grace=3600):
+    """
+    Compact every `date=/hour=` partition under `root` that ended at least `grace` seconds before `before`
+    (default: now). Meant for directories no running writer compacts itself; the grace period keeps it off
+    partitions a writer may still be appending late frames to.
+    """
+    before = before or datetime.now()
+    compacted = 0
+    for directory, _, files in os.walk(root):
+        date_part, hour_part = os.path.basename(os.path.dirname(directory)), os.path.basename(directory)
+        if not (date_part.startswith('date=') and hour_part.startswith('hour=')):
+            continue
+        hour = datetime.strptime(f"{date_part[5:]} {hour_part[5:]}", '%Y-%m-%d %H')
+        if (before - hour).total_seconds() >= 3600 + grace and any(f.startswith('part-') for f in files):
+            compact_partition(directory)
+            compacted += 1
+    return compacted
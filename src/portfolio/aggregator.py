@@ -0,0 +1,117 @@
+from collections import defaultdict
+
+import numpy as np
+
+GREEKS = ('delta', 'gamma', 'theta', 'vega')
+
+
+class GreeksAggregator:
+    """
+    Net delta/gamma/theta/vega per strategy, per underlying and for the whole portfolio.
+    Totals are never rescanned: every contract update adds only its change, scaled by position size.
+    """
+    def __init__(self):
+        self.strategies = defaultdict(lambda: np.zeros(len(GREEKS)))
+        self.underlyings = defaultdict(lambda: np.zeros(len(GREEKS)))
+        self.portfolio = np.zeros(len(GREEKS))
+
+    def apply(self, strategy, underlying, change):
+        self.strategies[strategy] += change
+        self.underlyings[underlying] += change
+        self.portfolio += change
+
+    def exposure(self, positions, multiplier=100):
+        """Exposure of one chain (one contract index) to the positions of a `PositionIndex`."""
+        return ChainExposure(self, positions, multiplier)
+
+    def totals(self):
+        """{level: {name: {greek: value}}} for the 'strategy', 'underlying' and 'portfolio' levels."""
+        def named(values):
+            return dict(zip(GREEKS, values.tolist()))
+        return {
+            'strategy': {name: named(values) for name, values in self.strategies.items()},
+            'underlying': {name: named(values) for name, values in self.underlyings.items()},
+            'portfolio': {'portfolio': named(self.portfolio)},
+        }
+
+
+class ChainExposure:
+    """
+    Links the contract index of one chain to inventory positions and feeds greeks changes of held
+    contracts into the shared `GreeksAggregator`. Contracts without a position cost one mask lookup.
+    """
+    def __init__(self, aggregator, positions, multiplier=100):
+        self.aggregator = aggregator
+        self.positions = positions
+        self.multiplier = multiplier
+        self._held = np.zeros(0, dtype=bool)
+        self._legs = {}
+        self._last = {}
+        self._contracts = None
+
+    def _legs_of(self, key):
+        return [(strategy, position.symbol, position.quantity * self.multiplier)
+                for strategy, position in self.positions.get(key)]
+
+    def _resolve(self, contracts):
+        self._contracts = contracts
+        n = len(contracts)
+        resolved = len(self._held)
+        if resolved >= n:
+            return
+        held = np.zeros(contracts.capacity, dtype=bool)
+        held[:resolved] = self._held
+        for idx in range(resolved, n):
+            legs = self._legs_of(contracts.key(idx))
+            if legs:
+                held[idx] = True
+                self._legs[idx] = legs
+        self._held = held[:n]
+
+    def refresh(self, keys):
+        """
+        Re-link contracts whose inventory positions changed (see `InventoryWatcher`): the contribution of
+        their last greeks moves from the old legs to the new ones, nothing else is recomputed.
+        """
+        if self._contracts is None:
+            return
+        for key in keys:
+            idx = self._contracts.get(key)
+            if idx is None or idx >= len(self._held):
+                continue
+            last = self._last.get(idx)
+            legs = self._legs_of(key)
+            if last is not None:
+                for strategy, underlying, size in self._legs.get(idx, ()):
+                    self.aggregator.apply(strategy, underlying, -size * last)
+                for strategy, underlying, size in legs:
+                    self.aggregator.apply(strategy, underlying, size * last)
+            self._held[idx] = bool(legs)
+            if legs:
+                self._legs[idx] = legs
+            else:
+                self._legs.pop(idx, None)
+                self._last.pop(idx, None)
+
+    def update(self, contracts, indices, columns):
+        """Apply the greeks of the updated contracts; returns True when any aggregate changed."""
+        self._resolve(contracts)
+        indices = np.asarray(indices, dtype=np.intp)
+        rows = np.flatnonzero(self._held[indices])
+        if not len(rows):
+            return False
+
+        missing = np.full(len(rows), np.nan)
+        values = np.column_stack([columns[g][rows] if g in columns else missing for g in GREEKS])
+        changed = False
+        for idx, new in zip(indices[rows].tolist(), values):
+            old = self._last.get(idx, np.zeros(len(GREEKS)))
+            new = np.where(np.isnan(new), old, new)
+            change = new - old
+            if not change.any():
+                continue
+            self._last[idx] = new
+            for strategy, underlying, size in self._legs[idx]:
+                self.aggregator.apply(strategy, underlying, size * change)
+            changed = True
+        return changed
@@ -0,0 +1,129 @@
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.config.config import AlertConfig, UnderlyingConfig
+from src.monitoring.monitor import OptionMonitor
+from src.monitoring.pipeline import ChainPipeline, build_alert_engine, build_greeks_engine
+
+# Inputs of the pipeline; derived columns (iv_zscore, ...) are recomputed during the replay
+REPLAY_FIELDS = ('bid', 'ask', 'last', 'delta', 'gamma', 'theta', 'vega', 'iv', 'und_price')
+
+
+def load_snapshots(path):
+    """Load snapshots written by the monitor: a CSV file, a Parquet file or a partitioned Parquet directory."""
+    if path.endswith('.csv'):
+        frame = pd.read_csv(path, dtype={'expiration': str})
+    else:
+        frame = pd.read_parquet(path)
+    frame['timestamp'] = pd.to_datetime(frame['timestamp'])
+    return frame.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+
+class ReplayResult:
+    def __init__(self):
+        self.cycles = 0
+        self.rows = 0
+        self.alerts = []
+        self.elapsed = 0.0
+
+    @property
+    def ticks_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (f"ReplayResult(cycles={self.cycles}, rows={self.rows}, alerts={len(self.alerts)}, "
+                f"elapsed={self.elapsed:.2f}s, ticks/s={self.ticks_per_second:,.0f})")
+
+
+class ReplayEngine:
+    """
+    Drives a `ChainPipeline` from recorded snapshots instead of a live IB connection.
+
+    Rows are grouped into cycles by timestamp and fed through the same processing as live ticks, with the
+    recorded timestamp as the clock. Only the contracts marked `updated` in a cycle are fed (recordings
+    without the column replay every row), so IV statistics see the same samples as the live monitor did.
+    `speed=None` replays as fast as possible; `speed=1.0` waits the recorded time between cycles (real time),
+    `speed=10` ten times faster.
+    """
+    def __init__(self, pipeline, frame, symbol='SPX', speed=None):
+        self.pipeline = pipeline
+        self.frame = frame
+        self.symbol = symbol
+        self.speed = speed
+
+    def _contract_indices(self):
+        frame = self.frame
+        symbols = frame['symbol'] if 'symbol' in frame else pd.Series(self.symbol, index=frame.index)
+        keys = pd.MultiIndex.from_arrays([symbols, frame['expiration'].astype(str),
+                                          frame['strike'].astype(float), frame['right']])
+        codes, uniques = pd.factorize(keys)
+        mapping = np.fromiter((self.pipeline.contracts.add_key(key) for key in uniques),
+                              dtype=np.intp, count=len(uniques))
+        return mapping[codes]
+
+    def cycles(self):
+        """Yield (timestamp, indices, columns, underlying_price) for every recorded cycle."""
+        frame = self.frame
+        indices = self._contract_indices()
+        stamps = frame['timestamp'].to_numpy()
+        underlying = frame['underlying'].to_numpy(dtype=np.float64) if 'underlying' in frame else None
+        fields = {name: frame[name].to_numpy(dtype=np.float64) for name in REPLAY_FIELDS if name in frame}
+        updated = frame['updated'].to_numpy(dtype=bool) if 'updated' in frame else None
+        bounds = np.append(np.flatnonzero(np.r_[True, stamps[1:] != stamps[:-1]]), len(frame))
+
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            rows = np.arange(start, end) if updated is None else start + np.flatnonzero(updated[start:end])
+            columns = {name: values[rows] for name, values in fields.items()}
+            price = None
+            if underlying is not None and np.isfinite(underlying[start]):
+                price = float(underlying[start])
+            yield pd.Timestamp(stamps[start]).to_pydatetime(), indices[rows], columns, price
+
+    def run(self):
+        result = ReplayResult()
+        started = time.perf_counter()
+        previous = None
+        for timestamp, indices, columns, price in self.cycles():
+            if self.speed and previous is not None:
+                time.sleep(max((timestamp - previous).total_seconds() / self.speed, 0.0))
+            previous = timestamp
+            for alert in self.pipeline.process(indices, columns, price, timestamp):
+                result.alerts.append((timestamp, alert))
+            result.cycles += 1
+            result.rows += len(indices)
+        self.pipeline.flush()
+        result.elapsed = time.perf_counter() - started
+        return result
+
+
+def build_replay_pipeline(config, symbol, snapshot_sink=None):
+    """Pipeline with the alert and greeks settings of `config`, without live-only state (history file, positions)."""
+    settings = config.underlyings.get(symbol, UnderlyingConfig())
+    return ChainPipeline(OptionMonitor(iv_window=config.iv_window), build_alert_engine(config, symbol, settings),
+                         snapshot_sink=snapshot_sink, greeks_engine=build_greeks_engine(config, settings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded option snapshots through the monitor pipeline")
+    parser.add_argument('path', help="snapshot CSV, Parquet file or partitioned Parquet directory")
+    parser.add_argument('--symbol', default='SPX', help="underlying of the recording (used when rows carry no symbol)")
+    parser.add_argument('--speed', type=float, default=None,
+                        help="replay speed relative to real time (1 = real time); as fast as possible when omitted")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format='%(asctime)s [%(levelname)s] %(message)s')
+    frame = load_snapshots(args.path)
+    if 'symbol' in frame:
+        frame = frame[frame['symbol'] == args.symbol].reset_index(drop=True)
+    result = ReplayEngine(build_replay_pipeline(AlertConfig(), args.symbol), frame, args.symbol, args.speed).run()
+    for timestamp, alert in result.alerts:
+        print(f"{timestamp.isoformat()} {alert}")
+    print(result)
+
+
+if __name__ == '__main__':
+    main()
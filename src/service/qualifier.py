@@ -0,0 +1,116 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import date
+
+
+class ContractQualifier:
+    """
+    Contract qualification with an on-disk conId cache.
+
+    Only contracts missing from the cache are sent to IB, split into chunks of `chunk_size` of which at most
+    `max_concurrent` are in flight; each chunk holds its slot for `chunk_delay` seconds to stay within IB pacing.
+    Cache entries are keyed by (symbol, expiry, strike, right, exchange, trading class) and evicted once the
+    expiry has passed.
+    Contracts IB does not know (e.g. strikes not listed for that expiry) are cached as unresolved and skipped
+    until the next day, when new strikes may have been listed.
+    """
+    CACHED_FIELDS = ('conId', 'tradingClass', 'localSymbol', 'multiplier', 'currency')
+
+    def __init__(self, ib, cache_file='contracts_cache.json', chunk_size=50, max_concurrent=4, chunk_delay=1.0):
+        self.ib = ib
+        self.cache_file = cache_file
+        self.chunk_size = chunk_size
+        self.max_concurrent = max_concurrent
+        self.chunk_delay = chunk_delay
+        self.cache = self.load()
+
+    @staticmethod
+    def cache_key(contract):
+        return '|'.join(str(v) for v in (
+            contract.symbol, contract.lastTradeDateOrContractMonth, float(contract.strike), contract.right, contract.exchange,
+            contract.tradingClass))
+
+    def load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file) as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable contract cache {self.cache_file}: {e}")
+            return {}
+        today = date.today().strftime('%Y%m%d')
+        live = {key: fields for key, fields in cache.items()
+                if not self._expired(key.split('|')[1], today) and fields.get('unresolved', today) >= today}
+        if len(live) < len(cache):
+            logging.info(f"Evicted {len(cache) - len(live)} expired contracts from {self.cache_file}")
+        return live
+
+    def save(self):
+        if not self.cache_file:
+            return
+        tmp = f"{self.cache_file}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.cache, f)
+        os.replace(tmp, self.cache_file)
+
+    @staticmethod
+    def _expired(expiry, today):
+        # Futures options may carry a YYYYMM contract month, compare on the same precision
+        return bool(expiry) and expiry < today[:len(expiry)]
+
+    def qualify(self, contracts):
+        """Blocking variant of `qualify_async` for scripts that are not running an event loop."""
+        return self.ib.run(self.qualify_async(contracts))
+
+    async def qualify_async(self, contracts):
+        """Qualify contracts in place and return the ones that resolved to a conId."""
+        # A long running process does not reload the cache, unresolved entries from an earlier day are retried here
+        today = date.today().strftime('%Y%m%d')
+        missing = []
+        for contract in contracts:
+            fields = self.cache.get(self.cache_key(contract))
+            if self._stale(fields, today):
+                missing.append(contract)
+            elif 'unresolved' not in fields:
+                for name, value in fields.items():
+                    setattr(contract, name, value)
+
+        if missing:
+            logging.info(f"Qualifying {len(missing)} of {len(contracts)} contracts ({len(contracts) - len(missing)} cached)")
+            semaphore = asyncio.Semaphore(self.max_concurrent)
+            chunks = [missing[i:i + self.chunk_size] for i in range(0, len(missing), self.chunk_size)]
+            await asyncio.gather(*(self._qualify_chunk(chunk, semaphore) for chunk in chunks))
+            self.save()
+
+        return [contract for contract in contracts if contract.conId]
+
+    def unknown(self, contracts):
+        """The contracts neither resolved nor known to be unlisted, i.e. whose qualification request failed."""
+        today = date.today().strftime('%Y%m%d')
+        return [contract for contract in contracts
+                if not contract.conId and self._stale(self.cache.get(self.cache_key(contract)), today)]
+
+    @staticmethod
+    def _stale(fields, today):
+        return not fields or fields.get('unresolved', today) < today
+
+    async def _qualify_chunk(self, chunk, semaphore):
+        async with semaphore:
+            # Key on the requested fields, IB may complete e.g. a contract month into a full expiry date
+            keys = [self.cache_key(contract) for contract in chunk]
+            try:
+                await self.ib.qualifyContractsAsync(*chunk)
+            except Exception as e:
+                # A failed request says nothing about the contracts, they are requested again next time
+                logging.warning(f"Qualification of {len(chunk)} contracts failed: {e}")
+            else:
+                today = date.today().strftime('%Y%m%d')
+                for key, contract in zip(keys, chunk):
+                    if contract.conId:
+                        self.cache[key] = {name: getattr(contract, name) for name in self.CACHED_FIELDS}
+                    else:
+                        self.cache[key] = {'unresolved': today}
+            await asyncio.sleep(self.chunk_delay)
@@ -0,0 +1,356 @@
+import asyncio
+import logging
+import os
+from datetime import date, timedelta
+
+from src.alerting.bus import build_alert_bus
+from src.alerting.rules import RuleEngine, alert_rules
+from src.config.config import UnderlyingConfig
+from src.loader.inventory_loader import InventoryWatcher, PositionIndex
+from src.monitoring.history_store import TickHistoryStore
+from src.monitoring.iv_history import build_iv_history
+from src.monitoring.metrics import Metrics, MetricsServer
+from src.monitoring.monitor import OptionMonitor
+from src.monitoring.pipeline import ChainPipeline, build_alert_engine, build_greeks_engine, build_snapshot_sink
+from src.monitoring.tick_processor import TickProcessor
+from src.portfolio.aggregator import GreeksAggregator
+from src.service.qualifier import ContractQualifier
+from src.service.subscription_manager import SubscriptionManager
+from src.service.symbol_tracker import SymbolTracker
+from src.workers.pool import WorkerPool
+
+
+class UnderlyingMonitor:
+    """Tracker, market data subscriptions and processing pipeline of one underlying."""
+    def __init__(self, tracker, pipeline, subscriptions):
+        self.tracker = tracker
+        self.pipeline = pipeline
+        self.subscriptions = subscriptions
+        self.processor = None
+        self.tasks = []
+
+    @property
+    def symbol(self):
+        return self.tracker.symbol
+
+    @property
+    def tickers(self):
+        return self.subscriptions.tickers
+
+    def on_subscriptions_changed(self, added, removed):
+        if self.processor is not None:
+            self.processor.unwatch(removed)
+            self.processor.watch(added)
+
+
+class MonitorScheduler:
+    """
+    Starts one monitor per underlying concurrently on a single IB connection.
+
+    Chain discovery, qualification and market data subscription of all underlyings run as
+    concurrent tasks, and each underlying starts processing as soon as its own chain is ready,
+    so startup takes as long as the slowest underlying and a slow chain never blocks the others.
+    """
+    def __init__(self, ib, config, positions=None):
+        self.ib = ib
+        self.config = config
+        self.positions = positions if positions is not None else PositionIndex()
+        self.aggregator = GreeksAggregator()
+        # Aggregate rules watch portfolio-wide totals, so one engine is shared by all underlyings
+        self.aggregate_alert_engine = RuleEngine([rule for rule in alert_rules(config) if rule.scope == 'aggregate'])
+        self.monitors = {}
+        self.metrics = Metrics()
+        self.metrics_server = None
+        self._metrics_task = None
+        self._results_task = None
+        self._inventory_task = None
+        self.inventory = None
+        if config.inventory_reload_interval and config.inventory_file and os.path.exists(config.inventory_file):
+            self.inventory = InventoryWatcher(config.inventory_file, self.positions)
+        self.history_store = None
+        if config.history_file and not config.worker_processes:
+            self.history_store = TickHistoryStore(config.history_file, slots=config.history_slots,
+                                                  depth=config.history_depth)
+        self.iv_history = build_iv_history(ib, config)
+        self._iv_history_tasks = []
+        # Forked before any thread is started (metrics server, snapshot writers)
+        self.workers = None
+        if config.worker_processes:
+            self.log_worker_limits()
+            self.workers = WorkerPool(config, processes=config.worker_processes, partition=config.worker_partition,
+                                      ring_capacity=config.worker_ring_capacity)
+        self.alert_bus = build_alert_bus(config)
+        self.qualifier = ContractQualifier(ib, cache_file=config.contract_cache_file,
+                                           chunk_size=config.qualify_chunk_size,
+                                           max_concurrent=config.qualify_concurrency,
+                                           chunk_delay=config.qualify_chunk_delay)
+
+    def log_worker_limits(self):
+        """Report the configured features that only run in single-process mode; workers leave them off."""
+        config = self.config
+        disabled = []
+        if len(self.aggregate_alert_engine.aggregate_rules):
+            names = ', '.join(rule.name for rule in self.aggregate_alert_engine.aggregate_rules.rules)
+            disabled.append(f"aggregate alert rules ({names})")
+        if self.inventory is not None or len(self.positions):
+            disabled.append("portfolio greeks aggregation of the inventory")
+        if config.history_file:
+            disabled.append(f"tick history file {config.history_file}")
+        for feature in disabled:
+            logging.error(f"worker_processes={config.worker_processes}: {feature} is not available with workers "
+                          f"and is disabled, set worker_processes: 0 to use it")
+        return disabled
+
+    async def start(self, symbols):
+        self.start_metrics()
+        if self.inventory is not None and self._inventory_task is None:
+            self._inventory_task = asyncio.ensure_future(self.watch_inventory())
+        results = await asyncio.gather(*(self.start_underlying(symbol) for symbol in symbols), return_exceptions=True)
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                logging.error(f"Failed to start monitor for {symbol}: {result}")
+        return self.monitors
+
+    async def start_underlying(self, symbol):
+        settings = self.config.underlyings.get(symbol, UnderlyingConfig())
+        tracker = SymbolTracker(self.ib, symbol, exchange=settings.exchange, sec_type=settings.sec_type,
+                                continuous=settings.continuous, autostart=False,
+                                chain_ttl=self.config.chain_cache_ttl)
+        await tracker.start_async()
+        self.warm_iv_history(tracker.contract)
+        underlying_price = await tracker.get_price_async()
+
+        chain = await self.option_chain(tracker, settings)
+        if chain is None:
+            raise ValueError(f"No option chain for {symbol}")
+
+        contracts = self.build_contracts(tracker, chain, underlying_price)
+        contracts = await self.qualifier.qualify_async(contracts)
+        lines = settings.market_data_lines or self.config.market_data_lines
+        subscriptions = SubscriptionManager(self.ib, max_lines=lines,
+                                            rebalance_threshold=self.config.rebalance_threshold)
+        subscriptions.set_candidates(contracts, self.positions.keys(symbol))
+        subscriptions.rebalance(underlying_price, force=True)
+        logging.info(f"{symbol}: subscribed {len(subscriptions.live)} of {len(contracts)} contracts "
+                     f"around {underlying_price}")
+
+        pipeline = self.build_pipeline(symbol, settings, lines, multiplier=float(chain.multiplier or 100))
+        monitor = UnderlyingMonitor(tracker, pipeline, subscriptions)
+        subscriptions.on_change = monitor.on_subscriptions_changed
+        self.monitors[symbol] = monitor
+        self.run_monitor(monitor)
+        return monitor
+
+    async def option_chain(self, tracker, settings):
+        """The configured trading classes of the chain, expiring within `max_dte` days from today."""
+        today = date.today()
+        return await tracker.get_option_chain_async(expiry_range=(today, today + timedelta(days=self.config.max_dte)),
+                                                    trading_class=settings.trading_classes or None)
+
+    def build_contracts(self, tracker, chain, underlying_price):
+        """
+        The strike window (OTM calls and puts of every expiration, see `StrikeWindow`) centered on the
+        underlying price, plus the inventory positions of the underlying.
+        """
+        config = self.config
+        carry = 0.0 if tracker.sec_type == 'FUT' else config.risk_free_rate - config.dividend_yield
+        window = tracker.strike_window(chain, width=config.strike_window_width, min_delta=config.strike_window_delta,
+                                       volatility=config.strike_window_volatility, carry=carry)
+        window.update(underlying_price)
+        contracts = [tracker.build_option(expiry, strike, right) for _, expiry, strike, right in window.keys()]
+        for pos in self.positions.positions(tracker.symbol):
+            contracts.append(tracker.build_option(pos.expiry, pos.strike, pos.right))
+        return contracts
+
+    def build_pipeline(self, symbol, settings, size, multiplier=100):
+        config = self.config
+        iv_range = self.iv_history.range(symbol) if self.iv_history is not None else None
+        if self.workers is not None:
+            return self.workers.pipeline(symbol, metrics=self.metrics.scope(symbol=symbol),
+                                         alert_sink=self.alert_bus.publisher(symbol), iv_range=iv_range)
+        sink = build_snapshot_sink(config, symbol)
+        monitor = OptionMonitor(contract_capacity=max(size, 1), iv_window=config.iv_window,
+                                history_store=self.history_store, iv_range=iv_range)
+        return ChainPipeline(monitor, build_alert_engine(config, symbol, settings), snapshot_sink=sink,
+                             greeks_engine=build_greeks_engine(config, settings),
+                             exposure=self.aggregator.exposure(self.positions, multiplier),
+                             aggregate_alert_engine=self.aggregate_alert_engine,
+                             flush_every=config.snapshot_flush_cycles, metrics=self.metrics.scope(symbol=symbol),
+                             alert_sink=self.alert_bus.publisher(symbol))
+
+    def warm_iv_history(self, contract):
+        """Fetch the IV bars missing from the cache in the background; the monitor starts on the cached range."""
+        if self.iv_history is not None:
+            self._iv_history_tasks.append(asyncio.ensure_future(self.iv_history.warm([contract])))
+
+    def run_monitor(self, monitor):
+        if self.config.event_driven:
+            monitor.processor = TickProcessor(self.ib, monitor.pipeline, monitor.tracker,
+                                              coalesce_interval=self.config.coalesce_interval,
+                                              metrics=monitor.pipeline.metrics)
+            monitor.processor.watch(monitor.tickers)
+            monitor.processor.start()
+        else:
+            monitor.tasks.append(asyncio.ensure_future(self.poll(monitor)))
+        monitor.tasks.append(asyncio.ensure_future(self.rebalance(monitor)))
+
+    async def poll(self, monitor):
+        logging.info(f"{monitor.symbol}: logging every {self.config.polling_interval}s with alert triggers")
+        while True:
+            await asyncio.sleep(self.config.polling_interval)
+            monitor.pipeline.process_tickers(monitor.tickers, monitor.tracker.current_price(),
+                                             underlying_iv=monitor.tracker.current_iv())
+            logging.info(f"{monitor.symbol}: logged {len(monitor.tickers)} entries")
+
+    async def rebalance(self, monitor):
+        """Follow the underlying with the subscribed strikes; only moves past the threshold change anything."""
+        while True:
+            await asyncio.sleep(self.config.rebalance_interval)
+            if not self.ib.isConnected():
+                continue
+            # One failed request must not stop following the underlying for the rest of the session
+            try:
+                price = monitor.tracker.current_price()
+                rolled = await self.roll_expirations(monitor)
+                recentered = await self.recenter(monitor, price)
+                monitor.subscriptions.rebalance(price, force=recentered or rolled)
+            except Exception as e:
+                logging.error(f"{monitor.symbol}: strike window update failed: {e}")
+
+    async def roll_expirations(self, monitor):
+        """
+        Follow the listed expirations (the chain is fetched again once the tracker's cache expires, at the latest
+        at the day change): expired ones leave the candidates, new ones within `max_dte` enter at the next
+        `recenter`. Returns True when the expirations changed.
+        """
+        tracker = monitor.tracker
+        if tracker.window is None:
+            return False
+        chain = await self.option_chain(tracker, self.config.underlyings.get(monitor.symbol, UnderlyingConfig()))
+        if chain is None or set(chain.expirations) == set(tracker.window.strikes):
+            return False
+        removed = tracker.window.roll(chain.expirations, chain.expiry_strikes or chain.strikes)
+        monitor.subscriptions.update_candidates(removed=removed)
+        logging.info(f"{monitor.symbol}: expirations rolled, {len(chain.expirations)} within {self.config.max_dte} "
+                     f"days: -{len(removed)} strikes")
+        return True
+
+    async def recenter(self, monitor, price):
+        """
+        Keep the strike window on the underlying: only strikes that crossed its edges are qualified (mostly from
+        the contract cache) and added to, or dropped from, the candidates. The window only moves once every
+        entering strike is qualified (or known to be unlisted), so strikes of a failed request are retried at the
+        next call. Returns True when the window moved.
+        """
+        tracker = monitor.tracker
+        if tracker.window is None:
+            return False
+        ranges, added, removed = tracker.window.moves(price)
+        if not added and not removed:
+            tracker.window.commit(price, ranges)
+            return False
+        contracts = []
+        if added:
+            options = [tracker.build_option(expiry, strike, right) for _, expiry, strike, right in added]
+            contracts = await self.qualifier.qualify_async(options)
+            failed = self.qualifier.unknown(options)
+            if failed:
+                logging.warning(f"{monitor.symbol}: {len(failed)} strikes entering the window could not be qualified, "
+                                f"keeping the window at {tracker.window.price} until they are")
+                return False
+        tracker.window.commit(price, ranges)
+        monitor.subscriptions.update_candidates(contracts, removed)
+        logging.info(f"{monitor.symbol}: strike window moved to {price}: +{len(added)} -{len(removed)} strikes")
+        return True
+
+    async def watch_inventory(self):
+        while True:
+            await asyncio.sleep(self.config.inventory_reload_interval)
+            # One bad edit or failed qualification must not stop the reload for the rest of the session
+            try:
+                diff = self.inventory.poll()
+                if diff:
+                    await self.apply_inventory_diff(diff)
+            except Exception as e:
+                logging.error(f"Inventory reload of {self.config.inventory_file} failed: {e}")
+
+    async def apply_inventory_diff(self, diff):
+        """
+        Follow an inventory edit: only newly held contracts are qualified and added to the candidates, the
+        live set is rebalanced around them and the aggregates move to the new legs. New underlyings are started.
+        """
+        for symbol in sorted({key[0] for key in diff.keys}):
+            monitor = self.monitors.get(symbol)
+            if monitor is None:
+                if diff.added and self.positions.keys(symbol):
+                    try:
+                        await self.start_underlying(symbol)
+                    except Exception as e:
+                        logging.error(f"Failed to start monitor for {symbol}: {e}")
+                continue
+            tracker, subscriptions = monitor.tracker, monitor.subscriptions
+            held = [tracker.build_option(expiry, strike, right) for key_symbol, expiry, strike, right in diff.added
+                    if key_symbol == symbol]
+            contracts = await self.qualifier.qualify_async(held) if held else []
+            subscriptions.update_positions(contracts, self.positions.keys(symbol))
+            subscriptions.rebalance(tracker.current_price(), force=True)
+            exposure = getattr(monitor.pipeline, 'exposure', None)
+            if exposure is not None:
+                exposure.refresh({key for key in diff.keys if key[0] == symbol})
+
+    def restore_subscriptions(self):
+        """Resubscribe every underlying and option ticker after a reconnect (see `ConnectionSupervisor`)."""
+        restored = 0
+        for monitor in self.monitors.values():
+            restored += monitor.tracker.restore()
+            restored += monitor.subscriptions.restore()
+        return restored
+
+    def start_metrics(self):
+        """Serve the metrics on localhost (when `metrics_port` is set) and log a summary periodically."""
+        config = self.config
+        if config.metrics_port is not None and self.metrics_server is None:
+            try:
+                self.metrics_server = MetricsServer(self.metrics, config.metrics_host, config.metrics_port)
+            except OSError as e:
+                logging.warning(f"Metrics endpoint on {config.metrics_host}:{config.metrics_port} unavailable: {e}")
+        self.metrics.collect('alerts_published', lambda: self.alert_bus.published)
+        self.metrics.collect('alerts_dropped', lambda: self.alert_bus.dropped)
+        if config.metrics_log_interval and self._metrics_task is None:
+            self._metrics_task = asyncio.ensure_future(self.report_metrics())
+        if self.workers is not None and self._results_task is None:
+            self.metrics.collect('worker_alerts', lambda: self.workers.alert_count)
+            self.metrics.collect('worker_ticks_dropped', lambda: sum(self.workers.dropped))
+            self._results_task = asyncio.ensure_future(self.collect_worker_results())
+
+    async def collect_worker_results(self, interval=0.5):
+        while True:
+            await asyncio.sleep(interval)
+            for timestamp, symbol, alert in self.workers.poll_results():
+                self.alert_bus.publish(symbol, [alert], timestamp)
+
+    async def report_metrics(self):
+        while True:
+            await asyncio.sleep(self.config.metrics_log_interval)
+            summary = self.metrics.summary()
+            if summary:
+                logging.info(f"Metrics: {summary}")
+
+    def stop(self):
+        for task in (self._metrics_task, self._results_task, self._inventory_task, *self._iv_history_tasks):
+            if task is not None:
+                task.cancel()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+            self.metrics_server = None
+        for monitor in self.monitors.values():
+            if monitor.processor is not None:
+                monitor.processor.stop()
+            for task in monitor.tasks:
+                task.cancel()
+            monitor.pipeline.close()
+        if self.workers is not None:
+            self.workers.close()
+        self.alert_bus.close()
+        if self.history_store is not None:
+            self.history_store.flush()
@@ -0,0 +1,136 @@
+import logging
+from datetime import date, datetime
+
+import numpy as np
+
+from src.monitoring.snapshot_store import contract_key
+
+
+class SubscriptionManager:
+    """
+    Keeps at most `max_lines` streaming market data subscriptions, picking the most relevant candidates:
+    inventory positions first, then distance of the strike from the underlying price, then days to expiry.
+
+    Rebalancing applies only the difference to the live set (cancel dropped, subscribe added) and is skipped
+    while the underlying has moved less than `rebalance_threshold` (relative) since the last rebalance.
+    """
+    def __init__(self, ib, max_lines=100, rebalance_threshold=0.0025, on_change=None):
+        self.ib = ib
+        self.max_lines = max_lines
+        self.rebalance_threshold = rebalance_threshold
+        self.on_change = on_change
+        self.live = {}
+        self.last_price = None
+        self._contracts = []
+        self._keys = []
+        self._positions = set()
+        self._strikes = np.zeros(0)
+        self._expiries = np.zeros(0, dtype='datetime64[D]')
+        self._is_position = np.zeros(0, dtype=bool)
+
+    @property
+    def tickers(self):
+        return list(self.live.values())
+
+    def set_candidates(self, contracts, positions=()):
+        """Replace the candidate universe. `positions` are contract keys held in the inventory."""
+        self._positions = set(positions)
+        self._contracts = list(contracts)
+        self._keys = [contract_key(c) for c in self._contracts]
+        self._strikes = np.array([c.strike for c in self._contracts], dtype=np.float64)
+        self._expiries = self._expiry_dates(self._contracts)
+        self._is_position = np.array([key in self._positions for key in self._keys], dtype=bool)
+
+    @staticmethod
+    def _expiry_dates(contracts):
+        return np.array([datetime.strptime(c.lastTradeDateOrContractMonth[:8], '%Y%m%d').date()
+                         for c in contracts], dtype='datetime64[D]')
+
+    def update_candidates(self, added=(), removed=(), positions=None):
+        """
+        Change the candidate universe incrementally: append the `added` contracts and drop the `removed` keys.
+        Held positions are never dropped. Only the changed contracts are parsed. Returns the contracts added.
+        """
+        if positions is not None:
+            self._positions = set(positions)
+            self._is_position = np.array([key in self._positions for key in self._keys], dtype=bool)
+        removed = set(removed)
+        if removed:
+            keep = np.array([key not in removed for key in self._keys], dtype=bool) | self._is_position
+            if not keep.all():
+                rows = np.flatnonzero(keep)
+                self._contracts = [self._contracts[i] for i in rows]
+                self._keys = [self._keys[i] for i in rows]
+                self._strikes, self._expiries = self._strikes[rows], self._expiries[rows]
+                self._is_position = self._is_position[rows]
+        known = set(self._keys)
+        added = [contract for contract in added if contract_key(contract) not in known]
+        if added:
+            keys = [contract_key(c) for c in added]
+            self._contracts += added
+            self._keys += keys
+            self._strikes = np.concatenate((self._strikes, [c.strike for c in added]))
+            self._expiries = np.concatenate((self._expiries, self._expiry_dates(added)))
+            self._is_position = np.concatenate((self._is_position, [key in self._positions for key in keys]))
+        return added
+
+    def update_positions(self, contracts, positions):
+        """After an inventory change: add newly held contracts to the candidates and re-mark the positions."""
+        return self.update_candidates(contracts, positions=positions)
+
+    def rank(self, underlying_price, today=None):
+        """Candidate positions ordered from most to least relevant."""
+        today = np.datetime64(today or date.today(), 'D')
+        distance = np.abs(self._strikes - underlying_price)
+        dte = (self._expiries - today).astype(np.int64)
+        # lexsort sorts by the last key first; expired contracts (until dropped) rank last
+        return np.lexsort((dte, distance, dte < 0, ~self._is_position))
+
+    def rebalance(self, underlying_price, force=False, today=None):
+        """Move the live set to the top `max_lines` candidates; returns (added, removed) tickers."""
+        if underlying_price is None or np.isnan(underlying_price):
+            return [], []
+        if not force and self.last_price and \
+                abs(underlying_price - self.last_price) / self.last_price < self.rebalance_threshold:
+            return [], []
+        self.last_price = underlying_price
+
+        top = self.rank(underlying_price, today)[:self.max_lines]
+        desired = {self._keys[i]: self._contracts[i] for i in top}
+
+        removed = []
+        for key in [key for key in self.live if key not in desired]:
+            ticker = self.live.pop(key)
+            self.ib.cancelMktData(ticker.contract)
+            removed.append(ticker)
+
+        added = []
+        for key, contract in desired.items():
+            if key not in self.live:
+                ticker = self.ib.reqMktData(contract, '', False, False)
+                self.live[key] = ticker
+                added.append(ticker)
+
+        if added or removed:
+            logging.info(f"Market data rebalanced around {underlying_price}: +{len(added)} -{len(removed)} "
+                         f"({len(self.live)}/{self.max_lines} lines)")
+            if self.on_change is not None:
+                self.on_change(added, removed)
+        return added, removed
+
+    def restore(self):
+        """
+        Re-request market data for the live set after a reconnect (IB discards tickers with the session).
+        The contracts are already qualified; `on_change` receives the new tickers and the old ones they replace.
+        """
+        removed = list(self.live.values())
+        for key, ticker in list(self.live.items()):
+            self.live[key] = self.ib.reqMktData(ticker.contract, '', False, False)
+        if removed and self.on_change is not None:
+            self.on_change(list(self.live.values()), removed)
+        return len(removed)
+
+    def cancel_all(self):
+        for ticker in self.live.values():
+            self.ib.cancelMktData(ticker.contract)
+        self.live.clear()
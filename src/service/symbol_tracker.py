@@ -1,17 +1,182 @@
+import asyncio
+import math
+from bisect import bisect_left, bisect_right
 from datetime import datetime
+from statistics import NormalDist
+from typing import Dict, List, NamedTuple
 from ib_insync import Index, Stock, Option, Future, FuturesOption as FOP
 
+# Underlying ticks on top of the default ones: 106 is the 30-day option implied volatility
+UNDERLYING_TICKS = '106'
+
+
+class OptionChainView(NamedTuple):
+    """
+    Filtered view of an ib_insync OptionChain; expirations are sorted and `rights` lists the selected rights.
+    A view over several trading classes (e.g. SPX and SPXW) maps each expiry to the class it is taken from in
+    `trading_classes` and to that class's strikes in `expiry_strikes`.
+    """
+    exchange: str
+    underlyingConId: int
+    tradingClass: str
+    multiplier: str
+    expirations: List[str]
+    strikes: List[float]
+    rights: List[str]
+    trading_classes: Dict[str, str] = {}
+    expiry_strikes: Dict[str, List[float]] = {}
+
+
+class ChainIndex:
+    """
+    Option chain metadata of one trading class with expirations parsed once into a sorted date index,
+    so expiry range filters are bisect lookups.
+    """
+    RIGHTS = ['C', 'P']
+
+    def __init__(self, chain):
+        self.chain = chain
+        parsed = sorted((datetime.strptime(exp, "%Y%m%d").date(), exp) for exp in chain.expirations)
+        self.dates = [d for d, _ in parsed]
+        self.expirations = [exp for _, exp in parsed]
+        self.strikes = sorted(chain.strikes)
+
+    def expirations_between(self, start_date, end_date):
+        return self.expirations[bisect_left(self.dates, start_date):bisect_right(self.dates, end_date)]
+
+    def select(self, right_filter=None, expiry_range=None):
+        expirations = self.expirations_between(*expiry_range) if expiry_range else list(self.expirations)
+        rights = [r for r in self.RIGHTS if r in right_filter] if right_filter else list(self.RIGHTS)
+        chain = self.chain
+        return OptionChainView(chain.exchange, chain.underlyingConId, chain.tradingClass, chain.multiplier,
+                               expirations, list(self.strikes), rights,
+                               {expiry: chain.tradingClass for expiry in expirations},
+                               {expiry: self.strikes for expiry in expirations})
+
+
+class StrikeWindow:
+    """
+    The strikes of one chain kept in play around the underlying price.
+
+    Each expiry has a sorted strike list, and each (expiry, right) window is an index range [lo, hi) into it.
+    The window holds the OTM strikes: calls above the price and puts below it. It can be narrowed to the
+    nearest `width` strikes on each side, and/or to strikes whose |delta| is at least `min_delta`. Delta is
+    computed with Black-Scholes at `volatility` and cost of carry `carry`. `update` finds the new edges by
+    bisection and returns only the strikes that entered or left. A move costs the strikes that crossed an
+    edge, not the cross product of the chain.
+    """
+    def __init__(self, symbol, expirations, strikes, rights=('C', 'P'), width=0, min_delta=None, volatility=0.2,
+                 carry=0.0):
+        self.symbol = symbol
+        self.rights = [right for right in ('C', 'P') if right in rights]
+        self.width = width
+        self.min_delta = min_delta
+        self.volatility = volatility
+        self.carry = carry
+        self.price = None
+        self.strikes, self.expiry_times, self.ranges = {}, {}, {}
+        self.roll(expirations, strikes)
+
+    def __len__(self):
+        return sum(hi - lo for lo, hi in self.ranges.values())
+
+    def keys(self):
+        """Contract keys (symbol, expiry, strike, right) currently in the window."""
+        return [(self.symbol, expiry, float(self.strikes[expiry][i]), right)
+                for (expiry, right), (lo, hi) in self.ranges.items() for i in range(lo, hi)]
+
+    def _delta_bound(self, price, expiry, now):
+        """Strike where |delta| falls to `min_delta`: the upper bound for calls, the lower bound for puts."""
+        t = max((self.expiry_times[expiry] - now).total_seconds(), 3600.0) / (365.0 * 24 * 3600)
+        vol_t = self.volatility * math.sqrt(t)
+        drift = (self.carry + 0.5 * self.volatility ** 2) * t
+        z = NormalDist().inv_cdf(self.min_delta)
+        return price * math.exp(drift - z * vol_t), price * math.exp(drift + z * vol_t)
+
+    def _range(self, strikes, right, price, bound):
+        if right == 'C':
+            lo = bisect_right(strikes, price)
+            hi = bisect_right(strikes, bound) if bound is not None else len(strikes)
+            if self.width:
+                hi = min(hi, lo + self.width)
+            return lo, max(lo, hi)
+        hi = bisect_left(strikes, price)
+        lo = bisect_left(strikes, bound) if bound is not None else 0
+        if self.width:
+            lo = max(lo, hi - self.width)
+        return min(lo, hi), hi
+
+    def roll(self, expirations, strikes):
+        """
+        Follow the listed expirations: the ones no longer listed (expired, or past the DTE range) leave with their
+        strikes, new ones enter empty and fill at the next `update`. `strikes` is shared by all expirations, or
+        listed per expiration. Returns the keys that left.
+        """
+        removed, listed = [], set(expirations)
+        for expiry in [expiry for expiry in self.strikes if expiry not in listed]:
+            for right in self.rights:
+                lo, hi = self.ranges.pop((expiry, right))
+                removed.extend((self.symbol, expiry, float(self.strikes[expiry][i]), right) for i in range(lo, hi))
+            del self.strikes[expiry], self.expiry_times[expiry]
+        for expiry in expirations:
+            if expiry not in self.strikes:
+                self.strikes[expiry] = sorted(strikes[expiry] if isinstance(strikes, dict) else strikes)
+                self.expiry_times[expiry] = datetime.strptime(expiry[:8], '%Y%m%d').replace(hour=16)
+                self.ranges.update({(expiry, right): (0, 0) for right in self.rights})
+        return removed
+
+    def update(self, price, now=None):
+        """Re-center on `price`; returns the keys that entered and the keys that left the window."""
+        ranges, added, removed = self.moves(price, now)
+        self.commit(price, ranges)
+        return added, removed
+
+    def commit(self, price, ranges):
+        """Apply the ranges of `moves`."""
+        if ranges is not None:
+            self.price = price
+            self.ranges.update(ranges)
+
+    def moves(self, price, now=None):
+        """
+        The ranges re-centered on `price` with the keys that would enter and leave the window, without applying
+        them (see `commit`), e.g. until the entering strikes are qualified. Ranges are None for an invalid price.
+        """
+        if price is None or math.isnan(price) or price <= 0:
+            return None, [], []
+        now = now or datetime.now()
+        ranges, added, removed = {}, [], []
+        for expiry, strikes in self.strikes.items():
+            bounds = self._delta_bound(price, expiry, now) if self.min_delta else (None, None)
+            for right in self.rights:
+                old_lo, old_hi = self.ranges[(expiry, right)]
+                lo, hi = self._range(strikes, right, price, bounds[0] if right == 'C' else bounds[1])
+                if (lo, hi) == (old_lo, old_hi):
+                    continue
+                ranges[(expiry, right)] = (lo, hi)
+                entered = [*range(lo, min(hi, old_lo)), *range(max(lo, old_hi), hi)]
+                left = [*range(old_lo, min(old_hi, lo)), *range(max(old_lo, hi), old_hi)]
+                added.extend((self.symbol, expiry, float(strikes[i]), right) for i in entered)
+                removed.extend((self.symbol, expiry, float(strikes[i]), right) for i in left)
+        return ranges, added, removed
+
 
 class SymbolTracker:
     """
     A generic tracker for underlying instruments supporting indexes, equities, ETFs, futures, and their options (including FOPs).
     """
 
-    def __init__(self, ib, symbol: str, exchange: str = 'SMART', sec_type: str = 'IND', continuous: bool = False):
+    def __init__(self, ib, symbol: str, exchange: str = 'SMART', sec_type: str = 'IND', continuous: bool = False,
+                 autostart: bool = True, chain_ttl: int = 3600):
         self.ib = ib
         self.symbol = symbol
         self.sec_type = sec_type.upper()
         self.contract = None
+        self.chain_ttl = chain_ttl
+        self._chains = None
+        self._chains_fetched_at = None
+        # Trading class of each expiry of the last selected chain, for `build_option`
+        self.trading_classes = {}
 
         if self.sec_type == 'IND':
             self.contract = Index(symbol, exchange)
@@ -22,38 +187,127 @@ class SymbolTracker:
         else:
             raise ValueError(f"Unsupported security type: {self.sec_type}")
 
-        self.ib.qualifyContracts(self.contract)
-        self.ticker = self.ib.reqMktData(self.contract, '', False, False)
+        self.ticker = None
+        self.window = None
+        if autostart:
+            self.ib.qualifyContracts(self.contract)
+            self.ticker = self.ib.reqMktData(self.contract, UNDERLYING_TICKS, False, False)
+
+    async def start_async(self):
+        """Qualify and subscribe the underlying without blocking the event loop (for autostart=False)."""
+        await self.ib.qualifyContractsAsync(self.contract)
+        self.ticker = self.ib.reqMktData(self.contract, UNDERLYING_TICKS, False, False)
+        return self
+
+    def restore(self):
+        """Re-request the underlying's market data after a reconnect."""
+        if self.ticker is None:
+            return 0
+        self.ticker = self.ib.reqMktData(self.contract, UNDERLYING_TICKS, False, False)
+        return 1
 
     def get_price(self):
         self.ib.sleep(1.5)
-        return self.ticker.last or self.ticker.close
+        return self.current_price()
 
-    def get_option_chain(self, right_filter=None, expiry_range=None):
-        chains = self.ib.reqSecDefOptParams(
-            self.contract.symbol, '', self.contract.secType, self.contract.conId)
-        if not chains:
+    async def get_price_async(self):
+        await asyncio.sleep(1.5)
+        return self.current_price()
+
+    def current_price(self):
+        """Latest price from the streaming ticker without waiting (last trade, else previous close)."""
+        price = self.ticker.last
+        if price is None or math.isnan(price):
+            price = self.ticker.close
+        return price
+
+    def current_iv(self):
+        """The underlying's 30-day implied volatility (generic tick 106), or None before IB sent it."""
+        iv = getattr(self.ticker, 'impliedVolatility', None)
+        if iv is None or math.isnan(iv) or iv <= 0:
             return None
+        return iv
+
+    def get_option_chains(self, refresh=False):
+        """All trading classes of the option chain as `ChainIndex` by trading class, cached (see `chain_ttl`)."""
+        if refresh or not self._chain_cache_valid():
+            chains = self.ib.reqSecDefOptParams(
+                self.contract.symbol, '', self.contract.secType, self.contract.conId)
+            self._store_chains(chains)
+        return self._chains
 
-        chain = chains[0]
+    async def get_option_chains_async(self, refresh=False):
+        if refresh or not self._chain_cache_valid():
+            chains = await self.ib.reqSecDefOptParamsAsync(
+                self.contract.symbol, '', self.contract.secType, self.contract.conId)
+            self._store_chains(chains)
+        return self._chains
 
-        if right_filter:
-            chain.rights = [r for r in chain.rights if r in right_filter]
+    def get_option_chain(self, right_filter=None, expiry_range=None, trading_class=None):
+        return self._select_chain(self.get_option_chains(), right_filter, expiry_range, trading_class)
 
-        if expiry_range:
-            from datetime import datetime
-            start_date, end_date = expiry_range
-            chain.expirations = {
-                exp for exp in chain.expirations
-                if start_date <= datetime.strptime(exp, "%Y%m%d").date() <= end_date
-            }
+    async def get_option_chain_async(self, right_filter=None, expiry_range=None, trading_class=None):
+        return self._select_chain(await self.get_option_chains_async(), right_filter, expiry_range, trading_class)
 
+    def _chain_cache_valid(self):
+        if self._chains is None or self._chains_fetched_at is None:
+            return False
+        now = datetime.now()
+        # Listed expirations and strikes change overnight, so a cache never outlives its trading day
+        return (now.date() == self._chains_fetched_at.date()
+                and (now - self._chains_fetched_at).total_seconds() < self.chain_ttl)
+
+    def _store_chains(self, chains):
+        indexed = {}
+        for chain in chains or []:
+            # The same trading class is listed once per exchange, prefer SMART
+            if chain.tradingClass not in indexed or chain.exchange == 'SMART':
+                indexed[chain.tradingClass] = ChainIndex(chain)
+        self._chains = indexed
+        self._chains_fetched_at = datetime.now()
+
+    def _select_chain(self, chains, right_filter, expiry_range, trading_class):
+        """
+        The chain of one trading class, or of several merged. `trading_class` is a class or a list of them; by
+        default every listed class is used, the symbol's own first. An expiry listed by several classes (e.g.
+        the monthly SPX and the SPXW weekly on the third Friday) is taken from the first one.
+        """
+        if not chains:
+            return None
+
+        if trading_class is None:
+            classes = sorted(chains, key=lambda name: (name != self.symbol, name))
+        else:
+            classes = [trading_class] if isinstance(trading_class, str) else list(trading_class)
+        views = [chains[name].select(right_filter, expiry_range) for name in classes if name in chains]
+        if not views:
+            return None
+        owner = {}
+        for view in views:
+            for expiry in view.expirations:
+                owner.setdefault(expiry, view)
+        expirations = sorted(owner)
+        strikes = sorted({strike for view in views for strike in view.strikes})
+        first = views[0]
+        chain = first._replace(expirations=expirations, strikes=strikes,
+                               trading_classes={expiry: owner[expiry].tradingClass for expiry in expirations},
+                               expiry_strikes={expiry: owner[expiry].strikes for expiry in expirations})
+        self.trading_classes = dict(chain.trading_classes)
         return chain
 
-    def build_option(self, expiry, strike, right):
+    def strike_window(self, chain, width=0, min_delta=None, volatility=0.2, carry=0.0):
+        """Track a `StrikeWindow` over the expirations and strikes of `chain` (see `MonitorScheduler.recenter`)."""
+        self.window = StrikeWindow(self.symbol, chain.expirations, chain.expiry_strikes or chain.strikes,
+                                   rights=chain.rights, width=width, min_delta=min_delta, volatility=volatility,
+                                   carry=carry)
+        return self.window
+
+    def build_option(self, expiry, strike, right, trading_class=None):
         """
-        Build an option contract for the given expiry, strike, and right.
+        Build an option contract for the given expiry, strike, and right. The trading class defaults to the one
+        the selected chain lists the expiry under, so IB can tell e.g. SPX from SPXW on a shared expiry.
         """
+        trading_class = trading_class or self.trading_classes.get(expiry, '')
         if self.sec_type == 'FUT':
             return FOP(
                 symbol=self.symbol,
@@ -62,7 +316,8 @@ class SymbolTracker:
                 right=right,
                 exchange=self.contract.exchange,
                 currency='USD',
-                multiplier='50'
+                multiplier='50',
+                tradingClass=trading_class
             )
         else:
             return Option(
@@ -71,6 +326,7 @@ class SymbolTracker:
                 strike=strike,
                 right=right,
                 exchange=self.contract.exchange,
-                currency='USD'
+                currency='USD',
+                tradingClass=trading_class
             )
     
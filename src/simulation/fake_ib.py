@@ -0,0 +1,328 @@
+import argparse
+import asyncio
+import itertools
+import logging
+import time
+from datetime import date, datetime
+
+import numpy as np
+from eventkit import Event
+from ib_insync import BarData, OptionChain, OptionComputation, Ticker, util
+
+from src.pricing.greeks import SECONDS_PER_YEAR, greeks, price
+
+
+class FakeIB:
+    """
+    In-process stand-in for `ib_insync.IB` covering the calls the monitor makes: contract qualification,
+    option chain parameters, daily historical IV bars, streaming market data, `pendingTickersEvent` and
+    connection events.
+    `disconnect()` drops all subscriptions like a Gateway restart, and the next `refuse_connections`
+    connection attempts fail.
+
+    Every underlying in `underlyings` ({symbol: spot}) lists `expirations` daily expirations with `strikes`
+    strikes `strike_step` apart around the spot, i.e. `2 * expirations * strikes` option contracts per chain.
+    Once connected, the spot follows a random walk and every `tick_interval` seconds about
+    `tick_rate * tick_interval` randomly picked subscribed options get new Black-Scholes quotes and model
+    greeks, delivered through `pendingTickersEvent` like IB's own batches. `step()` produces one batch
+    synchronously, for benchmarks that do not run an event loop.
+    """
+    def __init__(self, underlyings=None, expirations=8, strikes=640, strike_step=5.0, tick_rate=1000.0,
+                 tick_interval=0.1, volatility=0.2, rate=0.045, seed=None):
+        self.underlyings = dict(underlyings or {'SPX': 5000.0})
+        self.tick_rate = tick_rate
+        self.tick_interval = tick_interval
+        self.volatility = volatility
+        self.rate = rate
+        self.ticks_emitted = 0
+        self.historical_requests = 0
+        self.refuse_connections = 0
+        self.pendingTickersEvent = Event('pendingTickersEvent')
+        self.connectedEvent = Event('connectedEvent')
+        self.disconnectedEvent = Event('disconnectedEvent')
+        self.errorEvent = Event('errorEvent')
+
+        self._rng = np.random.default_rng(seed)
+        self._connected = False
+        self._handle = None
+        self._con_ids = {}
+        self._next_con_id = itertools.count(1000)
+        self._tickers = {}
+        self._options = []
+        self._fresh = []
+        self._arrays = None
+        self._carry = 0.0
+
+        self.expirations = [d.strftime('%Y%m%d') for d in
+                            np.busday_offset(np.datetime64(date.today(), 'D'), np.arange(expirations),
+                                             roll='forward').astype(datetime)]
+        self.strikes = {}
+        for symbol, spot in self.underlyings.items():
+            first = round(spot / strike_step) * strike_step - (strikes // 2) * strike_step
+            self.strikes[symbol] = [first + i * strike_step for i in range(strikes)]
+        self._listed = {symbol: set(strikes) for symbol, strikes in self.strikes.items()}
+
+    # Connection
+
+    def connect(self, host='127.0.0.1', port=4001, clientId=1, timeout=4, readonly=False, account=''):
+        if self.refuse_connections:
+            self.refuse_connections -= 1
+            raise ConnectionRefusedError(f"Connect call failed ('{host}', {port})")
+        self._connected = True
+        logging.info(f"Fake IB connected ({len(self.underlyings)} underlyings, {self.tick_rate:g} ticks/s)")
+        self.connectedEvent.emit()
+        self._schedule()
+        return self
+
+    async def connectAsync(self, host='127.0.0.1', port=4001, clientId=1, timeout=4, readonly=False, account=''):
+        return self.connect(host, port, clientId, timeout, readonly, account)
+
+    def disconnect(self):
+        """Drop the session like a Gateway restart would: every market data subscription is lost."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._tickers.clear()
+        self._options, self._fresh, self._arrays = [], [], None
+        if self._connected:
+            self._connected = False
+            self.disconnectedEvent.emit()
+
+    def isConnected(self):
+        return self._connected
+
+    @staticmethod
+    def run(*awaitables, timeout=None):
+        return util.run(*awaitables, timeout=timeout)
+
+    @staticmethod
+    def sleep(*args):
+        return util.sleep(*args)
+
+    # Contracts
+
+    def _listed_contract(self, contract):
+        if contract.secType not in ('OPT', 'FOP'):
+            return contract.symbol in self.underlyings
+        return (contract.lastTradeDateOrContractMonth in self.expirations
+                and float(contract.strike) in self._listed.get(contract.symbol, ()))
+
+    def qualifyContracts(self, *contracts):
+        """Assign stable conIds to listed contracts; unlisted ones keep conId 0, as IB leaves them unresolved."""
+        qualified = []
+        for contract in contracts:
+            if not self._listed_contract(contract):
+                continue
+            key = (contract.secType, contract.symbol, contract.lastTradeDateOrContractMonth,
+                   float(contract.strike), contract.right)
+            con_id = self._con_ids.get(key)
+            if con_id is None:
+                con_id = self._con_ids[key] = next(self._next_con_id)
+            contract.conId = con_id
+            if contract.secType in ('OPT', 'FOP'):
+                contract.tradingClass = contract.symbol
+                contract.multiplier = contract.multiplier or '100'
+                contract.localSymbol = f"{contract.symbol} {contract.lastTradeDateOrContractMonth[2:]}" \
+                                       f"{contract.right}{int(contract.strike * 1000):08d}"
+            qualified.append(contract)
+        return qualified
+
+    async def qualifyContractsAsync(self, *contracts):
+        return self.qualifyContracts(*contracts)
+
+    def reqSecDefOptParams(self, underlyingSymbol, futFopExchange, underlyingSecType, underlyingConId):
+        if underlyingSymbol not in self.underlyings:
+            return []
+        return [OptionChain('SMART', underlyingConId, underlyingSymbol, '100',
+                            list(self.expirations), list(self.strikes[underlyingSymbol]))]
+
+    async def reqSecDefOptParamsAsync(self, underlyingSymbol, futFopExchange, underlyingSecType, underlyingConId):
+        return self.reqSecDefOptParams(underlyingSymbol, futFopExchange, underlyingSecType, underlyingConId)
+
+    # Historical data
+
+    def reqHistoricalData(self, contract, endDateTime, durationStr, barSizeSetting, whatToShow, useRTH,
+                          formatDate=1, keepUpToDate=False, chartOptions=None, timeout=60):
+        """
+        Daily bars of the business days in `durationStr` ('N D' or 'N Y') up to today; implied volatility
+        cycles around `volatility` over the year, so every symbol has a stable 52-week range.
+        """
+        self.historical_requests += 1
+        if contract.symbol not in self.underlyings:
+            return []
+        count, unit = durationStr.split()
+        days = int(count) * (365 if unit == 'Y' else 1)
+        end = np.datetime64(date.today(), 'D')
+        dates = np.arange(end - days + 1, end + 1)
+        dates = dates[np.is_busday(dates)]
+        phase = (dates - np.datetime64('1970-01-01', 'D')).astype(np.float64) * 2 * np.pi / 365
+        offset = sum(map(ord, contract.symbol))
+        values = self.volatility * (1.0 + 0.5 * np.sin(phase + offset))
+        if whatToShow != 'OPTION_IMPLIED_VOLATILITY':
+            values = self.underlyings[contract.symbol] * (1.0 + 0.1 * np.sin(phase + offset))
+        return [BarData(date=day, open=value, high=value, low=value, close=value, volume=0)
+                for day, value in zip(dates.astype(object), values.tolist())]
+
+    async def reqHistoricalDataAsync(self, contract, endDateTime, durationStr, barSizeSetting, whatToShow, useRTH,
+                                     formatDate=1, keepUpToDate=False, chartOptions=None, timeout=60):
+        return self.reqHistoricalData(contract, endDateTime, durationStr, barSizeSetting, whatToShow, useRTH,
+                                      formatDate, keepUpToDate, chartOptions, timeout)
+
+    # Market data
+
+    def reqMktData(self, contract, genericTickList='', snapshot=False, regulatorySnapshot=False,
+                   mktDataOptions=None):
+        key = id(contract) if not contract.conId else contract.conId
+        ticker = self._tickers.get(key)
+        if ticker is not None:
+            return ticker
+        ticker = Ticker(contract=contract)
+        self._tickers[key] = ticker
+        if contract.secType in ('OPT', 'FOP'):
+            self._options.append(ticker)
+            self._fresh.append(ticker)
+            self._arrays = None
+        else:
+            ticker.last = ticker.close = self.underlyings.get(contract.symbol, float('nan'))
+            ticker.impliedVolatility = self.volatility
+            ticker.time = datetime.now()
+        return ticker
+
+    def cancelMktData(self, contract):
+        key = id(contract) if not contract.conId else contract.conId
+        ticker = self._tickers.pop(key, None)
+        if ticker is not None and ticker in self._options:
+            self._options.remove(ticker)
+            if ticker in self._fresh:
+                self._fresh.remove(ticker)
+            self._arrays = None
+
+    def _option_arrays(self):
+        if self._arrays is None:
+            contracts = [ticker.contract for ticker in self._options]
+            self._arrays = {
+                'symbol': np.array([c.symbol for c in contracts], dtype=object),
+                'strike': np.array([c.strike for c in contracts], dtype=np.float64),
+                'is_call': np.array([c.right.upper().startswith('C') for c in contracts], dtype=bool),
+                'expiry': np.array([np.datetime64(datetime.strptime(c.lastTradeDateOrContractMonth[:8], '%Y%m%d')
+                                                  .replace(hour=16), 's') for c in contracts],
+                                   dtype='datetime64[s]'),
+            }
+        return self._arrays
+
+    def _quote(self, tickers, rows):
+        """Price the option tickers at `rows` of the subscribed set from the current spots, with a mild smile."""
+        arrays = self._option_arrays()
+        spot = np.array([self.underlyings.get(symbol, np.nan) for symbol in arrays['symbol'][rows]])
+        strike, is_call = arrays['strike'][rows], arrays['is_call'][rows]
+        now = np.datetime64(datetime.now(), 's')
+        t = np.maximum((arrays['expiry'][rows] - now).astype(np.float64), 3600.0) / SECONDS_PER_YEAR
+        sigma = self.volatility * (1.0 + 2.0 * np.square(np.log(strike / spot)))
+        value = price(spot, strike, t, self.rate, self.rate, sigma, is_call)
+        computed = greeks(spot, strike, t, self.rate, self.rate, sigma, is_call)
+        half_spread = np.maximum(0.025, 0.005 * value)
+        stamp = datetime.now()
+        for i, ticker in enumerate(tickers):
+            mid = float(value[i])
+            ticker.bid = round(max(mid - half_spread[i], 0.0), 2)
+            ticker.ask = round(mid + half_spread[i], 2)
+            ticker.last = round(mid, 2)
+            ticker.time = stamp
+            ticker.modelGreeks = OptionComputation(
+                0, float(sigma[i]), float(computed['delta'][i]), mid, 0.0, float(computed['gamma'][i]),
+                float(computed['vega'][i]), float(computed['theta'][i]), float(spot[i]))
+
+    def step(self, count=None):
+        """
+        Move the spots, send the first quote of options subscribed since the last step and requote `count`
+        random subscribed options (default: one interval's worth). Returns the updated tickers.
+        """
+        dt = self.tick_interval / SECONDS_PER_YEAR
+        moves = np.exp(self.volatility * np.sqrt(dt) * self._rng.standard_normal(len(self.underlyings)))
+        for symbol, move in zip(list(self.underlyings), moves):
+            self.underlyings[symbol] *= float(move)
+
+        updated = set()
+        for ticker in self._tickers.values():
+            if ticker.contract.secType not in ('OPT', 'FOP') and ticker.contract.symbol in self.underlyings:
+                ticker.last = self.underlyings[ticker.contract.symbol]
+                ticker.time = datetime.now()
+                updated.add(ticker)
+
+        if count is None:
+            # Carry the fractional part over so low rates still average out to `tick_rate`
+            self._carry += self.tick_rate * self.tick_interval
+            count, self._carry = int(self._carry), self._carry - int(self._carry)
+        if self._fresh:
+            position = {id(ticker): i for i, ticker in enumerate(self._options)}
+            fresh, self._fresh = self._fresh, []
+            self._quote(fresh, np.array([position[id(ticker)] for ticker in fresh], dtype=np.intp))
+            updated.update(fresh)
+
+        count = min(count, len(self._options))
+        if count:
+            rows = np.sort(self._rng.choice(len(self._options), size=count, replace=False))
+            tickers = [self._options[i] for i in rows]
+            self._quote(tickers, rows)
+            updated.update(tickers)
+            self.ticks_emitted += count
+
+        if updated:
+            self.pendingTickersEvent.emit(updated)
+        return updated
+
+    def _schedule(self):
+        self._handle = util.getLoop().call_later(self.tick_interval, self._tick)
+
+    def _tick(self):
+        if not self._connected:
+            return
+        self.step()
+        self._schedule()
+
+
+def main():
+    from src.config.config import AlertConfig, UnderlyingConfig
+    from src.service.scheduler import MonitorScheduler
+
+    parser = argparse.ArgumentParser(description="Run the monitor against a synthetic IB Gateway")
+    parser.add_argument('--symbol', default='SPX')
+    parser.add_argument('--spot', type=float, default=5000.0)
+    parser.add_argument('--expirations', type=int, default=8)
+    parser.add_argument('--strikes', type=int, default=1280, help="strikes per expiration (about half are OTM)")
+    parser.add_argument('--lines', type=int, default=10240, help="market data lines to subscribe")
+    parser.add_argument('--tick-rate', type=float, default=5000.0, help="option ticks per second")
+    parser.add_argument('--coalesce', type=float, default=0.25, help="coalescing window of the tick processor")
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds to stream after startup")
+    parser.add_argument('--snapshot-dir', default='snapshots-loadtest')
+    parser.add_argument('--workers', type=int, default=0, help="analytics worker processes (0: in-process)")
+    parser.add_argument('--partition', default='underlying', choices=('underlying', 'expiry'))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+    # Alerts fire on nearly every tick of a synthetic chain, keep them out of the way
+    logging.getLogger().addFilter(lambda record: record.levelno != logging.WARNING)
+
+    ib = FakeIB({args.symbol: args.spot}, expirations=args.expirations, strikes=args.strikes,
+                tick_rate=args.tick_rate)
+    config = AlertConfig(underlyings={args.symbol: UnderlyingConfig(market_data_lines=args.lines)},
+                         max_dte=366, coalesce_interval=args.coalesce, contract_cache_file='', qualify_chunk_delay=0,
+                         history_file=None, iv_history_dir=None, snapshot_dir=args.snapshot_dir,
+                         worker_processes=args.workers, worker_partition=args.partition)
+    ib.connect()
+    scheduler = MonitorScheduler(ib, config)
+    try:
+        ib.run(scheduler.start([args.symbol]))
+        ib.ticks_emitted = 0
+        started = time.perf_counter()
+        ib.run(asyncio.sleep(args.duration))
+        elapsed = time.perf_counter() - started
+        print(f"{ib.ticks_emitted} ticks in {elapsed:.1f}s ({ib.ticks_emitted / elapsed:,.0f} ticks/s delivered)")
+        print(scheduler.metrics.summary().replace(' | ', '\n'))
+    finally:
+        scheduler.stop()
+        ib.disconnect()
+
+
+if __name__ == '__main__':
+    main()
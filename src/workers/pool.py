@@ -0,0 +1,301 @@
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+import zlib
+from collections import Counter, deque
+from datetime import datetime
+
+import numpy as np
+
+from src.config.config import UnderlyingConfig
+from src.monitoring.iv_history import underlying_iv_fields
+from src.monitoring.metrics import Metrics
+from src.monitoring.monitor import OptionMonitor
+from src.monitoring.pipeline import ChainPipeline, build_alert_engine, build_greeks_engine, build_snapshot_sink
+from src.monitoring.snapshot_store import ContractIndex, ticker_columns
+from src.workers.ring import TICK_FIELDS, TickRing
+
+
+class WorkerPool:
+    """
+    Processes running the analytics (greeks fill, IV statistics, alerts, snapshots) off the IB process.
+
+    The parent keeps the IB connection and decoding; every tick batch is split by partition and published
+    to the owning worker's shared-memory `TickRing`, contract definitions go over a control queue. Each
+    worker runs one `ChainPipeline` per underlying it sees, with the option rules only: the underlying price
+    rules are evaluated once, by the parent-side `PartitionedPipeline`, however many workers share a chain.
+    `partition='underlying'` gives every underlying to one worker (least loaded first), `partition='expiry'`
+    spreads the expirations of a chain by hash so a single large chain also scales out. Alerts come back on a
+    results queue (see `poll_results`).
+
+    Workers are forked, so the pool must be started before the process starts threads (snapshot writers,
+    metrics server).
+    """
+    def __init__(self, config, processes=2, partition='underlying', ring_capacity=65536, poll_interval=0.02):
+        if partition not in ('underlying', 'expiry'):
+            raise ValueError(f"Unsupported worker partition: {partition}")
+        self.config = config
+        self.partition = partition
+        self.alerts = deque(maxlen=1000)
+        self.alert_count = 0
+        self.dropped = [0] * processes
+        self._symbols = {}
+        context = multiprocessing.get_context('fork')
+        self.rings = [TickRing(ring_capacity) for _ in range(processes)]
+        self.controls = [context.Queue() for _ in range(processes)]
+        self.results = context.Queue()
+        self.processes = [
+            context.Process(target=run_worker, name=f"monitor-worker-{i}", daemon=True,
+                            args=(i, self.rings[i], self.controls[i], self.results, config, partition, poll_interval))
+            for i in range(processes)
+        ]
+        for process in self.processes:
+            process.start()
+        logging.info(f"Started {processes} analytics workers partitioned by {partition}")
+
+    def worker_of(self, symbol, expiry):
+        if self.partition == 'expiry':
+            return zlib.crc32(f"{symbol}|{expiry}".encode()) % len(self.processes)
+        worker = self._symbols.get(symbol)
+        if worker is None:
+            load = Counter(self._symbols.values())
+            worker = self._symbols[symbol] = min(range(len(self.processes)), key=lambda i: load[i])
+        return worker
+
+    def pipeline(self, symbol, metrics=None, alert_sink=None, iv_range=None):
+        """Parent-side pipeline of one underlying that publishes its ticks to the workers."""
+        settings = self.config.underlyings.get(symbol, UnderlyingConfig())
+        alert_engine = build_alert_engine(self.config, symbol, settings, scopes={'underlying'})
+        return PartitionedPipeline(self, symbol, metrics, alert_engine, alert_sink, iv_range)
+
+    def poll_results(self):
+        """Collect alerts and ring overrun counts reported by the workers since the last poll."""
+        received = []
+        while True:
+            try:
+                kind, worker, payload = self.results.get_nowait()
+            except queue.Empty:
+                return received
+            if kind == 'alerts':
+                self.alerts.extend(payload)
+                self.alert_count += len(payload)
+                received.extend(payload)
+            elif kind == 'dropped':
+                self.dropped[worker] = payload
+                logging.warning(f"Worker {worker} fell behind, {payload} ticks dropped so far")
+
+    def close(self, timeout=30):
+        """Stop the workers after they processed what is in their rings and flushed their snapshots."""
+        for control in self.controls:
+            control.put(('stop', None))
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            # Keep draining results: a worker blocks on exit until its queued results are read
+            while process.is_alive() and time.monotonic() < deadline:
+                self.poll_results()
+                process.join(0.05)
+            if process.is_alive():
+                logging.warning(f"{process.name} did not stop in time, terminating")
+                process.terminate()
+        self.poll_results()
+        for ring in self.rings:
+            ring.close()
+
+
+class PartitionedPipeline:
+    """
+    Stands in for `ChainPipeline` in the IB process when analytics run in a `WorkerPool`: contracts are
+    indexed here, and `process` splits the batch by worker, writes it to the rings and checks the underlying
+    price and IV rules of `alert_engine` (the IV ranked against `iv_range`).
+    """
+    def __init__(self, pool, symbol, metrics=None, alert_engine=None, alert_sink=None, iv_range=None):
+        self.pool = pool
+        self.symbol = symbol
+        self.alert_engine = alert_engine
+        self.iv_range = iv_range
+        self.alert_sink = alert_sink
+        self.contracts = ContractIndex()
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.publish_seconds = self.metrics.histogram('stage_seconds', stage='publish')
+        self.ticks = self.metrics.counter('ticks')
+        self._worker = np.zeros(0, dtype=np.intp)
+        # Contract indices are per underlying; ring records carry them offset by the underlying's id
+        self._id_offset = _symbol_id(symbol) << 32
+
+    def add_contracts(self, contracts):
+        known = len(self.contracts)
+        indices = self.contracts.indices(contracts)
+        if len(self.contracts) > known:
+            self._register(known)
+        return indices
+
+    def _register(self, known):
+        contracts = self.contracts
+        n = len(contracts)
+        workers = np.empty(n, dtype=np.intp)
+        workers[:known] = self._worker
+        added = {}
+        for idx in range(known, n):
+            key = contracts.key(idx)
+            workers[idx] = self.pool.worker_of(key[0], key[1])
+            added.setdefault(workers[idx], []).append((idx, key))
+        self._worker = workers
+        for worker, entries in added.items():
+            self.pool.controls[worker].put(('contracts', (self.symbol, entries)))
+
+    def process_tickers(self, tickers, underlying_price, timestamp=None, underlying_iv=None):
+        indices = self.add_contracts([ticker.contract for ticker in tickers])
+        return self.process(indices, ticker_columns(tickers), underlying_price, timestamp, underlying_iv)
+
+    def process(self, indices, columns, underlying_price, timestamp=None, underlying_iv=None):
+        """
+        Publish the batch to the owning workers and return the underlying's price and IV alerts; option alerts are
+        reported asynchronously by the workers.
+        """
+        started = time.perf_counter()
+        timestamp = timestamp or datetime.now()
+        alerts = []
+        if self.alert_engine is not None:
+            alerts = self.alert_engine.check(underlying_price, timestamp,
+                                             underlying_iv_fields(underlying_iv, self.iv_range))
+        if alerts:
+            if self.alert_sink is not None:
+                self.alert_sink(timestamp, alerts)
+            else:
+                for alert in alerts:
+                    logging.warning(alert)
+        indices = np.asarray(indices, dtype=np.intp)
+        ts = timestamp.timestamp()
+        workers = self._worker[indices]
+        for worker in np.unique(workers):
+            rows = np.flatnonzero(workers == worker)
+            self.pool.rings[worker].write(ts, indices[rows] + self._id_offset,
+                                          {name: values[rows] for name, values in columns.items()
+                                           if name in TICK_FIELDS}, underlying_price)
+        self.publish_seconds.record(time.perf_counter() - started)
+        self.ticks.inc(len(indices))
+        return alerts
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _symbol_id(symbol):
+    return zlib.crc32(symbol.encode()) & 0x7fffffff
+
+
+class Worker:
+    """Consumer side of one ring: one `ChainPipeline` per underlying, fed in timestamp-ordered cycles."""
+    def __init__(self, worker_id, ring, control, results, config, partition):
+        self.worker_id = worker_id
+        self.ring = ring
+        self.control = control
+        self.results = results
+        self.config = config
+        self.partition = partition
+        self.pipelines = {}
+        self.local = {}
+        self.running = True
+        self._reported_dropped = 0
+
+    def build_pipeline(self, symbol):
+        config = self.config
+        settings = config.underlyings.get(symbol, UnderlyingConfig())
+        shard = self.worker_id if self.partition == 'expiry' else None
+        return ChainPipeline(OptionMonitor(contract_capacity=settings.market_data_lines or config.market_data_lines,
+                                           iv_window=config.iv_window),
+                             build_alert_engine(config, symbol, settings, scopes={'option'}),
+                             snapshot_sink=build_snapshot_sink(config, symbol, shard),
+                             greeks_engine=build_greeks_engine(config, settings),
+                             flush_every=config.snapshot_flush_cycles, alert_sink=_reported_to_parent)
+
+    def apply(self, message):
+        kind, payload = message
+        if kind == 'stop':
+            self.running = False
+        elif kind == 'contracts':
+            symbol, entries = payload
+            pipeline = self.pipelines.get(symbol)
+            if pipeline is None:
+                pipeline = self.pipelines[symbol] = self.build_pipeline(symbol)
+            offset = _symbol_id(symbol) << 32
+            for idx, key in entries:
+                self.local[offset + idx] = (symbol, pipeline.contracts.add_key(key))
+
+    def drain_control(self, block_until=None):
+        while True:
+            try:
+                self.apply(self.control.get(timeout=block_until) if block_until else self.control.get_nowait())
+                block_until = None
+            except queue.Empty:
+                return
+
+    def process(self, records):
+        ids = records['contract'].tolist()
+        if any(i not in self.local for i in ids):
+            # The definitions are sent before the ticks, but the queue may deliver them a little later
+            self.drain_control(block_until=1.0)
+        known = np.fromiter((i in self.local for i in ids), dtype=bool, count=len(ids))
+        if not known.all():
+            logging.warning(f"Worker {self.worker_id}: dropping {np.count_nonzero(~known)} ticks of unknown contracts")
+            records, ids = records[known], [i for i, k in zip(ids, known) if k]
+        if not len(records):
+            return
+        symbols = np.array([self.local[i][0] for i in ids], dtype=object)
+        local = np.array([self.local[i][1] for i in ids], dtype=np.intp)
+
+        stamps = records['ts']
+        bounds = np.append(np.flatnonzero(np.r_[True, stamps[1:] != stamps[:-1]]), len(records))
+        alerts = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            timestamp = datetime.fromtimestamp(stamps[start])
+            for symbol in set(symbols[start:end]):
+                rows = start + np.flatnonzero(symbols[start:end] == symbol)
+                # Keep the latest record of each contract if one was published twice in the cycle
+                indices, last = np.unique(local[rows][::-1], return_index=True)
+                rows = rows[::-1][last]
+                columns = {name: records[name][rows].copy() for name in TICK_FIELDS}
+                underlying = records['underlying'][rows[0]]
+                price = float(underlying) if np.isfinite(underlying) else None
+                fired = self.pipelines[symbol].process(indices, columns, price, timestamp)
+                alerts.extend((timestamp, symbol, alert) for alert in fired)
+        if alerts:
+            self.results.put(('alerts', self.worker_id, alerts))
+
+    def run(self, poll_interval=0.02):
+        while self.running:
+            self.drain_control()
+            records = self.ring.read()
+            if len(records):
+                self.process(records)
+            elif self.running:
+                time.sleep(poll_interval)
+            if self.ring.dropped != self._reported_dropped:
+                self._reported_dropped = self.ring.dropped
+                self.results.put(('dropped', self.worker_id, self.ring.dropped))
+        records = self.ring.read()
+        if len(records):
+            self.process(records)
+        for pipeline in self.pipelines.values():
+            pipeline.close()
+
+
+def _reported_to_parent(timestamp, alerts):
+    # Worker alerts go back on the results queue; the parent dispatches them (see `AlertBus`)
+    pass
+
+
+def run_worker(worker_id, ring, control, results, config, partition, poll_interval):
+    # CTRL+C reaches the whole process group; workers stop on the parent's request so they can flush first
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker = Worker(worker_id, ring, control, results, config, partition)
+    try:
+        worker.run(poll_interval)
+    finally:
+        results.close()
+        results.join_thread()
@@ -0,0 +1,73 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+TICK_FIELDS = ('bid', 'ask', 'last', 'delta', 'gamma', 'theta', 'vega', 'iv', 'und_price')
+TICK_DTYPE = np.dtype([('ts', '<f8'), ('contract', '<i8'), ('underlying', '<f8')] +
+                      [(name, '<f8') for name in TICK_FIELDS])
+HEADER_SIZE = 64
+
+
+class TickRing:
+    """
+    Single-producer/single-consumer ring of fixed-size tick records in shared memory.
+
+    The producer writes records and then publishes the new write position in the header; it never waits
+    for the consumer. A consumer that falls more than `capacity` records behind loses the overwritten
+    records, which `read()` detects (also when they are overwritten while being copied) and counts in
+    `dropped`. Consumers must share the mapping through `fork`, the ring is not attached by name.
+    """
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self._shm = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + TICK_DTYPE.itemsize * capacity)
+        self._header = np.ndarray((1,), dtype='<u8', buffer=self._shm.buf)
+        self._header[0] = 0
+        self._records = np.ndarray((capacity,), dtype=TICK_DTYPE, buffer=self._shm.buf, offset=HEADER_SIZE)
+        self._write = 0
+        self.read_position = 0
+        self.dropped = 0
+
+    @property
+    def written(self):
+        return int(self._header[0])
+
+    def write(self, timestamp, indices, columns, underlying_price=None):
+        """Append one record per contract index; `columns` maps `TICK_FIELDS` names to aligned arrays."""
+        n = len(indices)
+        if not n:
+            return
+        if n > self.capacity:
+            raise ValueError(f"Batch of {n} ticks exceeds the ring capacity {self.capacity}")
+        positions = np.arange(self._write, self._write + n) % self.capacity
+        batch = np.empty(n, dtype=TICK_DTYPE)
+        batch['ts'] = timestamp
+        batch['contract'] = indices
+        batch['underlying'] = np.nan if underlying_price is None else underlying_price
+        for name in TICK_FIELDS:
+            values = columns.get(name)
+            batch[name] = np.nan if values is None else values
+        self._records[positions] = batch
+        self._write += n
+        self._header[0] = self._write
+
+    def read(self):
+        """Records published since the last read (a copy), skipping any that were overwritten."""
+        write = self.written
+        if write == self.read_position:
+            return self._records[:0].copy()
+        start = max(self.read_position, write - self.capacity)
+        self.dropped += start - self.read_position
+        records = self._records[np.arange(start, write) % self.capacity]
+        # The producer may have lapped the oldest records while they were being copied
+        lost = min(self.written - self.capacity - start, len(records))
+        if lost > 0:
+            records = records[lost:]
+            self.dropped += lost
+        self.read_position = write
+        return records
+
+    def close(self, unlink=True):
+        del self._header, self._records
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
@@ -0,0 +1,44 @@
+import numpy as np
+from ib_insync import Option
+from alerting.alerts import AlertAggregateEngine
+from loader.inventory_loader import InventoryLoader
+from model.models import Portfolio
+from monitoring.snapshot_store import ContractIndex
+from portfolio.aggregator import GreeksAggregator
+
+PORTFOLIO = Portfolio(**{
+    'SPX': {'strategies': [{'name': 'SPX Bull Call Spread', 'options': [
+        {'symbol': 'SPX', 'expiry': '20250419', 'strike': 5100, 'right': 'C', 'quantity': 1, 'strategy': 'Bull Call Spread'},
+        {'symbol': 'SPX', 'expiry': '20250419', 'strike': 5200, 'right': 'C', 'quantity': -1, 'strategy': 'Bull Call Spread'},
+    ]}]}
+})
+
+def chain():
+    contracts = ContractIndex()
+    indices = contracts.indices([Option('SPX', '20250419', strike, 'C', 'SMART') for strike in (5000.0, 5100.0, 5200.0)])
+    return contracts, indices
+
+def test_net_greeks_follow_only_changes_of_held_contracts():
+    aggregator = GreeksAggregator()
+    exposure = aggregator.exposure(InventoryLoader.index(PORTFOLIO), multiplier=100)
+    contracts, indices = chain()
+
+    assert exposure.update(contracts, indices, {'delta': np.array([0.7, 0.5, 0.3])})
+    assert np.isclose(aggregator.totals()['strategy']['SPX Bull Call Spread']['delta'], 20.0)
+
+    assert not exposure.update(contracts, indices[:1], {'delta': np.array([0.8])})
+    assert exposure.update(contracts, indices[1:2], {'delta': np.array([0.6]), 'gamma': np.array([np.nan])})
+    totals = aggregator.totals()
+    assert np.isclose(totals['underlying']['SPX']['delta'], 30.0)
+    assert np.isclose(totals['portfolio']['portfolio']['delta'], 30.0)
+
+def test_aggregate_alerts_fire_once_per_level():
+    aggregator = GreeksAggregator()
+    exposure = aggregator.exposure(InventoryLoader.index(PORTFOLIO))
+    contracts, indices = chain()
+    exposure.update(contracts, indices, {'delta': np.array([0.7, 0.9, 0.3])})
+    engine = AlertAggregateEngine({'delta': 50})
+    alerts = engine.check(aggregator.totals())
+    assert len(alerts) == 3
+    assert "strategy SPX Bull Call Spread net delta beyond ±50: 60.00" in alerts[0]
+    assert engine.check(aggregator.totals()) == []
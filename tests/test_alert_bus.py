@@ -0,0 +1,77 @@
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from alerting.bus import Alert, AlertBus, FileSink, SinkWorker, WebhookSink
+
+class Recorder:
+    def __init__(self, delay=0.0, gate=None):
+        self.batches = []
+        self.delay = delay
+        self.gate = gate
+
+    def __call__(self, alerts):
+        if self.gate is not None:
+            self.gate.wait(5)
+        time.sleep(self.delay)
+        self.batches.append([alert.message for alert in alerts])
+
+    @property
+    def messages(self):
+        return [message for batch in self.batches for message in batch]
+
+def test_slow_sink_never_blocks_publishing_and_storms_are_coalesced():
+    slow = Recorder(delay=0.3)
+    bus = AlertBus({'slow': slow}, flush_interval=0.05, coalesce_above=20)
+    started = time.perf_counter()
+    bus.publish('SPX', [f"C {5000 + 5 * i} delta crossed 0.5" for i in range(200)])
+    bus.publish('RUT', ["RUT dropped below 1900: 1850"])
+    assert time.perf_counter() - started < 0.05
+    bus.close()
+
+    assert slow.messages == ["⚠️ SPX: 200 alerts within 0.0s, e.g. C 5000 delta crossed 0.5; C 5005 delta crossed 0.5; "
+                             "C 5010 delta crossed 0.5", "RUT dropped below 1900: 1850"]
+    assert bus.published == 201 and bus.delivered == 2 and bus.workers[0].coalesced == 199
+
+@pytest.mark.parametrize('overflow, kept', [('drop_oldest', ['3', '4', '5']), ('drop_newest', ['1', '2', '3'])])
+def test_overflow_policies(overflow, kept):
+    gate = threading.Event()
+    sink = Recorder(gate=gate)
+    worker = SinkWorker(sink, 'test', max_queue=3, overflow=overflow, flush_interval=0, coalesce_above=0)
+    alert = lambda message: Alert(datetime(2025, 4, 1), 'SPX', message)
+    worker.offer([alert('0')])
+    while len(worker):
+        time.sleep(0.01)
+    worker.offer([alert(str(i)) for i in range(1, 6)])
+    gate.set()
+    worker.close()
+    assert sink.messages == ['0'] + kept
+    assert worker.dropped == 2
+
+def test_file_and_webhook_sinks(tmp_path):
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    path = tmp_path / 'alerts.log'
+    bus = AlertBus({'file': FileSink(str(path)), 'webhook': WebhookSink(f"http://127.0.0.1:{server.server_port}/")},
+                   flush_interval=0.01)
+    bus.publish('SPX', ["C 5100.0 delta crossed 0.5: 0.55"], datetime(2025, 4, 1, 10))
+    bus.close()
+    server.shutdown()
+
+    assert path.read_text() == "2025-04-01T10:00:00\tSPX\tC 5100.0 delta crossed 0.5: 0.55\n"
+    assert received == [[{'timestamp': '2025-04-01T10:00:00', 'symbol': 'SPX',
+                          'message': "C 5100.0 delta crossed 0.5: 0.55"}]]
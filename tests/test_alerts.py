@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 from alerting.alerts import AlertAssetEngine, AlertOptionEngine
 
@@ -28,4 +29,21 @@ def test_option_delta_alert():
     alerts = engine.check(contract, greeks)
     assert any("delta crossed" in a for a in alerts)
 
-    
\ No newline at end of file
+def test_option_batch_alerts_fire_once_for_watched_strikes():
+    from monitoring.snapshot_store import ContractIndex
+    contracts = ContractIndex()
+    for strike in (5000, 5100, 5200):
+        contract = DummyContract(strike, 'C', '20250419')
+        contract.symbol = 'SPX'
+        contracts.add(contract)
+    indices = np.arange(3)
+    columns = {'delta': np.array([0.9, 0.6, np.nan]), 'theta': np.array([-9.0, -9.0, -9.0])}
+    engine = AlertOptionEngine(delta_threshold=0.5, theta_threshold=-5, watched_strikes={5100, 5200})
+
+    alerts = engine.check_batch(contracts, indices, columns)
+    assert alerts == [
+        "⚠️ C 5100.0 delta crossed 0.5: 0.60",
+        "⚠️ C 5100.0 theta dropped below -5: -9.00",
+        "⚠️ C 5200.0 theta dropped below -5: -9.00",
+    ]
+    assert engine.check_batch(contracts, indices, columns) == []
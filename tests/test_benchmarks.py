@@ -0,0 +1,18 @@
+from benchmarks.harness import append_history, load_history, measure, regressions
+
+def result(name, median, machine='box', size=1000):
+    return {'machine': machine, 'name': name, 'size': size, 'median_s': median, 'commit': 'abc'}
+
+def test_regressions_compare_against_last_run_on_same_machine(tmp_path):
+    path = str(tmp_path / 'history.jsonl')
+    append_history(path, [result('update_iv', 1.0), result('alerts', 1.0)])
+    append_history(path, [result('update_iv', 2.0)])
+    history = load_history(path)
+    assert len(history) == 3
+    current = [result('update_iv', 2.3), result('alerts', 1.5), result('alerts', 9.0, machine='other')]
+    assert [(r['name'], p['median_s']) for r, p in regressions(current, history, tolerance=0.2)] == [('alerts', 1.0)]
+
+def test_measure_runs_warmup_and_min_rounds():
+    calls = []
+    durations = measure(lambda: calls.append(1), min_time=0, min_rounds=3)
+    assert len(durations) == 3 and len(calls) == 4
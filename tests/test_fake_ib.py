@@ -0,0 +1,64 @@
+import asyncio
+import numpy as np
+from ib_insync import Option
+from config.config import AlertConfig, UnderlyingConfig
+from monitoring.snapshot_store import ticker_columns
+from service.scheduler import MonitorScheduler
+from simulation.fake_ib import FakeIB
+
+def test_chain_and_qualification():
+    ib = FakeIB({'SPX': 5000.0}, expirations=3, strikes=40, seed=1)
+    [chain] = ib.reqSecDefOptParams('SPX', '', 'IND', 1)
+    assert len(chain.expirations) == 3 and len(chain.strikes) == 40
+    listed = Option('SPX', chain.expirations[0], chain.strikes[5], 'C', 'CBOE')
+    unlisted = Option('SPX', chain.expirations[0], 5002.5, 'C', 'CBOE')
+    assert ib.qualifyContracts(listed, unlisted) == [listed]
+    assert listed.conId and not unlisted.conId
+    again = Option('SPX', chain.expirations[0], chain.strikes[5], 'C', 'CBOE')
+    ib.qualifyContracts(again)
+    assert again.conId == listed.conId
+
+def test_step_streams_quotes_and_greeks():
+    ib = FakeIB({'SPX': 5000.0}, expirations=2, strikes=50, tick_rate=200, tick_interval=0.1, seed=2)
+    [chain] = ib.reqSecDefOptParams('SPX', '', 'IND', 1)
+    contracts = ib.qualifyContracts(*[Option('SPX', exp, k, r, 'CBOE') for exp in chain.expirations
+                                      for k in chain.strikes for r in 'CP'])
+    tickers = [ib.reqMktData(c) for c in contracts]
+    batches = []
+    ib.pendingTickersEvent += batches.append
+
+    first = ib.step()
+    assert first == set(tickers)
+    columns = ticker_columns(tickers)
+    assert np.isfinite(columns['delta']).all() and (columns['ask'] >= columns['bid']).all()
+    calls = np.array([c.right == 'C' for c in contracts])
+    assert (columns['delta'][calls] > 0).all() and (columns['delta'][~calls] < 0).all()
+
+    assert len(ib.step()) == 20
+    assert len(batches) == 2 and ib.ticks_emitted == 40
+
+def test_scheduler_runs_against_fake_gateway(monkeypatch, tmp_path):
+    async def price_now(tracker):
+        return tracker.current_price()
+    monkeypatch.setattr('src.service.symbol_tracker.SymbolTracker.get_price_async', price_now)
+    ib = FakeIB({'SPX': 5000.0}, expirations=2, strikes=20, tick_rate=500, tick_interval=0.02, seed=3)
+    config = AlertConfig(underlyings={'SPX': UnderlyingConfig(market_data_lines=30)}, coalesce_interval=0.01,
+                         snapshot_format='csv', snapshot_file=str(tmp_path / 'fake_{symbol}.csv'),
+                         contract_cache_file='', qualify_chunk_delay=0, history_file=None,
+                         iv_history_dir=str(tmp_path), metrics_port=None)
+    scheduler = MonitorScheduler(ib, config)
+
+    async def run():
+        ib.connect()
+        await scheduler.start(['SPX'])
+        await asyncio.sleep(0.3)
+
+    asyncio.run(run())
+    ib.disconnect()
+    monitor = scheduler.monitors['SPX']
+    assert len(monitor.tickers) == 30
+    assert monitor.pipeline.monitor.snapshots.pending > 0
+    # The IV history warm-up ran in the background and the underlying's IV rank now uses the yearly range
+    assert monitor.pipeline.monitor.iv_range is scheduler.iv_history.range('SPX')
+    assert len(scheduler.iv_history.range('SPX')) > 250
+    scheduler.stop()
@@ -0,0 +1,42 @@
+from datetime import datetime
+import numpy as np
+from ib_insync import Option
+from monitoring.snapshot_store import ContractIndex
+from pricing.greeks import GreeksEngine, greeks, implied_vol, price
+
+def test_black_scholes_reference_values():
+    call = price(100.0, 100.0, 1.0, 0.05, 0.05, 0.2, True)
+    put = price(100.0, 100.0, 1.0, 0.05, 0.05, 0.2, False)
+    assert abs(call - 10.4506) < 1e-3
+    assert abs(put - 5.5735) < 1e-3
+    g = greeks(100.0, 100.0, 1.0, 0.05, 0.05, 0.2, True)
+    assert abs(g['delta'] - 0.6368) < 1e-3
+    assert abs(g['gamma'] - 0.018762) < 1e-5
+    assert abs(g['vega'] - 0.37524) < 1e-4
+    assert abs(g['theta'] * 365 - (-6.414)) < 1e-2
+
+def test_implied_vol_round_trip_for_black76_and_black_scholes():
+    k = np.array([4800.0, 5000.0, 5200.0, 5400.0])
+    is_call = np.array([False, True, True, False])
+    sigma = np.array([0.25, 0.18, 0.15, 0.3])
+    for b in (0.0, 0.04):
+        quotes = price(5000.0, k, 0.1, 0.04, b, sigma, is_call)
+        assert np.allclose(implied_vol(quotes, 5000.0, k, 0.1, 0.04, b, is_call), sigma, atol=1e-5)
+    assert np.isnan(implied_vol(np.array([-1.0]), 5000.0, 5000.0, 0.1, 0.04, 0.0, True))
+
+def test_engine_fills_only_missing_greeks():
+    contracts = ContractIndex()
+    indices = contracts.indices([Option('SPX', '20250516', 5100, 'C', 'SMART'),
+                                 Option('SPX', '20250516', 4900, 'P', 'SMART')])
+    now = datetime(2025, 4, 16, 10)
+    t = (datetime(2025, 5, 16, 16) - now).total_seconds() / (365 * 24 * 3600)
+    mid = float(price(5000.0, 5100.0, t, 0.045, 0.045, 0.2, True))
+    columns = {
+        'bid': np.array([mid - 0.1, 10.0]), 'ask': np.array([mid + 0.1, 11.0]), 'last': np.full(2, np.nan),
+        'delta': np.array([np.nan, -0.3]), 'gamma': np.array([np.nan, 0.001]), 'theta': np.array([np.nan, -1.0]),
+        'vega': np.array([np.nan, 2.0]), 'iv': np.array([np.nan, 0.22]), 'und_price': np.array([np.nan, 5001.0]),
+    }
+    assert GreeksEngine().fill(contracts, indices, columns, 5000.0, now) == 1
+    assert abs(columns['iv'][0] - 0.2) < 1e-4
+    assert 0 < columns['delta'][0] < 0.5
+    assert columns['delta'][1] == -0.3
@@ -0,0 +1,66 @@
+import numpy as np
+from ib_insync import Option
+from monitoring.history_store import TickHistoryStore, history_key
+from monitoring.monitor import OptionMonitor
+
+def test_ring_keeps_the_latest_records_in_order(tmp_path):
+    store = TickHistoryStore(str(tmp_path / 'history.bin'), slots=4, depth=3)
+    slot = store.slot(history_key('SPX', '20250419', 5100, 'C'))
+    for i in range(5):
+        store.append_many([slot], 1000.0 + i, {'iv': [0.1 + i / 100], 'delta': [0.5]})
+    assert np.allclose(store.history(slot), [0.12, 0.13, 0.14])
+    assert list(store.history(slot, 'ts', last=2)) == [1003.0, 1004.0]
+
+    reader = TickHistoryStore(str(tmp_path / 'history.bin'), readonly=True)
+    assert reader.slot(history_key('SPX', '20250419', 5100.0, 'C')) == slot
+    assert reader.count(slot) == 3
+
+def test_monitor_statistics_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'history.bin')
+    contracts = [Option('SPX', '20250419', 5100, 'C', 'SMART')]
+
+    monitor = OptionMonitor(history_store=TickHistoryStore(path, slots=4, depth=100))
+    indices = monitor.snapshots.contracts.indices(contracts)
+    for iv in (0.20, 0.21, 0.22, 0.23, 0.24, 0.25):
+        monitor.update_iv(indices, np.array([iv]))
+    monitor.history_store.flush()
+
+    restarted = OptionMonitor(history_store=TickHistoryStore(path))
+    indices = restarted.snapshots.contracts.indices(contracts)
+    stats = restarted.update_iv(indices, np.array([0.30]))
+    assert restarted.iv_stats.count(0) == 7
+    assert stats['iv_zscore'][0] > 1.5
+
+def test_expired_slots_are_reclaimed_when_full(tmp_path, caplog):
+    store = TickHistoryStore(str(tmp_path / 'history.bin'), slots=2, depth=3)
+    expired = store.slot(history_key('SPX', '20200117', 3300, 'C'))
+    live = store.slot(history_key('SPX', '20990119', 5100, 'C'))
+    store.append_many([expired, live], 1000.0, {'iv': [0.3, 0.2]})
+
+    reused = store.slot(history_key('SPX', '20990119', 5200, 'C'))
+    assert reused == expired and store.count(reused) == 0
+    assert store.slot(history_key('SPX', '20200117', 3300, 'C'), create=False) == -1
+    assert store.slot(history_key('SPX', '20990119', 5300, 'C')) == -1
+    assert store.slot(history_key('SPX', '20990119', 5400, 'C')) == -1
+    assert sum('is full' in record.message for record in caplog.records) == 1
+
+    reader = TickHistoryStore(str(tmp_path / 'history.bin'), readonly=True)
+    assert reader.slot(history_key('SPX', '20990119', 5200, 'C')) == reused
+
+def test_monitors_stop_writing_slots_reclaimed_for_other_contracts(tmp_path):
+    store = TickHistoryStore(str(tmp_path / 'history.bin'), slots=2, depth=3)
+    rut = OptionMonitor(history_store=store)
+    held = rut.snapshots.contracts.indices([Option('RUT', '20200117', 1600, 'C', 'SMART'),
+                                            Option('RUT', '20990119', 2100, 'C', 'SMART')])
+    rut.update_iv(held, np.array([0.3, 0.2]))
+
+    spx = OptionMonitor(history_store=store)
+    added = spx.snapshots.contracts.indices([Option('SPX', '20990119', 5200, 'C', 'SMART')])
+    spx.update_iv(added, np.array([0.15]))
+    slot = store.slot(history_key('SPX', '20990119', 5200, 'C'), create=False)
+    assert slot >= 0 and store.history(slot).tolist() == [np.float32(0.15)]
+
+    # The RUT monitor still holds its expired contract, its old slot now belongs to the SPX strike
+    rut.update_iv(held, np.array([0.9, 0.21]))
+    assert store.history(slot).tolist() == [np.float32(0.15)]
+    assert store.count(store.slot(history_key('RUT', '20990119', 2100, 'C'), create=False)) == 2
@@ -0,0 +1,75 @@
+import json
+import os
+
+import numpy as np
+import yaml
+from ib_insync import Option
+from loader.inventory_loader import InventoryLoader, InventoryWatcher
+from monitoring.snapshot_store import ContractIndex
+from portfolio.aggregator import GreeksAggregator
+
+def option(strike, quantity=1, strategy='Bull Call Spread'):
+    return {'symbol': 'SPX', 'expiry': '20250419', 'strike': strike, 'right': 'C', 'quantity': quantity,
+            'strategy': strategy}
+
+def write_inventory(path, options, mtime):
+    with open(path, 'w') as f:
+        yaml.safe_dump({'SPX': {'strategies': [{'name': 'SPX Spread', 'options': options}]}}, f)
+    os.utime(path, ns=(mtime, mtime))
+
+def test_read_groups_a_json_position_list(tmp_path):
+    path = tmp_path / 'inventory.json'
+    path.write_text(json.dumps([option(5100), option(5200, -1), option(4800, strategy='Hedge')]))
+    positions = InventoryLoader.index(InventoryLoader.read(path))
+    assert len(positions) == 3
+    assert [strategy for strategy, _ in positions.get(('SPX', '20250419', 4800.0, 'C'))] == ['Hedge']
+
+def test_malformed_json_entries_are_ignored(tmp_path):
+    path = tmp_path / 'inventory.json'
+    path.write_text(json.dumps([option(5100)]))
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+    watcher = InventoryWatcher(str(path))
+    for mtime, entries in enumerate(([{'symbol': 'SPX', 'expiry': '20250419', 'strike': 5200, 'right': 'C',
+                                       'quantity': 1}], [option(5200), 'SPX 5200 C']), start=2):
+        path.write_text(json.dumps(entries))
+        os.utime(path, ns=(mtime * 1_000_000_000, mtime * 1_000_000_000))
+        assert watcher.poll() is None
+    assert watcher.positions.keys() == {('SPX', '20250419', 5100.0, 'C')}
+
+def test_watcher_applies_only_the_diff(tmp_path):
+    path = str(tmp_path / 'inventory.yaml')
+    write_inventory(path, [option(5100), option(5200, -1)], 1_000_000_000)
+    watcher = InventoryWatcher(path)
+    positions = watcher.positions
+    assert watcher.poll() is None
+
+    write_inventory(path, [option(5100, 2), option(5300, -1)], 2_000_000_000)
+    diff = watcher.poll()
+    assert watcher.positions is positions
+    assert diff.added == {('SPX', '20250419', 5300.0, 'C')}
+    assert diff.removed == {('SPX', '20250419', 5200.0, 'C')}
+    assert diff.changed == {('SPX', '20250419', 5100.0, 'C')}
+    assert positions.get(('SPX', '20250419', 5100.0, 'C'))[0][1].quantity == 2
+
+    with open(path, 'w') as f:
+        f.write('SPX: {strategies: [{name: broken, options: [{strike: x}]}]}')
+    os.utime(path, ns=(3_000_000_000, 3_000_000_000))
+    assert watcher.poll() is None
+    assert len(positions) == 2
+
+def test_exposure_refresh_moves_the_last_greeks(tmp_path):
+    path = str(tmp_path / 'inventory.yaml')
+    write_inventory(path, [option(5100), option(5200, -1)], 1_000_000_000)
+    watcher = InventoryWatcher(path)
+    aggregator = GreeksAggregator()
+    exposure = aggregator.exposure(watcher.positions, multiplier=100)
+    contracts = ContractIndex()
+    indices = contracts.indices([Option('SPX', '20250419', strike, 'C', 'SMART') for strike in (5100.0, 5200.0)])
+    exposure.update(contracts, indices, {'delta': np.array([0.5, 0.3])})
+    assert np.isclose(aggregator.totals()['underlying']['SPX']['delta'], 20.0)
+
+    write_inventory(path, [option(5100, 2)], 2_000_000_000)
+    diff = watcher.poll()
+    exposure.refresh(diff.keys)
+    assert np.isclose(aggregator.totals()['underlying']['SPX']['delta'], 100.0)
+    assert not exposure.update(contracts, indices[1:], {'delta': np.array([0.4])})
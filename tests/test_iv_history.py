@@ -0,0 +1,61 @@
+import asyncio
+from datetime import date, timedelta
+
+import numpy as np
+from ib_insync import Index
+from monitoring.iv_history import IVHistoryCache, IVHistoryService, IVRange
+from monitoring.monitor import OptionMonitor
+from simulation.fake_ib import FakeIB
+
+def test_only_the_gap_since_the_last_run_is_fetched(tmp_path):
+    ib = FakeIB({'SPX': 5000.0})
+    durations = []
+    request = ib.reqHistoricalDataAsync
+    async def recording(contract, endDateTime, durationStr, *args, **kwargs):
+        durations.append(durationStr)
+        return await request(contract, endDateTime, durationStr, *args, **kwargs)
+    ib.reqHistoricalDataAsync = recording
+    today = date.today()
+
+    service = IVHistoryService(ib, IVHistoryCache(str(tmp_path)))
+    assert len(service.range('SPX')) == 0
+    assert asyncio.run(service.warm([Index('SPX', 'CBOE')], today)) > 250
+    iv_range = service.range('SPX')
+    assert len(iv_range) > 250 and 0.09 < iv_range.low < iv_range.high < 0.31
+
+    # A restart serves the cached range right away and asks only for the days since the last bar
+    restarted = IVHistoryService(ib, IVHistoryCache(str(tmp_path)))
+    assert len(restarted.range('SPX', today)) == len(iv_range)
+    asyncio.run(restarted.warm([Index('SPX', 'CBOE')], today + timedelta(days=3)))
+    assert durations == ['365 D', f"{(today + timedelta(days=3) - restarted.cache.last_date('SPX')).days + 1} D"]
+
+def test_pacing_limits_requests_per_window(tmp_path):
+    ib = FakeIB({'SPX': 5000.0, 'RUT': 2000.0, 'NDX': 18000.0})
+    service = IVHistoryService(ib, IVHistoryCache(str(tmp_path)), days=5, max_requests=2, window=0.2)
+
+    async def run():
+        task = asyncio.ensure_future(service.warm([Index(symbol, 'SMART') for symbol in ib.underlyings]))
+        await asyncio.sleep(0.1)
+        sent = ib.historical_requests
+        await task
+        return sent
+
+    assert asyncio.run(run()) == 2
+    assert ib.historical_requests == 3
+
+def test_contracts_rank_on_their_own_window_and_the_underlying_on_the_yearly_range():
+    iv_range = IVRange([])
+    monitor = OptionMonitor(contract_capacity=4, iv_window=10, iv_range=iv_range)
+    indices = np.arange(2)
+    for iv in np.linspace(0.10, 0.20, 10):
+        columns = monitor.update_iv(indices, np.array([iv, iv + 0.5]))
+    # Each contract is ranked against its own samples, so a steep skew does not pin the far strike at 1.0
+    assert columns['iv_rank'].tolist() == [1.0, 1.0]
+    assert monitor.get_iv_rank(0, 0.15) == 0.5 and monitor.get_iv_rank(1, 0.65) == 0.5
+    assert monitor.get_iv_percentile(1, 0.65) == 0.5
+
+    assert np.isnan(monitor.underlying_iv(0.2)['iv_rank'])
+    iv_range.update(np.linspace(0.10, 0.30, 101))
+    assert monitor.underlying_iv(0.15) == {'iv': 0.15, 'iv_rank': 0.25, 'iv_percentile': 0.25}
+    assert monitor.underlying_iv(0.35)['iv_rank'] == 1.0
+    assert np.isnan(monitor.underlying_iv(None)['iv_rank'])
@@ -0,0 +1,75 @@
+import threading
+import urllib.request
+from monitoring.metrics import LatencyHistogram, Metrics, MetricsServer
+
+def test_histogram_quantiles_within_bucket_precision():
+    histogram = LatencyHistogram()
+    for i in range(1, 1001):
+        histogram.record(i * 1e-5)
+    p50, p99 = histogram.quantiles((0.5, 0.99))
+    assert 5e-3 <= p50 <= 5e-3 * 1.05
+    assert 9.9e-3 <= p99 <= 9.9e-3 * 1.05
+    assert histogram.count == 1000 and histogram.max == 1000 * 1e-5
+
+def test_render_and_interval_summary():
+    metrics = Metrics()
+    spx = metrics.scope(symbol='SPX')
+    spx.histogram('stage_seconds', stage='alerts').record(0.002)
+    spx.counter('ticks').inc(40)
+    dropped = [0]
+    metrics.collect('snapshot_batches_dropped', lambda: dropped[0])
+
+    text = metrics.render()
+    assert '# TYPE monitor_stage_seconds summary' in text
+    assert 'monitor_stage_seconds_count{stage="alerts",symbol="SPX"} 1' in text
+    assert 'monitor_ticks{symbol="SPX"} 40' in text
+    assert 'monitor_snapshot_batches_dropped 0' in text
+
+    assert 'ticks[symbol=SPX]=40' in metrics.summary()
+    spx.counter('ticks').inc(5)
+    dropped[0] = 2
+    assert metrics.summary() == 'ticks[symbol=SPX]=5 | snapshot_batches_dropped=2'
+
+def test_gauges_report_their_current_value_once_known():
+    metrics = Metrics()
+    rank = [float('nan')]
+    metrics.scope(symbol='SPX').gauge('underlying_iv_rank', lambda: rank[0])
+    assert 'iv_rank' not in metrics.render() and metrics.summary() == ''
+
+    rank[0] = 0.8
+    assert '# TYPE monitor_underlying_iv_rank gauge\nmonitor_underlying_iv_rank{symbol="SPX"} 0.8\n' in metrics.render()
+    assert metrics.summary() == 'underlying_iv_rank[symbol=SPX]=0.8'
+    assert metrics.summary() == ''
+
+def test_render_while_underlyings_register():
+    metrics = Metrics()
+    errors = []
+
+    def render():
+        try:
+            for _ in range(200):
+                metrics.render()
+                metrics.summary()
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=render)
+    thread.start()
+    for i in range(2000):
+        scope = metrics.scope(symbol=f"S{i}")
+        scope.counter('ticks').inc()
+        scope.histogram('stage_seconds', stage='publish').record(0.001)
+        scope.collect('queue_depth', lambda: 0)
+    thread.join()
+    assert errors == []
+    assert 'monitor_ticks{symbol="S1999"} 1' in metrics.render()
+
+def test_server_exposes_prometheus_text():
+    metrics = Metrics()
+    metrics.counter('alerts').inc(3)
+    server = MetricsServer(metrics, port=0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+            assert 'monitor_alerts 3' in response.read().decode()
+    finally:
+        server.close()
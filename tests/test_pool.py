@@ -0,0 +1,58 @@
+import asyncio
+from ib_insync import Index, Option
+from client.ib_client import IBClient
+from client.pool import IBConnectionPool
+from simulation.fake_ib import FakeIB
+
+UNDERLYINGS = {'SPX': 5000.0, 'RUT': 2000.0}
+
+def make_pool(shard_by, size=2):
+    members = [FakeIB(UNDERLYINGS, expirations=1, strikes=10, seed=i) for i in range(size)]
+    pool = IBConnectionPool([IBClient(ib) for ib in members], shard_by=shard_by)
+    asyncio.run(pool.connect_async())
+    return pool, members
+
+def chain(pool, symbol):
+    [params] = pool.reqSecDefOptParams(symbol, '', 'IND', 0)
+    return [Option(symbol, params.expirations[0], strike, right, 'SMART') for strike in params.strikes for right in 'CP']
+
+def test_underlyings_are_pinned_to_connections_and_streams_merged():
+    pool, members = make_pool('underlying')
+    contracts = asyncio.run(pool.qualifyContractsAsync(*chain(pool, 'SPX'), *chain(pool, 'RUT')))
+    assert len(contracts) == 40 and pool.isConnected()
+    tickers = [pool.reqMktData(c) for c in contracts]
+    assert pool.load() == [20, 20]
+    assert {t.contract.symbol for t in members[0]._options} == {'SPX'}
+
+    received = []
+    pool.pendingTickersEvent += received.append
+    for ib in members:
+        ib.step(0)
+    assert set().union(*received) == set(tickers)
+
+    pool.cancelMktData(contracts[0])
+    assert pool.load() == [19, 20] and len(members[0]._options) == 19
+    pool.disconnect()
+
+def test_hash_sharding_splits_one_chain():
+    pool, members = make_pool('hash', size=3)
+    contracts = asyncio.run(pool.qualifyContractsAsync(*chain(pool, 'SPX')))
+    for contract in contracts:
+        pool.reqMktData(contract)
+    assert sum(pool.load()) == 20 and min(pool.load()) > 0
+    pool.disconnect()
+
+def test_dropped_connection_keeps_healthy_subscriptions():
+    pool, members = make_pool('underlying')
+    spx, rut = Index('SPX', 'CBOE'), Index('RUT', 'RUSSELL')
+    asyncio.run(pool.qualifyContractsAsync(spx, rut))
+    spx_ticker, rut_ticker = pool.reqMktData(spx), pool.reqMktData(rut)
+    drops = []
+    pool.disconnectedEvent += lambda: drops.append(1)
+
+    members[1].disconnect()
+    assert drops == [1] and not pool.isConnected()
+    asyncio.run(pool.connect_async())
+    assert pool.reqMktData(spx) is spx_ticker
+    assert pool.reqMktData(rut) is not rut_ticker
+    pool.disconnect()
@@ -0,0 +1,71 @@
+import asyncio
+import json
+from ib_insync import Option
+from service.qualifier import ContractQualifier
+
+class CountingIB:
+    def __init__(self):
+        self.requests = []
+
+    async def qualifyContractsAsync(self, *contracts):
+        self.requests.append(len(contracts))
+        for contract in contracts:
+            if contract.strike % 20:
+                continue  # not listed
+            contract.conId = int(contract.strike)
+            contract.tradingClass = 'SPXW'
+        return list(contracts)
+
+def chain(expiry='20991217'):
+    return [Option('SPX', expiry, strike, 'C', 'SMART') for strike in range(5000, 5100, 10)]
+
+def test_missing_contracts_are_qualified_in_chunks_and_cached(tmp_path):
+    cache_file = str(tmp_path / 'contracts.json')
+    ib = CountingIB()
+    qualified = asyncio.run(ContractQualifier(ib, cache_file, chunk_size=4, chunk_delay=0).qualify_async(chain()))
+    assert len(qualified) == 5
+    assert ib.requests == [4, 4, 2]
+
+    # Unlisted strikes are remembered as well and not requested again
+    ib = CountingIB()
+    qualified = asyncio.run(ContractQualifier(ib, cache_file, chunk_size=4, chunk_delay=0).qualify_async(chain()))
+    assert ib.requests == []
+    assert [c.conId for c in qualified] == list(range(5000, 5100, 20))
+    assert qualified[0].tradingClass == 'SPXW'
+
+def test_expired_entries_are_evicted_on_load(tmp_path):
+    cache_file = tmp_path / 'contracts.json'
+    cache_file.write_text(json.dumps({
+        'SPX|20200117|5000.0|C|SMART|': {'conId': 1},
+        'SPX|20991217|5000.0|C|SMART|': {'conId': 2},
+        'SPX|20991217|5010.0|C|SMART|': {'unresolved': '20200116'},
+    }))
+    qualifier = ContractQualifier(CountingIB(), str(cache_file))
+    assert list(qualifier.cache) == ['SPX|20991217|5000.0|C|SMART|']
+
+def test_trading_classes_are_cached_apart(tmp_path):
+    weekly, monthly = chain()[:1], chain()[:1]
+    weekly[0].tradingClass, monthly[0].tradingClass = 'SPXW', 'SPX'
+    ib = CountingIB()
+    qualifier = ContractQualifier(ib, str(tmp_path / 'contracts.json'), chunk_delay=0)
+    asyncio.run(qualifier.qualify_async(weekly))
+    asyncio.run(qualifier.qualify_async(monthly))
+    assert ib.requests == [1, 1]
+    assert sorted(qualifier.cache) == ['SPX|20991217|5000.0|C|SMART|SPX', 'SPX|20991217|5000.0|C|SMART|SPXW']
+
+def test_unresolved_entries_are_retried_the_next_day(tmp_path):
+    contracts = chain()[:2]
+    qualifier = ContractQualifier(CountingIB(), str(tmp_path / 'contracts.json'), chunk_delay=0)
+    asyncio.run(qualifier.qualify_async(contracts))
+    unlisted = 'SPX|20991217|5010.0|C|SMART|'
+    assert 'unresolved' in qualifier.cache[unlisted]
+
+    # Still unlisted today, the entry stays as is
+    ib = qualifier.ib = CountingIB()
+    asyncio.run(qualifier.qualify_async(chain()[:2]))
+    assert ib.requests == []
+
+    # The process kept running past midnight
+    qualifier.cache[unlisted] = {'unresolved': '20200116'}
+    asyncio.run(qualifier.qualify_async(chain()[:2]))
+    assert ib.requests == [1]
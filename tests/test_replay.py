@@ -0,0 +1,57 @@
+import numpy as np
+from ib_insync import Option
+from config.config import AlertConfig
+from monitoring.snapshot_store import SnapshotStore
+from persistence.snapshot_writer import ParquetSnapshotWriter
+from replay.replay import ReplayEngine, build_replay_pipeline, load_snapshots
+
+def record_session(tmp_path):
+    store = SnapshotStore(contract_capacity=2, max_cycles=16)
+    indices = store.contracts.indices([Option('SPX', '20250419', 5100, 'C', 'SMART'),
+                                       Option('SPX', '20250419', 5200, 'C', 'SMART')])
+    writer = ParquetSnapshotWriter(str(tmp_path), partition='symbol=SPX')
+    for i in range(10):
+        columns = {'bid': np.array([10.0, 5.0]), 'ask': np.array([10.5, 5.5]),
+                   'delta': np.array([0.3 + 0.05 * i, 0.2]), 'iv': np.array([0.2 + 0.01 * i, 0.18])}
+        store.record(f'2025-04-01T10:00:{i:02d}', indices, columns, 5000.0 + i)
+    writer(store.drain())
+    writer.close()
+
+def test_replay_drives_the_pipeline_from_recorded_parquet(tmp_path):
+    record_session(tmp_path)
+    frame = load_snapshots(str(tmp_path / 'symbol=SPX'))
+    config = AlertConfig(watched_strikes={5100}, local_greeks=False)
+    result = ReplayEngine(build_replay_pipeline(config, 'SPX'), frame).run()
+
+    assert (result.cycles, result.rows) == (10, 20)
+    assert [alert for _, alert in result.alerts] == ["⚠️ C 5100.0 delta crossed 0.5: 0.55"]
+    assert result.alerts[0][0].second == 5
+
+def test_replay_feeds_only_the_contracts_updated_in_each_cycle(tmp_path):
+    store = SnapshotStore(contract_capacity=2, max_cycles=16)
+    indices = store.contracts.indices([Option('SPX', '20250419', 5100, 'C', 'SMART'),
+                                       Option('SPX', '20250419', 5200, 'C', 'SMART')])
+    store.record('2025-04-01T10:00:00', indices, {'iv': np.array([0.20, 0.18])}, 5000.0)
+    for i in range(1, 6):
+        store.record(f'2025-04-01T10:00:{i:02d}', indices[:1], {'iv': np.array([0.2 + 0.01 * i])}, 5000.0)
+    path = str(tmp_path / 'spx.csv')
+    store.drain().to_csv(path, index=False)
+
+    pipeline = build_replay_pipeline(AlertConfig(local_greeks=False), 'SPX')
+    result = ReplayEngine(pipeline, load_snapshots(path)).run()
+    assert (result.cycles, result.rows) == (6, 7)
+    assert [pipeline.monitor.iv_stats.count(idx) for idx in range(2)] == [6, 1]
+
+def test_recorded_underlying_prices_of_the_greeks_are_replayed(tmp_path):
+    store = SnapshotStore(contract_capacity=2, max_cycles=16)
+    indices = store.contracts.indices([Option('SPX', '20250419', 5100, 'C', 'SMART'),
+                                       Option('SPX', '20250419', 5200, 'C', 'SMART')])
+    store.record('2025-04-01T10:00:00', indices, {'iv': np.array([0.20, 0.18]),
+                                                  'und_price': np.array([5001.0, 5001.5])}, 5000.0)
+    path = str(tmp_path / 'spx.csv')
+    store.drain().to_csv(path, index=False)
+
+    engine = ReplayEngine(build_replay_pipeline(AlertConfig(local_greeks=False), 'SPX'), load_snapshots(path))
+    _, _, columns, price = next(engine.cycles())
+    assert columns['und_price'].tolist() == [5001.0, 5001.5]
+    assert price == 5000.0
@@ -0,0 +1,60 @@
+import statistics
+import numpy as np
+from monitoring.rolling_stats import RollingIVStats
+
+def reference(history, current):
+    mean = statistics.mean(history)
+    stdev = statistics.stdev(history)
+    z = 0 if stdev == 0 else round((current - mean) / stdev, 2)
+    return z, round(sum(iv < current for iv in history) / len(history), 2)
+
+def test_push_matches_full_recompute_over_sliding_window():
+    rng = np.random.default_rng(7)
+    stats = RollingIVStats(window=10, capacity=1)
+    samples = rng.uniform(0.1, 0.4, 40)
+    for i, iv in enumerate(samples):
+        stats.push(0, iv)
+        window = list(samples[max(0, i - 9):i + 1])
+        assert np.allclose(stats.history(0), window)
+        if len(window) >= 5:
+            assert (stats.zscore(0, iv), stats.percentile(0, iv)) == reference(window, iv)
+
+def test_not_enough_history_returns_none():
+    stats = RollingIVStats(window=10, capacity=1)
+    for iv in (0.2, 0.21, 0.22, 0.23):
+        stats.push(0, iv)
+    assert stats.zscore(0, 0.25) is None
+    assert stats.percentile(0, None) is None
+
+def test_batch_matches_single_contract_path():
+    rng = np.random.default_rng(3)
+    batch = RollingIVStats(window=8, capacity=2)
+    single = RollingIVStats(window=8, capacity=2)
+    indices = np.arange(3)
+    for _ in range(20):
+        values = rng.uniform(0.1, 0.4, 3)
+        batch.push_many(indices, values)
+        for idx, iv in zip(indices, values):
+            single.push(idx, iv)
+    current = np.array([0.2, 0.3, np.nan])
+    z = batch.zscores(indices, current)
+    pct = batch.percentiles(indices, current)
+    assert [single.zscore(i, c) for i, c in zip(indices[:2], current[:2])] == list(z[:2])
+    assert [single.percentile(i, c) for i, c in zip(indices[:2], current[:2])] == list(pct[:2])
+    assert np.isnan(z[2]) and np.isnan(pct[2])
+
+def test_batch_keeps_the_windows_sorted_with_ties_and_gaps():
+    rng = np.random.default_rng(5)
+    batch = RollingIVStats(window=6, capacity=8)
+    single = RollingIVStats(window=6, capacity=8)
+    for _ in range(200):
+        indices = rng.choice(8, size=rng.integers(1, 8), replace=False)
+        values = np.round(rng.uniform(0.1, 0.4, len(indices)), 1)
+        values[rng.random(len(indices)) < 0.2] = np.nan
+        batch.push_many(indices, values)
+        for idx, iv in zip(indices, values):
+            if np.isfinite(iv):
+                single.push(idx, iv)
+        assert np.array_equal(batch._sorted, single._sorted)
+    for idx in range(8):
+        assert np.array_equal(batch._sorted[idx, :batch.count(idx)], np.sort(batch.history(idx)))
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+from alerting.rules import RuleEngine, alert_rules
+from config.config import AlertConfig, AlertRule, UnderlyingConfig
+from monitoring.snapshot_store import ContractIndex
+
+START = datetime(2025, 4, 1, 10)
+
+def chain(strikes=(5000.0, 5100.0, 5200.0)):
+    contracts = ContractIndex()
+    indices = np.array([contracts.add_key(('SPX', '20250419', strike, 'C')) for strike in strikes], dtype=np.intp)
+    return contracts, indices
+
+def test_rule_rearms_after_leaving_the_hysteresis_band():
+    engine = RuleEngine([AlertRule(name='iv_spike', field='iv_zscore', threshold=2.0, hysteresis=0.5)], 'SPX')
+    contracts, indices = chain()
+    check = lambda *z: engine.check_batch(contracts, indices, {'iv_zscore': np.array(z)}, START)
+
+    assert check(2.5, 1.0, np.nan) == ["⚠️ C 5000.0 iv_zscore crossed 2: 2.50"]
+    assert check(1.8, 1.0, 2.1) == ["⚠️ C 5200.0 iv_zscore crossed 2: 2.10"]
+    assert check(2.6, 1.0, 2.1) == []
+    check(1.4, 1.0, 2.1)
+    assert check(2.2, 1.0, 2.1) == ["⚠️ C 5000.0 iv_zscore crossed 2: 2.20"]
+
+def test_cooldown_delays_the_next_alert():
+    engine = RuleEngine([AlertRule(name='wide', field='spread_pct', threshold=0.2, cooldown=60,
+                                   message="{rule} {strike} {value:.2f}")], 'SPX')
+    contracts, indices = chain((5000.0,))
+    wide, tight = {'bid': np.array([1.0]), 'ask': np.array([1.5])}, {'bid': np.array([1.0]), 'ask': np.array([1.1])}
+
+    assert engine.check_batch(contracts, indices, wide, START) == ["wide 5000.0 0.40"]
+    engine.check_batch(contracts, indices, tight, START + timedelta(seconds=10))
+    assert engine.check_batch(contracts, indices, wide, START + timedelta(seconds=20)) == []
+    assert engine.check_batch(contracts, indices, wide, START + timedelta(seconds=61)) == ["wide 5000.0 0.40"]
+
+def test_underlying_rules_read_the_yearly_iv_rank():
+    engine = RuleEngine([AlertRule(name='iv_rank_high', scope='underlying', field='iv_rank', threshold=0.9,
+                                   hysteresis=0.1, message="{symbol} {rule} {value:.2f}")], 'SPX')
+    assert engine.check(5000, START, {'iv': 0.2, 'iv_rank': np.nan}) == []
+    assert engine.check(5000, START, {'iv': 0.3, 'iv_rank': 0.95}) == ["SPX iv_rank_high 0.95"]
+    assert engine.check(5000, START, {'iv': 0.3, 'iv_rank': 0.97}) == []
+    engine.check(5000, START, {'iv': 0.2, 'iv_rank': 0.7})
+    assert engine.check(None, START, {'iv': 0.3, 'iv_rank': 0.92}) == ["SPX iv_rank_high 0.92"]
+
+def test_legacy_thresholds_become_per_underlying_rules():
+    config = AlertConfig(underlyings={'RUT': UnderlyingConfig(low_threshold=1900)},
+                         alert_rules=[AlertRule(name='delta', field='delta', threshold=0.6, symbols={'SPX'})])
+    spx = RuleEngine(alert_rules(config, UnderlyingConfig()), 'SPX')
+    rut = RuleEngine(alert_rules(config, config.underlyings['RUT']), 'RUT')
+    assert rut.check(1850, START) == ["⚠️ RUT dropped below 1900: 1850"]
+    assert rut.check(1850, START) == []
+    rut.check(1950, START + timedelta(seconds=30))
+    assert rut.check(1850, START + timedelta(seconds=60)) == ["⚠️ RUT dropped below 1900: 1850"]
+
+    contracts, indices = chain()
+    columns = {'delta': np.array([0.9, 0.55, 0.7])}
+    assert spx.check_batch(contracts, indices, columns, START) == ["⚠️ C 5000.0 delta crossed 0.6: 0.90",
+                                                                   "⚠️ C 5200.0 delta crossed 0.6: 0.70"]
+    assert spx.check(4400, START) == ["⚠️ SPX dropped below 4500: 4400"]
+    assert rut.check_batch(contracts, indices, columns, START) == []
+
+def test_aggregate_rules_watch_net_greeks_by_group():
+    engine = RuleEngine([AlertRule(name='net_delta', scope='aggregate', field='delta', threshold=50, absolute=True)])
+    totals = {'strategy': {'spread': {'delta': -60.0}}, 'portfolio': {'portfolio': {'delta': 40.0}}}
+    assert engine.check_totals(totals, START) == ["⚠️ strategy spread net delta crossed 50: -60.00"]
+    totals['portfolio']['portfolio']['delta'] = 70.0
+    assert engine.check_totals(totals, START) == ["⚠️ portfolio portfolio net delta crossed 50: 70.00"]
+
+def test_legacy_greek_rules_do_not_flap_at_the_threshold():
+    engine = RuleEngine(alert_rules(AlertConfig(), UnderlyingConfig()), 'SPX')
+    contracts, indices = chain((5100.0,))
+    check = lambda delta, seconds: engine.check_batch(contracts, indices, {'delta': np.array([delta])},
+                                                      START + timedelta(seconds=seconds))
+    assert check(0.51, 0) == ["⚠️ C 5100.0 delta crossed 0.5: 0.51"]
+    check(0.495, 1)
+    assert check(0.51, 2) == []
+    check(0.48, 30)
+    assert check(0.51, 40) == []
+    assert check(0.51, 61) == ["⚠️ C 5100.0 delta crossed 0.5: 0.51"]
+
+def test_legacy_price_rules_do_not_flap_at_the_threshold():
+    engine = RuleEngine(alert_rules(AlertConfig(), UnderlyingConfig()), 'SPX')
+    check = lambda price, seconds: engine.check(price, START + timedelta(seconds=seconds))
+    assert check(4499.9, 0) == ["⚠️ SPX dropped below 4500: 4499.9"]
+    assert [check(price, i + 1) for i, price in enumerate((4500.1, 4499.9, 4500.1, 4499.9))] == [[]] * 4
+    check(4506, 30)
+    assert check(4499.9, 40) == []
+    assert check(4499.9, 61) == ["⚠️ SPX dropped below 4500: 4499.9"]
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import date, timedelta
+from eventkit import Event
+from ib_insync import OptionChain
+from config.config import AlertConfig
+from service.scheduler import MonitorScheduler
+from simulation.fake_ib import FakeIB
+
+class DummyTicker:
+    def __init__(self, contract, last):
+        self.contract = contract
+        self.last = last
+        self.close = last
+
+class SlowChainIB:
+    """Async stub of the IB surface used at startup; RUT chain discovery is slow."""
+    def __init__(self):
+        self.pendingTickersEvent = Event('pendingTickersEvent')
+        self.next_con_id = 1
+
+    async def qualifyContractsAsync(self, *contracts):
+        for contract in contracts:
+            contract.conId = self.next_con_id
+            self.next_con_id += 1
+        return list(contracts)
+
+    async def reqSecDefOptParamsAsync(self, symbol, exchange, sec_type, con_id):
+        if symbol == 'RUT':
+            await asyncio.sleep(0.2)
+        expiry = (date.today() + timedelta(days=7)).strftime('%Y%m%d')
+        return [OptionChain('SMART', con_id, symbol, '100', [expiry], [90.0, 100.0, 110.0])]
+
+    def reqMktData(self, contract, *args):
+        return DummyTicker(contract, 100.0)
+
+def test_underlyings_start_concurrently_and_independently(monkeypatch, tmp_path):
+    async def price_now(tracker):
+        return tracker.current_price()
+    monkeypatch.setattr('src.service.symbol_tracker.SymbolTracker.get_price_async', price_now)
+    config = AlertConfig(snapshot_file=str(tmp_path / '{symbol}.csv'), contract_cache_file='', qualify_chunk_delay=0,
+                         history_file=None, iv_history_dir=None, metrics_port=None)
+    scheduler = MonitorScheduler(SlowChainIB(), config)
+    started = []
+
+    async def run():
+        task = asyncio.ensure_future(scheduler.start(['SPX', 'RUT']))
+        await asyncio.sleep(0.1)
+        started.append(set(scheduler.monitors))
+        await task
+
+    asyncio.run(run())
+    scheduler.stop()
+    assert started == [{'SPX'}]
+    assert set(scheduler.monitors) == {'SPX', 'RUT'}
+    assert len(scheduler.monitors['RUT'].tickers) == 2
+
+def test_window_waits_for_qualification_and_rolls_expirations(monkeypatch, tmp_path):
+    async def price_now(tracker):
+        return tracker.current_price()
+    monkeypatch.setattr('src.service.symbol_tracker.SymbolTracker.get_price_async', price_now)
+    ib = FakeIB({'SPX': 5000.0}, expirations=3, strikes=40, seed=3)
+    config = AlertConfig(strike_window_width=2, snapshot_format='csv', snapshot_file=str(tmp_path / '{symbol}.csv'),
+                         contract_cache_file='', qualify_chunk_delay=0, history_file=None, iv_history_dir=None,
+                         metrics_port=None)
+    scheduler = MonitorScheduler(ib, config)
+    added = (date.today() + timedelta(days=30)).strftime('%Y%m%d')
+
+    async def run():
+        ib.connect()
+        await scheduler.start(['SPX'])
+        monitor = scheduler.monitors['SPX']
+        window = monitor.tracker.window
+        before = set(window.keys())
+
+        qualify = ib.qualifyContractsAsync
+        async def failing(*contracts):
+            raise ConnectionError('request timed out')
+        ib.qualifyContractsAsync = failing
+        assert not await scheduler.recenter(monitor, 5050.0)
+        assert set(window.keys()) == before
+        ib.qualifyContractsAsync = qualify
+        assert await scheduler.recenter(monitor, 5050.0)
+        assert set(window.keys()) - before <= set(monitor.subscriptions._keys)
+
+        expired = ib.expirations.pop(0)
+        ib.expirations.append(added)
+        monitor.tracker._chains_fetched_at = None
+        assert await scheduler.roll_expirations(monitor)
+        assert not await scheduler.roll_expirations(monitor)
+        assert not any(key[1] == expired for key in monitor.subscriptions._keys)
+        await scheduler.recenter(monitor, 5050.0)
+        return monitor, window
+
+    monitor, window = asyncio.run(run())
+    scheduler.stop()
+    ib.disconnect()
+    assert any(key[1] == added for key in window.keys())
+    assert any(key[1] == added for key in monitor.subscriptions._keys)
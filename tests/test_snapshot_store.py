@@ -0,0 +1,78 @@
+import numpy as np
+from monitoring.snapshot_store import SnapshotStore, ticker_columns
+
+class DummyContract:
+    def __init__(self, strike, right, expiry, symbol='SPX'):
+        self.symbol = symbol
+        self.strike = strike
+        self.right = right
+        self.lastTradeDateOrContractMonth = expiry
+
+class DummyGreeks:
+    def __init__(self, delta, iv):
+        self.delta = delta
+        self.gamma = None
+        self.theta = None
+        self.vega = None
+        self.impliedVol = iv
+        self.undPrice = None
+
+class DummyTicker:
+    def __init__(self, contract, bid, ask, greeks=None):
+        self.contract = contract
+        self.bid = bid
+        self.ask = ask
+        self.last = None
+        self.modelGreeks = greeks
+
+def make_tickers():
+    return [
+        DummyTicker(DummyContract(5100, 'C', '20250419'), 1.0, 1.2, DummyGreeks(0.4, 0.2)),
+        DummyTicker(DummyContract(5000, 'P', '20250419'), 2.0, 2.5),
+    ]
+
+def test_ticker_columns_missing_greeks_are_nan():
+    columns = ticker_columns(make_tickers())
+    assert columns['delta'][0] == 0.4
+    assert np.isnan(columns['delta'][1])
+    assert np.isnan(columns['gamma']).all()
+
+def test_record_keeps_stable_index_and_carries_forward():
+    store = SnapshotStore(contract_capacity=1, max_cycles=4)
+    tickers = make_tickers()
+    indices = store.contracts.indices([t.contract for t in tickers])
+    assert list(indices) == [0, 1]
+    store.record('2025-04-01T10:00:00', indices, ticker_columns(tickers), 5050)
+    store.record('2025-04-01T10:00:15', indices[:1], {'bid': np.array([1.1])}, 5051)
+    assert list(store.latest('bid')) == [1.1, 2.0]
+    assert store.wide_frame('bid').shape == (2, 2)
+
+def test_ring_is_bounded_and_drain_returns_pending_cycles():
+    store = SnapshotStore(contract_capacity=2, max_cycles=3)
+    indices = store.contracts.indices([t.contract for t in make_tickers()])
+    for i in range(5):
+        store.record(f'2025-04-01T10:00:0{i}', indices, {'bid': np.array([i, i])})
+    assert store.is_full
+    df = store.drain()
+    assert len(df) == 6
+    assert list(df['bid'][::2]) == [2, 3, 4]
+    assert len(store.drain()) == 0
+
+def test_registry_interns_contracts_into_compact_columns():
+    store = SnapshotStore(contract_capacity=1, max_cycles=2)
+    contracts = store.contracts
+    call = DummyContract(5102.5, 'C', '20250419')
+    call.conId = 42
+    fop = DummyContract(5100, 'P', '202506', symbol='ES')
+    assert list(contracts.indices([call, fop])) == [0, 1]
+    assert contracts.expiry.dtype == np.int32 and list(contracts.expiry[:2]) == [20250419, 20250600]
+    assert list(contracts.strike_fp[:2]) == [5102500, 5100000] and list(contracts.right[:2]) == [b'C', b'P']
+    assert str(contracts.expires_at[0]) == '2025-04-19T16:00:00' and np.isnat(contracts.expires_at[1])
+
+    # Qualified contracts resolve by conId; keys round-trip with string expiries and float strikes
+    call.strike = None
+    assert contracts.add(call) == 0
+    assert contracts.keys() == [('SPX', '20250419', 5102.5, 'C'), ('ES', '202506', 5100.0, 'P')]
+    assert contracts.get(('ES', '202506', 5100, 'P')) == 1 and ('SPX', '20250419', 5100.0, 'C') not in contracts
+    store.record('2025-04-01T10:00:00', np.array([0, 1]), {'bid': np.array([1.0, 2.0])})
+    assert store.to_frame()[['expiration', 'right']].values.tolist() == [['20250419', 'C'], ['202506', 'P']]
@@ -0,0 +1,61 @@
+import os
+import numpy as np
+from datetime import datetime
+import pyarrow.parquet as pq
+from ib_insync import Option
+from monitoring.snapshot_store import SnapshotStore
+from persistence.snapshot_writer import ParquetSnapshotWriter, compact
+
+def record_cycles(store, hour, cycles):
+    indices = store.contracts.indices([Option('SPX', '20250419', 5100, 'C', 'SMART'),
+                                       Option('SPX', '20250419', 5000, 'P', 'SMART')])
+    for i in range(cycles):
+        store.record(f'2025-04-01T{hour:02d}:00:{i:02d}', indices, {'bid': np.array([i, i + 0.5])}, 5050.0)
+
+def test_frames_are_streamed_into_hour_partitions_and_compacted(tmp_path):
+    store = SnapshotStore(contract_capacity=2, max_cycles=8)
+    writer = ParquetSnapshotWriter(str(tmp_path), partition='symbol=SPX', compact_hours=False)
+    record_cycles(store, 10, 3)
+    writer(store.drain())
+    record_cycles(store, 10, 2)
+    writer(store.drain())
+    record_cycles(store, 11, 1)
+    writer(store.drain())
+    writer.close()
+
+    assert writer.written_rows == 12 and writer.dropped == 0
+    hour10 = tmp_path / 'symbol=SPX' / 'date=2025-04-01' / 'hour=10'
+    assert pq.read_table(hour10).num_rows == 10
+    assert pq.read_table(tmp_path / 'symbol=SPX' / 'date=2025-04-01' / 'hour=11').num_rows == 2
+
+    assert compact(str(tmp_path)) == 2
+    assert os.listdir(hour10) == ['compacted.parquet']
+    table = pq.read_table(hour10 / 'compacted.parquet')
+    assert table.column('bid').to_pylist()[-2:] == [1.0, 1.5]
+
+def test_writer_compacts_the_hour_it_left(tmp_path):
+    store = SnapshotStore(contract_capacity=2, max_cycles=8)
+    writer = ParquetSnapshotWriter(str(tmp_path), partition='symbol=SPX', rotate_seconds=0)
+    record_cycles(store, 10, 3)
+    writer(store.drain())
+    record_cycles(store, 10, 2)
+    writer(store.drain())
+    record_cycles(store, 11, 1)
+    writer(store.drain())
+    writer.close()
+
+    partition = tmp_path / 'symbol=SPX' / 'date=2025-04-01'
+    assert os.listdir(partition / 'hour=10') == ['compacted.parquet']
+    assert pq.read_table(partition / 'hour=10').num_rows == 10
+    # The hour still being written is left alone
+    assert [name.startswith('part-') for name in os.listdir(partition / 'hour=11')] == [True]
+
+def test_offline_compaction_skips_recent_hours(tmp_path):
+    store = SnapshotStore(contract_capacity=2, max_cycles=8)
+    writer = ParquetSnapshotWriter(str(tmp_path), partition='symbol=SPX', compact_hours=False)
+    record_cycles(store, 10, 1)
+    writer(store.drain())
+    writer.close()
+
+    assert compact(str(tmp_path), before=datetime(2025, 4, 1, 11, 30)) == 0
+    assert compact(str(tmp_path), before=datetime(2025, 4, 1, 12, 0)) == 1
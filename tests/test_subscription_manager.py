@@ -0,0 +1,58 @@
+from datetime import date
+from ib_insync import Option
+from service.subscription_manager import SubscriptionManager
+
+class DummyTicker:
+    def __init__(self, contract):
+        self.contract = contract
+
+class LineCountingIB:
+    def __init__(self):
+        self.subscribed = set()
+        self.requests = 0
+
+    def reqMktData(self, contract, *args):
+        self.requests += 1
+        self.subscribed.add(contract.strike)
+        return DummyTicker(contract)
+
+    def cancelMktData(self, contract):
+        self.subscribed.discard(contract.strike)
+
+def candidates():
+    contracts = [Option('SPX', '20250418', strike, 'C', 'SMART') for strike in range(5000, 5500, 50)]
+    contracts.append(Option('SPX', '20250516', 5100, 'C', 'SMART'))
+    return contracts
+
+def test_keeps_positions_then_nearest_strikes_then_nearest_expiry():
+    ib = LineCountingIB()
+    manager = SubscriptionManager(ib, max_lines=3)
+    manager.set_candidates(candidates(), positions={('SPX', '20250418', 5450, 'C')})
+    manager.rebalance(5100, today=date(2025, 4, 1))
+    assert list(manager.live) == [('SPX', '20250418', 5450, 'C'), ('SPX', '20250418', 5100, 'C'),
+                                  ('SPX', '20250516', 5100, 'C')]
+
+def test_rebalance_applies_only_the_difference():
+    ib = LineCountingIB()
+    changes = []
+    manager = SubscriptionManager(ib, max_lines=3, rebalance_threshold=0.005,
+                                  on_change=lambda added, removed: changes.append((len(added), len(removed))))
+    manager.set_candidates(candidates()[:-1])
+    manager.rebalance(5100)
+    assert manager.rebalance(5110) == ([], [])
+    manager.rebalance(5160)
+    assert ib.subscribed == {5100, 5150, 5200}
+    assert ib.requests == 4
+    assert changes == [(3, 0), (1, 1)]
+
+def test_update_candidates_keeps_held_positions():
+    ib = LineCountingIB()
+    manager = SubscriptionManager(ib, max_lines=3)
+    manager.set_candidates(candidates()[:-1], positions={('SPX', '20250418', 5000, 'C')})
+    manager.rebalance(5100)
+    added = manager.update_candidates([Option('SPX', '20250418', 5050, 'C', 'SMART'),
+                                       Option('SPX', '20250418', 5075, 'C', 'SMART')],
+                                      removed=[('SPX', '20250418', 5000, 'C'), ('SPX', '20250418', 5100, 'C')])
+    assert [contract.strike for contract in added] == [5075]
+    manager.rebalance(5080, force=True)
+    assert ib.subscribed == {5000, 5050, 5075}
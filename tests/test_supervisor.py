@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from client.ib_client import IBClient
+from client.supervisor import ConnectionSupervisor
+from config.config import AlertConfig, UnderlyingConfig
+from service.scheduler import MonitorScheduler
+from simulation.fake_ib import FakeIB
+
+def make_client(ib):
+    client = IBClient(ib)
+    client.retry_delay = 0.001
+    return client
+
+def test_connect_backs_off_and_gives_up():
+    ib = FakeIB(seed=1)
+    client = make_client(ib)
+    assert [client.backoff(n) for n in (1, 2, 3)] == [0.001, 0.002, 0.004]
+    ib.refuse_connections = 2
+    assert asyncio.run(client.connect_async(max_retries=3)) is ib
+    ib.disconnect()
+    ib.refuse_connections = 5
+    with pytest.raises(ConnectionError):
+        asyncio.run(client.connect_async(max_retries=3))
+
+def test_ensure_connected_keeps_healthy_connection():
+    ib = FakeIB(seed=2)
+    client = make_client(ib)
+    connects = []
+    ib.connectedEvent += lambda: connects.append(1)
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    client.connect()
+    client.ensure_connected()
+    assert len(connects) == 1
+
+def test_reconnect_restores_subscriptions_without_requalifying(monkeypatch, tmp_path):
+    async def price_now(tracker):
+        return tracker.current_price()
+    monkeypatch.setattr('src.service.symbol_tracker.SymbolTracker.get_price_async', price_now)
+    ib = FakeIB({'SPX': 5000.0}, expirations=2, strikes=20, tick_rate=2000, tick_interval=0.01, seed=3)
+    client = make_client(ib)
+    config = AlertConfig(underlyings={'SPX': UnderlyingConfig(market_data_lines=30)}, coalesce_interval=0,
+                         snapshot_format='csv', snapshot_file=str(tmp_path / 'reconnect_{symbol}.csv'),
+                         contract_cache_file='', qualify_chunk_delay=0, history_file=None, iv_history_dir=None,
+                         metrics_port=None)
+    scheduler = MonitorScheduler(ib, config)
+    supervisor = ConnectionSupervisor(client)
+    supervisor.register(scheduler.restore_subscriptions)
+    qualified = []
+
+    async def run():
+        await client.connect_async()
+        await scheduler.start(['SPX'])
+        supervisor.start()
+        monitor = scheduler.monitors['SPX']
+        old = set(monitor.tickers)
+        qualify = ib.qualifyContractsAsync
+        async def counting(*contracts):
+            qualified.extend(contracts)
+            return await qualify(*contracts)
+        ib.qualifyContractsAsync = counting
+
+        ib.refuse_connections = 2
+        ib.disconnect()
+        await asyncio.sleep(0.05)
+        ticks = monitor.pipeline.ticks.value
+        await asyncio.sleep(0.05)
+        return monitor, old, ticks
+
+    monitor, old, ticks = asyncio.run(run())
+    supervisor.stop()
+    scheduler.stop()
+    ib.disconnect()
+    assert supervisor.reconnects == 1 and not qualified
+    assert len(monitor.tickers) == 30 and not old & set(monitor.tickers)
+    assert monitor.pipeline.ticks.value > ticks
@@ -0,0 +1,74 @@
+from datetime import date, datetime, timedelta
+from ib_insync import OptionChain
+from service.symbol_tracker import StrikeWindow, SymbolTracker
+
+class ChainIB:
+    def __init__(self):
+        self.requests = 0
+
+    def reqSecDefOptParams(self, symbol, exchange, sec_type, con_id):
+        self.requests += 1
+        return [
+            OptionChain('CBOE', 1, 'SPXW', '100', ['20250425', '20250411', '20250418'], [5100.0, 5000.0]),
+            OptionChain('SMART', 1, 'SPXW', '100', ['20250425', '20250411', '20250418'], [5100.0, 5000.0]),
+            OptionChain('SMART', 1, 'SPX', '100', ['20250516', '20250418'], [5000.0]),
+        ]
+
+def test_chain_is_cached_and_filtered_by_expiry_index():
+    ib = ChainIB()
+    spx = SymbolTracker(ib, 'SPX', exchange='CBOE', autostart=False)
+    chain = spx.get_option_chain(right_filter={'C'}, expiry_range=(date(2025, 4, 11), date(2025, 4, 18)),
+                                 trading_class='SPXW')
+    assert chain.exchange == 'SMART'
+    assert chain.expirations == ['20250411', '20250418']
+    assert chain.strikes == [5000.0, 5100.0]
+    assert chain.rights == ['C']
+
+    assert spx.get_option_chain().tradingClass == 'SPX'
+    assert set(spx.get_option_chains()) == {'SPX', 'SPXW'}
+    assert ib.requests == 1
+
+def test_trading_classes_are_merged_and_set_on_the_options():
+    spx = SymbolTracker(ChainIB(), 'SPX', exchange='CBOE', autostart=False)
+    chain = spx.get_option_chain(expiry_range=(date(2025, 4, 11), date(2025, 5, 16)))
+    assert chain.expirations == ['20250411', '20250418', '20250425', '20250516']
+    assert chain.trading_classes == {'20250411': 'SPXW', '20250418': 'SPX', '20250425': 'SPXW', '20250516': 'SPX'}
+    assert chain.expiry_strikes['20250411'] == [5000.0, 5100.0] and chain.expiry_strikes['20250418'] == [5000.0]
+    assert spx.build_option('20250418', 5000.0, 'C').tradingClass == 'SPX'
+    assert spx.build_option('20250411', 5000.0, 'C').tradingClass == 'SPXW'
+
+    chain = spx.get_option_chain(trading_class=['SPXW', 'SPX'])
+    assert chain.trading_classes['20250418'] == 'SPXW' and chain.trading_classes['20250516'] == 'SPX'
+    assert spx.build_option('20250418', 5000.0, 'P').tradingClass == 'SPXW'
+
+def test_chain_cache_expires_after_ttl_and_at_day_change():
+    ib = ChainIB()
+    spx = SymbolTracker(ib, 'SPX', autostart=False, chain_ttl=60)
+    spx.get_option_chain()
+    spx._chains_fetched_at = datetime.now() - timedelta(seconds=61)
+    spx.get_option_chain()
+    spx._chains_fetched_at = datetime.now() - timedelta(days=1)
+    spx.get_option_chain()
+    assert ib.requests == 3
+
+def test_strike_window_reports_only_strikes_crossing_its_edges():
+    window = StrikeWindow('SPX', ['20250418'], [4900.0, 4950.0, 5000.0, 5050.0, 5100.0], width=2)
+    added, removed = window.update(5010)
+    assert sorted(added) == [('SPX', '20250418', 4950.0, 'P'), ('SPX', '20250418', 5000.0, 'P'),
+                             ('SPX', '20250418', 5050.0, 'C'), ('SPX', '20250418', 5100.0, 'C')]
+    assert removed == []
+    assert window.update(5020) == ([], [])
+
+    added, removed = window.update(4990)
+    assert sorted(added) == [('SPX', '20250418', 4900.0, 'P'), ('SPX', '20250418', 5000.0, 'C')]
+    assert sorted(removed) == [('SPX', '20250418', 5000.0, 'P'), ('SPX', '20250418', 5100.0, 'C')]
+    assert len(window) == 4
+
+def test_strike_window_delta_band_drops_far_wings():
+    strikes = [float(k) for k in range(4000, 6001, 50)]
+    window = StrikeWindow('SPX', ['20250418'], strikes, min_delta=0.05, volatility=0.2)
+    window.update(5000, now=datetime(2025, 4, 4, 16))
+    calls = [strike for _, _, strike, right in window.keys() if right == 'C']
+    puts = [strike for _, _, strike, right in window.keys() if right == 'P']
+    assert calls[0] == 5050 and 5100 < calls[-1] < 5400
+    assert puts[-1] == 4950 and 4600 < puts[0] < 4900
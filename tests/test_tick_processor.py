@@ -0,0 +1,70 @@
+import asyncio
+import numpy as np
+from eventkit import Event
+from monitoring.tick_processor import TickProcessor
+
+class DummyContract:
+    def __init__(self, strike):
+        self.symbol = 'SPX'
+        self.strike = strike
+        self.right = 'C'
+        self.lastTradeDateOrContractMonth = '20250419'
+
+class DummyTicker:
+    def __init__(self, strike, bid=1.0):
+        self.contract = DummyContract(strike)
+        self.bid = bid
+        self.ask = bid + 0.1
+        self.last = None
+        self.modelGreeks = None
+
+class DummyIB:
+    def __init__(self):
+        self.pendingTickersEvent = Event('pendingTickersEvent')
+
+class DummyTracker:
+    def __init__(self):
+        self.ticker = DummyTicker(0)
+
+    def current_price(self):
+        return 5000.0
+
+    def current_iv(self):
+        return 0.15
+
+class RecordingPipeline:
+    def __init__(self):
+        self.calls = []
+        self._keys = {}
+
+    def add_contracts(self, contracts):
+        return np.array([self._keys.setdefault(c.strike, len(self._keys)) for c in contracts])
+
+    def process(self, indices, columns, underlying_price, timestamp=None, underlying_iv=None):
+        self.calls.append((sorted(indices.tolist()), columns['bid'].tolist(), underlying_price))
+
+def test_only_updated_tickers_are_processed():
+    ib, pipeline = DummyIB(), RecordingPipeline()
+    tickers = [DummyTicker(5100), DummyTicker(5200), DummyTicker(5300)]
+    processor = TickProcessor(ib, pipeline, DummyTracker(), coalesce_interval=0)
+    processor.watch(tickers)
+    processor.start()
+    ib.pendingTickersEvent.emit({tickers[1]})
+    assert pipeline.calls == [([1], [1.0], 5000.0)]
+
+def test_updates_within_window_are_coalesced():
+    ib, pipeline = DummyIB(), RecordingPipeline()
+    tickers = [DummyTicker(5100), DummyTicker(5200)]
+    processor = TickProcessor(ib, pipeline, DummyTracker(), coalesce_interval=0.01)
+    processor.watch(tickers)
+
+    async def run():
+        processor.start()
+        ib.pendingTickersEvent.emit({tickers[0]})
+        tickers[0].bid = 2.0
+        ib.pendingTickersEvent.emit({tickers[0], tickers[1]})
+        assert pipeline.calls == []
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert pipeline.calls == [([0, 1], [2.0, 1.0], 5000.0)]
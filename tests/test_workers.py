@@ -0,0 +1,73 @@
+import os
+from datetime import datetime, timedelta
+import numpy as np
+from config.config import AlertConfig
+from service.scheduler import MonitorScheduler
+from simulation.fake_ib import FakeIB
+from workers.pool import WorkerPool
+from workers.ring import TickRing
+
+class Contract:
+    def __init__(self, expiry, strike, right='C'):
+        self.symbol = 'SPX'
+        self.lastTradeDateOrContractMonth = expiry
+        self.strike = strike
+        self.right = right
+
+def test_ring_reads_in_order_and_counts_overruns():
+    ring = TickRing(capacity=8)
+    try:
+        ring.write(1.0, np.arange(3), {'iv': np.array([0.1, 0.2, 0.3])}, 5000.0)
+        records = ring.read()
+        assert records['contract'].tolist() == [0, 1, 2] and records['iv'].tolist() == [0.1, 0.2, 0.3]
+        assert np.isnan(records['delta']).all() and (records['underlying'] == 5000.0).all()
+        assert not len(ring.read())
+
+        for ts in range(4):
+            ring.write(float(ts), np.arange(3) + 3 * ts, {})
+        records = ring.read()
+        assert len(records) == 8 and ring.dropped == 4
+        assert records['contract'].tolist() == list(range(4, 12))
+    finally:
+        ring.close()
+
+def test_workers_run_pipelines_by_expiry_and_report_alerts(tmp_path):
+    config = AlertConfig(snapshot_format='csv', snapshot_file=str(tmp_path / '{symbol}.csv'), history_file=None,
+                         local_greeks=False, watched_strikes={5100}, delta_threshold=0.5, metrics_port=None)
+    pool = WorkerPool(config, processes=2, partition='expiry', poll_interval=0.005)
+    try:
+        expiries = [(datetime.now() + timedelta(days=d)).strftime('%Y%m%d') for d in range(1, 9)]
+        pipeline = pool.pipeline('SPX')
+        contracts = [Contract(expiry, strike) for expiry in expiries for strike in (5000, 5100)]
+        indices = pipeline.add_contracts(contracts)
+        assert len({pool.worker_of('SPX', expiry) for expiry in expiries}) == 2
+
+        start = datetime.now()
+        underlying_alerts = []
+        for cycle in range(3):
+            delta = np.full(len(indices), 0.3 + 0.2 * cycle)
+            underlying_alerts += pipeline.process(indices, {'delta': delta, 'iv': np.full(len(indices), 0.2)},
+                                                  4400.0, start + timedelta(seconds=cycle))
+    finally:
+        pool.close()
+
+    # The underlying rule is evaluated once in the parent, not once per worker owning SPX expirations
+    assert underlying_alerts == ["⚠️ SPX dropped below 4500: 4400"]
+
+    alerts = list(pool.alerts)
+    assert len(alerts) == len(expiries)
+    assert all(symbol == 'SPX' and 'delta crossed 0.5' in alert for _, symbol, alert in alerts)
+    assert sorted(os.listdir(tmp_path)) == ['spx_0.csv', 'spx_1.csv']
+
+def test_features_unavailable_with_workers_are_reported(tmp_path, caplog):
+    config = AlertConfig(worker_processes=1, history_file=str(tmp_path / 'history.bin'),
+                         aggregate_thresholds={'delta': 100.0}, inventory_file='', contract_cache_file='',
+                         iv_history_dir=None, metrics_port=None)
+    scheduler = MonitorScheduler(FakeIB({'SPX': 5000.0}), config)
+    try:
+        assert scheduler.history_store is None and not os.path.exists(tmp_path / 'history.bin')
+        errors = [record.getMessage() for record in caplog.records if record.levelname == 'ERROR']
+        assert any('aggregate alert rules (net_delta)' in error for error in errors)
+        assert any('tick history file' in error for error in errors)
+    finally:
+        scheduler.stop()